@@ -1,8 +1,16 @@
-from ontoagent.engine.effector import Effector
+from concurrent.futures import Future, wait
+from ontoagent.engine.admission import SignalQueue, SignalRejected
+from ontoagent.engine.changes import ChangeTracker
+from ontoagent.engine.dispatch import Dispatcher, in_worker, ThreadPoolDispatcher
+from ontoagent.engine.effector import Effector, EffectorIndex, ReservationManager
 from ontoagent.engine.executable import Executable
-from ontoagent.engine.operation import Operable, Operation
+from ontoagent.engine.journal import SignalJournal
+from ontoagent.engine.operation import DispatchTable, Operable, Operation
 from ontoagent.engine.proactivity import Proactivity
+from ontoagent.engine.report import ReportBuffer
+from ontoagent.engine.retention import RetentionPolicy, RetentionThread
 from ontoagent.engine.signal import Signal, XMR
+from ontoagent.engine.tracing import Tracer
 from ontoagent.utils.analysis import Analyzer, TextAnalyzer
 from ontoagent.utils.common import AnchoredObject, StoppableThread
 from ontoagent.utils.loader import KnowledgeLoader
@@ -13,16 +21,24 @@ from ontoagent.views.evergreen import EvergreenGoals
 from ontograph import graph
 from ontograph.Focus import Focus
 from ontograph.Frame import Frame
-from threading import Thread
-from typing import List, Type, Union
+from typing import Any, Callable, List, Type, Union
 
+import asyncio
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
 
 class Agent(AnchoredObject):
 
-    heartbeat: "HeartbeatThread" = None
-    auto_join: bool = False
+    heartbeat: Union["HeartbeatThread", "AsyncHeartbeat"] = None
+    dispatcher: Dispatcher = ThreadPoolDispatcher()
+    signals: SignalQueue = SignalQueue()
+    retention: RetentionPolicy = None
+    journal: SignalJournal = None
+    concurrent_operations: bool = False
+    compactor: RetentionThread = None
 
     @classmethod
     def build(
@@ -87,6 +103,7 @@ class Agent(AnchoredObject):
         if isinstance(effector, Effector):
             effector = effector.anchor
         self.anchor["HAS-EFFECTOR"] += effector
+        EffectorIndex.invalidate(self)
 
     def set_response(
         self,
@@ -123,65 +140,248 @@ class Agent(AnchoredObject):
         event.add_operation(operation)
 
     def background(self):
+        ReservationManager.renew_running()
         self.proactivity().run(self)
+        ReportBuffer.flush()
+
+    def input(self, signal: Signal, join: bool = None) -> Future:
+        if Agent.journal is not None:
+            Agent.journal.record("input", signal)
+
+        # Express signals (e.g. effector releases) never wait behind queued analysis,
+        # and neither does a dispatcher worker waiting on its own input.
+        if Agent.signals.is_express(signal) or (join and in_worker()):
+            return self._dispatch("express", self._input, signal, join, join=join)
+
+        SignalJournal.queued(signal)
+        try:
+            future = Agent.signals.put(signal, join=join)
+        except SignalRejected:
+            SignalJournal.drained(signal)
+            raise
+        Agent.dispatcher.submit("input", self._drain)
+        if join:
+            wait([future])
+        return future
 
-    def input(self, signal: Signal, join: bool = None):
-        def _input(signal: Signal):
-            if not isinstance(signal, XMR):
+    def _drain(self):
+        entry = Agent.signals.get()
+        if entry is None:
+            return
+
+        signal, join, future = entry
+        if not future.set_running_or_notify_cancel():
+            return
+
+        run = self._input
+        if SignalJournal.drained(signal):
+            with SignalJournal.suppressed():
+                run = SignalJournal.carry(self._input)
+
+        try:
+            future.set_result(run(signal, join))
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+
+    def _input(self, signal: Signal, join: bool = None):
+        # Checked here, as the signal's timestamp is read from the graph.
+        if Tracer.enabled:
+            Tracer.record(signal, "queued", signal.timestamp(), time.time_ns())
+        if not isinstance(signal, XMR):
+            with Tracer.span(signal, "analysis"):
                 analyzed = Analyzer.analyzer_for_signal(signal).to_signal(signal)
+            Tracer.link(analyzed, signal)
+            signal.set_status(Signal.Status.CONSUMED)
+            signal = analyzed
+        return self.handle(signal, join=join)
+
+    def input_many(self, signals: List[Signal], join: bool = None) -> List[Future]:
+        # Bulk submission (e.g. replaying a recorded session) bypasses the signal
+        # queue; all analysis writes share one transaction, and operations are
+        # resolved once per root concept rather than once per signal.
+        analyzers = Analyzer.get_registered_analyzers()
+
+        if Agent.journal is not None:
+            for signal in signals:
+                Agent.journal.record("input", signal)
+
+        analyzed = []
+        graph.driver.disable_auto_commit()
+        try:
+            for signal in signals:
+                if not isinstance(signal, XMR):
+                    with Tracer.span(signal, "analysis"):
+                        analyzer = Analyzer.analyzer_for_signal(
+                            signal, analyzers=analyzers
+                        )
+                        xmr = analyzer.to_signal(signal)
+                    Tracer.link(xmr, signal)
+                    signal.set_status(Signal.Status.CONSUMED)
+                    signal = xmr
+                analyzed.append(signal)
+        finally:
+            graph.driver.enable_auto_commit(commit_now=True)
+
+        futures = []
+        for signal in analyzed:
+            operations = DispatchTable.operations(signal.get_root_concept())
+            futures.append(self._dispatch("handle", self._handle, signal, operations))
+
+        if join:
+            wait(futures)
+        return futures
+
+    def handle(self, signal: Signal, join: bool = None) -> Future:
+        # Signals handed back to the agent by a running operation join its trace.
+        if Tracer.enabled and Tracer.current() is not None:
+            Tracer.link(signal, Tracer.current())
+
+        return self._dispatch("handle", self._handle, signal, join=join)
+
+    def _handle(self, signal: Signal, operations: List[Operation] = None):
+        with ChangeTracker.scope(self.agenda().anchor.id):
+            try:
+                with Tracer.span(signal, "handle"):
+                    if operations is None:
+                        with Tracer.span(signal, "root-concept"):
+                            operations = DispatchTable.operations(
+                                signal.get_root_concept()
+                            )
+                    if Agent.concurrent_operations:
+                        self._run_concurrently(signal, operations)
+                    else:
+                        for operation in Operation.ordered(operations):
+                            self._run_operation(signal, operation)
                 signal.set_status(Signal.Status.CONSUMED)
-                signal = analyzed
-            self.handle(signal, join=join)
-            graph.driver.close_connection()
+            finally:
+                ChangeTracker.mark()
+
+    def _run_concurrently(self, signal: Signal, operations: List[Operation]):
+        # Each layer's operations are independent; a layer only starts once every
+        # operation it may depend on (see Operation.layers) has finished.
+        for layer in Operation.layers(operations):
+            futures = list(
+                map(
+                    lambda operation: Agent.dispatcher.submit(
+                        "operation",
+                        SignalJournal.carry(self._run_operation),
+                        signal,
+                        operation,
+                    ),
+                    layer,
+                )
+            )
+            wait(futures)
+            for future in futures:
+                if future.exception() is not None:
+                    raise future.exception()
+
+    def _run_operation(self, signal: Signal, operation: Operation):
+        if not Tracer.enabled:
+            return operation.run(self, signal=signal)
+
+        with Tracer.span(
+            signal,
+            "operation",
+            operation=operation.anchor.id,
+            executable=operation.executable_type().__name__,
+        ):
+            return operation.run(self, signal=signal)
+
+    def output(
+        self, xmr: XMR, effector: Effector, join: bool = None, holder: Any = None
+    ) -> Future:
+        if Agent.journal is not None:
+            Agent.journal.record("output", xmr)
+
+        trace = None
+        if Tracer.enabled:
+            trace = Tracer.current()
+            if trace is None:
+                trace = Tracer.trace_of(xmr)
+
+        return self._dispatch(
+            "output", self._output, xmr, effector, trace, holder, join=join
+        )
 
-        thread = Thread(target=_input, args=(signal,))
-        thread.start()
+    def _output(
+        self, xmr: XMR, effector: Effector, trace: str = None, holder: Any = None
+    ):
+        if trace is None and Tracer.enabled:
+            trace = Tracer.trace_of(xmr)
+
+        with Tracer.span(trace, "output", effector=effector.anchor.id):
+            # Output queued under a claim that has since been preempted (or has
+            # expired) must not run on an effector that now belongs to another.
+            if holder is not None and ReservationManager.holder(effector) != holder:
+                logger.info(
+                    "Dropped output %s; %s no longer holds %s."
+                    % (xmr.anchor.id, holder, effector.anchor.id)
+                )
+                return
+            effector.run(self, xmr)
 
-        join = join if join is not None else Agent.auto_join
-        if join:
-            thread.join()
+    async def ainput(self, signal: Signal):
+        handled = await self._asubmit(self.input, signal)
+        if handled is not None:
+            await asyncio.wrap_future(handled)
 
-    def handle(self, signal: Signal, join: bool = None):
-        def _handle(signal: Signal):
-            concept = Operable(signal.get_root_concept())
-            for operation in concept.operations():
-                operation.run(self, signal=signal)
-            signal.set_status(Signal.Status.CONSUMED)
-            graph.driver.close_connection()
+    async def ahandle(self, signal: Signal):
+        await self._asubmit(self.handle, signal)
 
-        thread = Thread(target=_handle, args=(signal,))
-        thread.start()
+    async def aoutput(self, xmr: XMR, effector: Effector):
+        await self._asubmit(self.output, xmr, effector)
 
-        join = join if join is not None else Agent.auto_join
-        if join:
-            thread.join()
+    async def abackground(self):
+        await self._asubmit(Agent.dispatcher.submit, "background", self.background)
 
-    def output(self, xmr: XMR, effector: Effector, join: bool = None):
-        def _output(xmr: XMR, effector: Effector):
-            effector.interrupt()
-            effector.run(self, xmr)
-            graph.driver.close_connection()
-
-        thread = Thread(
-            target=_output,
-            args=(
-                xmr,
-                effector,
-            ),
-        )
-        thread.start()
+    async def _asubmit(self, submit: Callable[..., Future], *args) -> Any:
+        # Submitting can run the work on the submitting thread (the synchronous
+        # dispatcher, CALLER_RUNS on a full pool, or admission waiting for room),
+        # so it is never the loop's.
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(None, submit, *args)
+        return await asyncio.wrap_future(future)
 
-        join = join if join is not None else Agent.auto_join
+    def _dispatch(self, pool: str, fn: Callable, *args, join: bool = None) -> Future:
+        fn = SignalJournal.carry(fn)
         if join:
-            thread.join()
+            return Agent.dispatcher.call(pool, fn, *args)
+        return Agent.dispatcher.submit(pool, fn, *args)
 
     def start(self, heartbeat: float = 0.25):
         if Agent.heartbeat is None:
             Agent.heartbeat = HeartbeatThread(self, heartbeat=heartbeat)
 
         Agent.heartbeat.start()
+        self.start_compaction()
+
+    async def astart(self, heartbeat: float = 0.25):
+        if Agent.heartbeat is None:
+            Agent.heartbeat = AsyncHeartbeat(self, heartbeat=heartbeat)
+
+        Agent.heartbeat.start()
+        self.start_compaction()
+
+    def start_compaction(self, interval: float = 5.0):
+        if Agent.retention is None or Agent.compactor is not None:
+            return
+
+        if Agent.retention.journal is None:
+            Agent.retention.journal = Agent.journal
+        if self.agenda() not in Agent.retention.agendas:
+            Agent.retention.agendas.append(self.agenda())
+        Agent.compactor = RetentionThread(Agent.retention, interval=interval)
+        Agent.compactor.start()
 
     def stop(self):
+        ReportBuffer.flush()
+
+        if Agent.compactor is not None:
+            Agent.compactor.stop()
+            Agent.compactor = None
+
         if Agent.heartbeat is None:
             return
 
@@ -200,3 +400,31 @@ class HeartbeatThread(StoppableThread):
         while not self.stopped():
             time.sleep(self.heartbeat)
             self.agent.background()
+
+
+class AsyncHeartbeat(object):
+    """Heartbeat run as a task on the current event loop; each beat runs the
+    agent's background work on the dispatcher so the loop is never blocked."""
+
+    def __init__(self, agent: Agent, heartbeat: float = 0.25):
+        self.agent = agent
+        self.heartbeat = heartbeat
+        self.task: asyncio.Task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def stopped(self) -> bool:
+        return self.task is None or self.task.done()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self.agent.abackground()
+            except Exception:
+                logger.exception("Heartbeat failed.")
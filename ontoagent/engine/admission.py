@@ -0,0 +1,152 @@
+from collections import deque
+from concurrent.futures import Future
+from enum import Enum
+from ontoagent.engine.signal import Signal
+from ontograph.Identifier import Identifier
+from typing import Deque, Dict, List, Tuple, Union
+import threading
+
+
+class SignalRejected(Exception):
+
+    def __init__(self, signal: Signal, reason: str):
+        super().__init__("Signal %s was rejected: %s" % (signal.anchor.id, reason))
+        self.signal = signal
+        self.reason = reason
+
+
+class SignalQueue(object):
+    """Priority queue of signals waiting for input, keyed by the signal type in
+    their anchor's id, so admission never reads the graph."""
+
+    class Policy(Enum):
+        REJECT = "REJECT"
+        DROP_LOWEST = "DROP_LOWEST"
+
+    DEFAULT_PRIORITIES = {
+        "@ONT.RMR": 100,
+        "@ONT.TMR": 20,
+        "@ONT.VMR": 20,
+    }
+
+    Entry = Tuple[Signal, bool, Future]
+
+    def __init__(
+        self,
+        max_depth: int = 1024,
+        policy: "SignalQueue.Policy" = None,
+        priorities: Dict[str, int] = None,
+        default_priority: int = 0,
+        express_priority: Union[int, None] = 100,
+    ):
+        if policy is None:
+            policy = SignalQueue.Policy.DROP_LOWEST
+        if priorities is None:
+            priorities = dict(SignalQueue.DEFAULT_PRIORITIES)
+
+        self.max_depth = max_depth
+        self.policy = policy
+        self.priorities = priorities
+        self.default_priority = default_priority
+        self.express_priority = express_priority
+
+        self._levels: Dict[int, Deque["SignalQueue.Entry"]] = {}
+        self._depth = 0
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def type_of(cls, signal: Signal) -> str:
+        return "@ONT." + Identifier.parse(signal.anchor.id)[1]
+
+    def set_priority(self, type: str, priority: int):
+        self.priorities[type] = priority
+
+    def priority(self, signal: Signal) -> int:
+        return self.priorities.get(SignalQueue.type_of(signal), self.default_priority)
+
+    def is_express(self, signal: Signal) -> bool:
+        if self.express_priority is None:
+            return False
+        return self.priority(signal) >= self.express_priority
+
+    def put(self, signal: Signal, join: bool = None) -> Future:
+        future = Future()
+        priority = self.priority(signal)
+        dropped = None
+
+        with self._lock:
+            depth = self._depth
+            if depth >= self.max_depth:
+                # A queue with no room at all (max_depth 0) has nothing to drop.
+                if (
+                    len(self._levels) == 0
+                    or self.policy == SignalQueue.Policy.REJECT
+                    or min(self._levels) >= priority
+                ):
+                    self._count(signal, "rejected")
+                    future = None
+                else:
+                    dropped = self._pop(min(self._levels))
+                    self._count(dropped[0], "dropped")
+
+            if future is not None:
+                if priority not in self._levels:
+                    self._levels[priority] = deque()
+                self._levels[priority].append((signal, join, future))
+                self._depth += 1
+                self._count(signal, "accepted")
+
+        if future is None:
+            signal.set_status(Signal.Status.REJECTED)
+            raise SignalRejected(signal, "queue is full (%d signals)" % depth)
+
+        if dropped is not None:
+            dropped[0].set_status(Signal.Status.REJECTED)
+            dropped[2].set_exception(
+                SignalRejected(dropped[0], "displaced by a higher priority signal")
+            )
+
+        return future
+
+    def get(self) -> Union[None, "SignalQueue.Entry"]:
+        with self._lock:
+            if self._depth == 0:
+                return None
+            return self._pop(max(self._levels))
+
+    def _pop(self, level: int) -> "SignalQueue.Entry":
+        entry = self._levels[level].popleft()
+        if len(self._levels[level]) == 0:
+            del self._levels[level]
+        self._depth -= 1
+        return entry
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._depth
+
+    def _count(self, signal: Signal, outcome: str):
+        type = SignalQueue.type_of(signal)
+        if type not in self._counts:
+            self._counts[type] = {"accepted": 0, "rejected": 0, "dropped": 0}
+        self._counts[type][outcome] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "depth": self._depth,
+                "max-depth": self.max_depth,
+                "policy": self.policy.name,
+                "types": {type: dict(c) for type, c in self._counts.items()},
+            }
+
+    def clear(self) -> List[Signal]:
+        with self._lock:
+            entries = [entry for level in self._levels.values() for entry in level]
+            self._levels = {}
+            self._depth = 0
+
+        for entry in entries:
+            entry[2].cancel()
+        return [entry[0] for entry in entries]
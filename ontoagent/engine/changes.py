@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from ontoagent.utils.loader import KnowledgeLoader
+from typing import Dict
+import threading
+
+
+class ChangeTracker(object):
+    """Generation counters, bumped whenever something agenda processing depends
+    on changes. A change made in an agenda's scope (see `scope`) only concerns
+    that agenda; any other change concerns all of them. Writes made directly to
+    the graph are not seen."""
+
+    _generation = 0
+    _generations: Dict[str, int] = {}
+    _local = threading.local()
+    _lock = threading.Lock()
+
+    @classmethod
+    @contextmanager
+    def scope(cls, key: str):
+        previous = getattr(ChangeTracker._local, "scope", None)
+        ChangeTracker._local.scope = key
+        try:
+            yield
+        finally:
+            ChangeTracker._local.scope = previous
+
+    @classmethod
+    def mark(cls):
+        scope = getattr(ChangeTracker._local, "scope", None)
+        with ChangeTracker._lock:
+            if scope is None:
+                ChangeTracker._generation += 1
+            else:
+                generations = ChangeTracker._generations
+                generations[scope] = generations.get(scope, 0) + 1
+
+    @classmethod
+    def generation(cls, key: str = None) -> int:
+        # Both counters only grow, so their sum changes whenever either does.
+        with ChangeTracker._lock:
+            return ChangeTracker._generation + ChangeTracker._generations.get(key, 0)
+
+
+KnowledgeLoader.on_change(ChangeTracker.mark)
@@ -0,0 +1,365 @@
+from concurrent.futures import Future, wait
+from enum import Enum
+from ontograph import graph
+from typing import Any, Callable, Dict, Tuple
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchRejected(Exception):
+    pass
+
+
+class PoolMetrics(object):
+
+    def __init__(self, name: str):
+        self.name = name
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.inline = 0
+        self.active = 0
+        self.max_queue_depth = 0
+        self.total_wait_ns = 0
+        self.total_run_ns = 0
+        self._lock = threading.Lock()
+
+    def record_submitted(self, queue_depth: int = 0):
+        with self._lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_inline(self):
+        with self._lock:
+            self.inline += 1
+
+    def record_started(self, wait_ns: int):
+        with self._lock:
+            self.active += 1
+            self.total_wait_ns += wait_ns
+
+    def record_finished(self, run_ns: int, failed: bool):
+        with self._lock:
+            self.active -= 1
+            self.total_run_ns += run_ns
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def to_dict(self, workers: int = 0, queue_depth: int = 0) -> dict:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "pool": self.name,
+                "workers": workers,
+                "active": self.active,
+                "queue-depth": queue_depth,
+                "max-queue-depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "inline": self.inline,
+                "mean-wait-ms": (
+                    0.0 if finished == 0 else self.total_wait_ns / finished / 1e6
+                ),
+                "mean-run-ms": (
+                    0.0 if finished == 0 else self.total_run_ns / finished / 1e6
+                ),
+            }
+
+
+def _execute(
+    metrics: PoolMetrics,
+    future: Future,
+    fn: Callable,
+    args: Tuple,
+    kwargs: Dict[str, Any],
+    enqueued: int,
+):
+    if not future.set_running_or_notify_cancel():
+        return
+
+    started = time.monotonic_ns()
+    metrics.record_started(started - enqueued)
+
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        logger.exception("Dispatched work failed in pool %s." % metrics.name)
+        metrics.record_finished(time.monotonic_ns() - started, True)
+        future.set_exception(e)
+        return
+
+    metrics.record_finished(time.monotonic_ns() - started, False)
+    future.set_result(result)
+
+
+_local = threading.local()
+
+
+def in_worker() -> bool:
+    """Whether the calling thread is a worker of any dispatcher pool."""
+    return getattr(_local, "worker", False)
+
+
+def _execute_inline(
+    metrics: PoolMetrics,
+    future: Future,
+    fn: Callable,
+    args: Tuple,
+    kwargs: Dict[str, Any],
+    enqueued: int,
+):
+    metrics.record_submitted()
+    metrics.record_inline()
+
+    depth = getattr(_local, "inline", 0)
+    _local.inline = depth + 1
+    try:
+        _execute(metrics, future, fn, args, kwargs, enqueued)
+    finally:
+        _local.inline = depth
+        # As if run on a thread of its own: the connection is closed once the
+        # outermost inline call returns. Long-lived callers keep theirs: pool
+        # workers close it when they retire, the main thread never does.
+        if depth == 0 and not in_worker():
+            if threading.current_thread() is not threading.main_thread():
+                graph.driver.close_connection()
+
+
+class Dispatcher(object):
+    """Runs the agent's input, handle and output work on named pools."""
+
+    def submit(self, pool: str, fn: Callable, *args, **kwargs) -> Future:
+        raise NotImplementedError
+
+    def call(self, pool: str, fn: Callable, *args, **kwargs) -> Future:
+        """Runs the work and waits for it to finish."""
+
+        future = self.submit(pool, fn, *args, **kwargs)
+        wait([future])
+        return future
+
+    def metrics(self) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+
+class SynchronousDispatcher(Dispatcher):
+    """Runs all work inline on the calling thread; useful for tests and demos."""
+
+    def __init__(self):
+        self._metrics: Dict[str, PoolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pool: str, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            if pool not in self._metrics:
+                self._metrics[pool] = PoolMetrics(pool)
+            metrics = self._metrics[pool]
+
+        future = Future()
+        _execute_inline(metrics, future, fn, args, kwargs, time.monotonic_ns())
+        return future
+
+    def metrics(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: m.to_dict() for name, m in self._metrics.items()}
+
+
+class WorkerPool(object):
+
+    class Policy(Enum):
+        BLOCK = "BLOCK"
+        CALLER_RUNS = "CALLER_RUNS"
+        REJECT = "REJECT"
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        name: str,
+        workers: int = 4,
+        queue_depth: int = 256,
+        policy: "WorkerPool.Policy" = None,
+        idle_timeout: float = 30.0,
+    ):
+        if policy is None:
+            policy = WorkerPool.Policy.CALLER_RUNS
+
+        self.name = name
+        self.workers = workers
+        self.policy = policy
+        self.idle_timeout = idle_timeout
+        self.metrics = PoolMetrics(name)
+
+        self._queue = queue.Queue(maxsize=queue_depth)
+        self._threads = set()
+        # Items queued or running; a worker is started whenever there are more
+        # of them than workers.
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        item = (future, fn, args, kwargs, time.monotonic_ns())
+
+        # Work submitted from one of this pool's own workers must never block on
+        # the queue, or a full pool can deadlock waiting on itself.
+        reentrant = getattr(self._local, "worker", False)
+
+        with self._lock:
+            self._outstanding += 1
+
+        if self.policy == WorkerPool.Policy.BLOCK and not reentrant:
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                with self._lock:
+                    self._outstanding -= 1
+                if self.policy == WorkerPool.Policy.REJECT and not reentrant:
+                    self.metrics.record_rejected()
+                    raise DispatchRejected(
+                        "Pool %s is full (%d queued)."
+                        % (self.name, self._queue.qsize())
+                    )
+                _execute_inline(self.metrics, *item)
+                return future
+
+        self.metrics.record_submitted(self._queue.qsize())
+        self._ensure_worker()
+        return future
+
+    def run_inline(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        _execute_inline(self.metrics, future, fn, args, kwargs, time.monotonic_ns())
+        return future
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._outstanding <= len(self._threads):
+                return
+            if len(self._threads) >= self.workers:
+                return
+            thread = threading.Thread(
+                target=self._work, name="%s-worker" % self.name, daemon=True
+            )
+            self._threads.add(thread)
+        thread.start()
+
+    def _work(self):
+        _local.worker = True
+        self._local.worker = True
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    with self._lock:
+                        # Only retire if nothing slipped in while we timed out.
+                        if not self._queue.empty():
+                            continue
+                        self._threads.discard(threading.current_thread())
+                    return
+
+                if item is WorkerPool._STOP:
+                    with self._lock:
+                        self._threads.discard(threading.current_thread())
+                    return
+
+                try:
+                    _execute(self.metrics, *item)
+                finally:
+                    with self._lock:
+                        self._outstanding -= 1
+        finally:
+            # Workers are long-lived, so the graph connection is reused across
+            # tasks and only closed when the worker retires.
+            graph.driver.close_connection()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(WorkerPool._STOP)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            workers = len(self._threads)
+        return self.metrics.to_dict(workers=workers, queue_depth=self._queue.qsize())
+
+
+class ThreadPoolDispatcher(Dispatcher):
+    """Runs work on bounded, lazily started worker pools, one per pool name;
+    `pools` overrides the settings of individual pools."""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        queue_depth: int = 256,
+        policy: WorkerPool.Policy = None,
+        idle_timeout: float = 30.0,
+        pools: Dict[str, dict] = None,
+    ):
+        if pools is None:
+            pools = {}
+
+        self.defaults = {
+            "workers": workers,
+            "queue_depth": queue_depth,
+            "policy": policy,
+            "idle_timeout": idle_timeout,
+        }
+        self.overrides = pools
+
+        self._pools: Dict[str, WorkerPool] = {}
+        self._lock = threading.Lock()
+
+    def pool(self, name: str) -> WorkerPool:
+        with self._lock:
+            if name not in self._pools:
+                config = dict(self.defaults)
+                config.update(self.overrides.get(name, {}))
+                self._pools[name] = WorkerPool(name, **config)
+            return self._pools[name]
+
+    def submit(self, pool: str, fn: Callable, *args, **kwargs) -> Future:
+        return self.pool(pool).submit(fn, *args, **kwargs)
+
+    def call(self, pool: str, fn: Callable, *args, **kwargs) -> Future:
+        # A worker waiting on another (possibly saturated) pool could deadlock;
+        # it runs the work itself instead.
+        if in_worker():
+            return self.pool(pool).run_inline(fn, *args, **kwargs)
+        return super().call(pool, fn, *args, **kwargs)
+
+    def metrics(self) -> Dict[str, dict]:
+        with self._lock:
+            pools = list(self._pools.values())
+        return {pool.name: pool.to_dict() for pool in pools}
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
@@ -1,17 +1,28 @@
 from enum import Enum
+from ontoagent.engine.changes import ChangeTracker
 from ontoagent.engine.executable import Executable
 from ontoagent.engine.report import Report
 from ontoagent.engine.signal import XMR
+from ontoagent.engine.watchdog import Watchdog
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.common import AnchoredObject
+from ontoagent.utils.loader import KnowledgeLoader
 from ontograph.Frame import Frame
 from ontograph.Space import Space
-from typing import Type, Union
+from typing import Any, Callable, Dict, List, Set, Tuple, Type, Union
+import heapq
+import itertools
+import logging
+import threading
+import time
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ontoagent.agent import Agent
 
+logger = logging.getLogger(__name__)
+
 
 class Effector(AnchoredObject):
 
@@ -50,6 +61,7 @@ class Effector(AnchoredObject):
 
     def set_status(self, status: Status):
         self.anchor["STATUS"] = status
+        ReservationManager.sync(self, status)
 
     def reserved_to(self) -> Union[None, XMR]:
         if "RESERVED-TO" in self.anchor:
@@ -75,6 +87,568 @@ class Effector(AnchoredObject):
     def set_interrupt(self, execute: Type["Executable"]):
         self.anchor["INTERRUPT"] = execute
 
+    def timeout(self) -> Union[None, float]:
+        if "TIMEOUT" in self.anchor:
+            return self.anchor["TIMEOUT"].singleton()
+        return None
+
+    def set_timeout(self, timeout: Union[None, float]):
+        self.anchor["TIMEOUT"] = [] if timeout is None else timeout
+
+    def release(self, reservation: "Reservation" = None) -> bool:
+        return ReservationManager.release(self, reservation=reservation)
+
+    def renew(self) -> bool:
+        # For long-running executables to report progress on (see
+        # ReservationManager.renew).
+        reservation = ReservationManager.reservation(self)
+        return reservation is not None and ReservationManager.renew(reservation)
+
     def run(self, agent: "Agent", xmr: XMR) -> Report:
+        # A timeout only hands back the reservation this XMR runs under, never
+        # one taken since by preempting work.
+        reservation = ReservationManager.assign(self, xmr)
         self.set_reserved_to(xmr)
-        return self.executable()._run(agent, xmr=xmr, effector=self)
+        if reservation is not None:
+            ReservationManager.started(reservation)
+        try:
+            return self.executable()._run_watched(
+                agent,
+                timeout=self.timeout(),
+                on_timeout=lambda: self.release(reservation=reservation),
+                xmr=xmr,
+                effector=self,
+            )
+        finally:
+            if reservation is not None:
+                ReservationManager.finished(reservation)
+
+
+class Reservation(object):
+
+    def __init__(
+        self,
+        effector: str,
+        holder: Any,
+        token: int,
+        lease: float = None,
+        priority: float = 0.0,
+        on_preempt: Callable[[Effector], None] = None,
+    ):
+        self.effector = effector
+        self.holder = holder
+        self.token = token
+        self.lease = lease
+        self.deadline = None if lease is None else time.monotonic() + lease
+        self.priority = priority
+        self.on_preempt = on_preempt
+        self.watch: int = None
+        # The XMR started on the effector under this reservation, if any.
+        self.xmr: XMR = None
+
+    def expired(self) -> bool:
+        return self.deadline is not None and self.deadline <= time.monotonic()
+
+
+class ReservationManager(object):
+    """The single place effectors are claimed and released. Claims are made under
+    one lock and expire on their own if nothing releases or renews them."""
+
+    lease: Union[None, float] = 60.0
+    expired = 0
+    preempted = 0
+
+    _reservations: Dict[str, Union[None, Reservation]] = {}
+    # Reservations whose work is running on the effector, renewed on heartbeat.
+    _running: Dict[int, Reservation] = {}
+    _counter = itertools.count()
+    _lock = threading.RLock()
+
+    @classmethod
+    def is_available(cls, effector: Effector) -> bool:
+        with ReservationManager._lock:
+            return ReservationManager._current(effector) is None
+
+    @classmethod
+    def reservation(cls, effector: Effector) -> Union[None, Reservation]:
+        with ReservationManager._lock:
+            return ReservationManager._current(effector)
+
+    @classmethod
+    def holder(cls, effector: Effector) -> Any:
+        reservation = ReservationManager.reservation(effector)
+        return None if reservation is None else reservation.holder
+
+    @classmethod
+    def assign(cls, effector: Effector, xmr: XMR) -> Union[None, Reservation]:
+        """Records `xmr` as the work started under the effector's current
+        reservation, returning that reservation (or None if it has none)."""
+
+        with ReservationManager._lock:
+            reservation = ReservationManager._current(effector)
+            if reservation is not None:
+                reservation.xmr = xmr
+            return reservation
+
+    @classmethod
+    def claim(
+        cls,
+        effector: Effector,
+        holder: Any,
+        lease: float = None,
+        priority: float = 0.0,
+        on_preempt: Callable[[Effector], None] = None,
+    ) -> Union[None, Reservation]:
+        """Reserves `effector` for `holder` if it is available (or already held
+        by `holder`); returns None otherwise. The lease defaults to `lease`,
+        extended to the effector's own timeout if that is longer."""
+
+        with ReservationManager._lock:
+            current = ReservationManager._current(effector)
+            if current is not None:
+                return current if current.holder == holder else None
+
+            return ReservationManager._reserve(
+                effector, holder, lease, priority, on_preempt
+            )
+
+    @classmethod
+    def preempt(
+        cls,
+        agent: "Agent",
+        effector: Effector,
+        holder: Any,
+        priority: float,
+        lease: float = None,
+        on_preempt: Callable[[Effector], None] = None,
+    ) -> Union[None, Reservation]:
+        """Reserves `effector` for `holder`, interrupting a lower priority holder
+        if the effector has an INTERRUPT executable; returns None otherwise."""
+
+        with ReservationManager._lock:
+            current = ReservationManager._current(effector)
+            if current is None or current.holder == holder:
+                return ReservationManager.claim(
+                    effector, holder, lease, priority, on_preempt
+                )
+
+            interrupt = effector.interrupt()
+            if interrupt is None or current.priority >= priority:
+                return None
+
+            if current.watch is not None:
+                Watchdog.unwatch(current.watch)
+            reservation = ReservationManager._reserve(
+                effector, holder, lease, priority, on_preempt
+            )
+            ReservationManager.preempted += 1
+
+        # The interrupt must stop the running action without it then releasing
+        # the effector; output that has not started yet is dropped by the agent.
+        if current.xmr is not None:
+            agent.dispatcher.submit(
+                "express", interrupt()._run, agent, xmr=current.xmr, effector=effector
+            )
+        if current.on_preempt is not None:
+            current.on_preempt(effector)
+        return reservation
+
+    @classmethod
+    def renew(cls, reservation: Reservation, lease: float = None) -> bool:
+        if lease is None:
+            lease = reservation.lease
+        if lease is None:
+            return False
+
+        with ReservationManager._lock:
+            current = ReservationManager._reservations.get(reservation.effector)
+            if current is not reservation:
+                return False
+            if reservation.watch is not None:
+                Watchdog.unwatch(reservation.watch)
+            reservation.lease = lease
+            reservation.deadline = time.monotonic() + lease
+
+        effector = Effector(Frame(reservation.effector))
+        reservation.watch = Watchdog.watch(
+            lease, lambda: ReservationManager._expire(effector, reservation)
+        )
+        return True
+
+    @classmethod
+    def started(cls, reservation: Reservation):
+        with ReservationManager._lock:
+            ReservationManager._running[reservation.token] = reservation
+
+    @classmethod
+    def finished(cls, reservation: Reservation):
+        with ReservationManager._lock:
+            ReservationManager._running.pop(reservation.token, None)
+
+    @classmethod
+    def renew_running(cls) -> int:
+        """Renews the lease of each reservation whose work is still running once
+        less than half of it is left, returning how many were renewed."""
+
+        with ReservationManager._lock:
+            running = list(ReservationManager._running.values())
+
+        renewed = 0
+        now = time.monotonic()
+        for reservation in running:
+            if reservation.deadline is None:
+                continue
+            if reservation.deadline - now >= reservation.lease / 2:
+                continue
+            if ReservationManager.renew(reservation):
+                renewed += 1
+        return renewed
+
+    @classmethod
+    def release(
+        cls, effector: Effector, reservation: Reservation = None, drain: bool = True
+    ) -> bool:
+        """Makes `effector` available. With a `reservation`, only releases it if
+        that reservation is still the current one, so a stale release cannot
+        free an effector that has since been claimed again. Unless `drain` is
+        False, the effector then starts the next work in its EffectorQueue."""
+
+        with ReservationManager._lock:
+            current = ReservationManager._reservations.get(effector.anchor.id)
+            if reservation is not None and current is not reservation:
+                return False
+            if current is not None and current.watch is not None:
+                Watchdog.unwatch(current.watch)
+            ReservationManager._set(effector.anchor.id, None)
+            effector.anchor["STATUS"] = Effector.Status.AVAILABLE
+
+        if drain:
+            EffectorQueue.drain(effector)
+        return True
+
+    @classmethod
+    def sync(cls, effector: Effector, status: Effector.Status):
+        # Keeps the manager in step with direct Effector.set_status calls.
+        with ReservationManager._lock:
+            current = ReservationManager._reservations.get(effector.anchor.id)
+            if status == Effector.Status.AVAILABLE:
+                if current is not None and current.watch is not None:
+                    Watchdog.unwatch(current.watch)
+                ReservationManager._set(effector.anchor.id, None)
+            elif current is None:
+                ReservationManager._set(
+                    effector.anchor.id,
+                    # Work reserved outside the manager is never preempted.
+                    Reservation(
+                        effector.anchor.id,
+                        None,
+                        next(ReservationManager._counter),
+                        priority=float("inf"),
+                    ),
+                )
+
+    @classmethod
+    def clear(cls):
+        with ReservationManager._lock:
+            for reservation in ReservationManager._reservations.values():
+                if reservation is not None and reservation.watch is not None:
+                    Watchdog.unwatch(reservation.watch)
+            ReservationManager._reservations = {}
+            ReservationManager._running = {}
+
+    @classmethod
+    def _reserve(
+        cls,
+        effector: Effector,
+        holder: Any,
+        lease: Union[None, float],
+        priority: float,
+        on_preempt: Union[None, Callable[[Effector], None]],
+    ) -> Reservation:
+        # Called with the lock held, once the effector is known to be claimable.
+        if lease is None:
+            lease = ReservationManager.lease
+            if lease is not None and effector.timeout() is not None:
+                lease = max(lease, effector.timeout())
+
+        reservation = Reservation(
+            effector.anchor.id,
+            holder,
+            next(ReservationManager._counter),
+            lease,
+            priority=priority,
+            on_preempt=on_preempt,
+        )
+        ReservationManager._set(effector.anchor.id, reservation)
+        effector.anchor["STATUS"] = Effector.Status.RESERVED
+
+        if lease is not None:
+            reservation.watch = Watchdog.watch(
+                lease, lambda: ReservationManager._expire(effector, reservation)
+            )
+        return reservation
+
+    @classmethod
+    def _set(cls, effector: str, reservation: Union[None, Reservation]):
+        ReservationManager._reservations[effector] = reservation
+        EffectorIndex.update(effector, reservation is None)
+        ChangeTracker.mark()
+
+    @classmethod
+    def _current(cls, effector: Effector) -> Union[None, Reservation]:
+        if effector.anchor.id not in ReservationManager._reservations:
+            ReservationManager.sync(effector, effector.status())
+
+        reservation = ReservationManager._reservations[effector.anchor.id]
+        if reservation is not None and reservation.expired():
+            ReservationManager._expire(effector, reservation)
+            return None
+        return reservation
+
+    @classmethod
+    def _expire(cls, effector: Effector, reservation: Reservation):
+        if ReservationManager.release(effector, reservation=reservation):
+            ReservationManager.expired += 1
+            logger.warning(
+                "Reservation of %s by %s expired after %ss."
+                % (effector.anchor.id, reservation.holder, reservation.lease)
+            )
+
+
+class EffectorIndex(object):
+    """Maps each agent's effector types (an effector and its ancestors) to the
+    effectors of that type currently available."""
+
+    _available: Dict[str, Dict[str, Dict[str, Effector]]] = {}
+    _capable: Dict[str, Dict[str, List[Effector]]] = {}
+    _types: Dict[str, List[str]] = {}
+    _agents: Dict[str, Set[str]] = {}
+    # Shared with the ReservationManager, so a lookup and the claim that follows
+    # it are atomic, and updates arriving from it cannot interleave with a build.
+    _lock = ReservationManager._lock
+
+    @classmethod
+    def available(
+        cls, agent: "Agent", type: Union[Frame, Effector]
+    ) -> Union[None, Effector]:
+        if isinstance(type, Effector):
+            type = type.anchor
+
+        with EffectorIndex._lock:
+            effectors = EffectorIndex._index(agent).get(type.id)
+            if not effectors:
+                return None
+            return next(iter(effectors.values()))
+
+    @classmethod
+    def capable(cls, agent: "Agent", type: Union[Frame, Effector]) -> List[Effector]:
+        """Every effector of `agent` that is a `type`, available or not."""
+
+        if isinstance(type, Effector):
+            type = type.anchor
+
+        with EffectorIndex._lock:
+            EffectorIndex._index(agent)
+            return list(EffectorIndex._capable[agent.anchor.id].get(type.id, []))
+
+    @classmethod
+    def claim(
+        cls,
+        agent: "Agent",
+        type: Union[Frame, Effector],
+        holder: Any,
+        priority: float = 0.0,
+        on_preempt: Callable[[Effector], None] = None,
+    ) -> Union[None, Effector]:
+        """Claims the first available effector of `agent` that is a `type` for
+        `holder`, returning it, or None if there is none."""
+
+        with EffectorIndex._lock:
+            while True:
+                effector = EffectorIndex.available(agent, type)
+                if effector is None:
+                    return None
+                if (
+                    ReservationManager.claim(
+                        effector, holder, priority=priority, on_preempt=on_preempt
+                    )
+                    is not None
+                ):
+                    return effector
+
+    @classmethod
+    def preempt(
+        cls,
+        agent: "Agent",
+        type: Union[Frame, Effector],
+        holder: Any,
+        priority: float,
+        on_preempt: Callable[[Effector], None] = None,
+    ) -> Union[None, Effector]:
+        """Takes the interruptible effector of `agent` that is a `type` and holds
+        the lowest priority reservation below `priority`, returning it, or None
+        if there is no such effector (see ReservationManager.preempt)."""
+
+        with EffectorIndex._lock:
+            candidates = []
+            for effector in EffectorIndex.capable(agent, type):
+                reservation = ReservationManager.reservation(effector)
+                if reservation is None or reservation.priority >= priority:
+                    continue
+                if effector.interrupt() is None:
+                    continue
+                candidates.append((reservation.priority, effector))
+
+        for _, effector in sorted(candidates, key=lambda candidate: candidate[0]):
+            reservation = ReservationManager.preempt(
+                agent, effector, holder, priority, on_preempt=on_preempt
+            )
+            if reservation is not None:
+                return effector
+        return None
+
+    @classmethod
+    def update(cls, effector: str, available: bool):
+        with EffectorIndex._lock:
+            for agent in EffectorIndex._agents.get(effector, ()):
+                index = EffectorIndex._available.get(agent)
+                if index is None:
+                    continue
+                for type in EffectorIndex._types[effector]:
+                    effectors = index.setdefault(type, {})
+                    if available:
+                        effectors[effector] = Effector(Frame(effector))
+                    else:
+                        effectors.pop(effector, None)
+
+    @classmethod
+    def invalidate(cls, agent: "Agent" = None):
+        with EffectorIndex._lock:
+            if agent is None:
+                EffectorIndex._available = {}
+                EffectorIndex._capable = {}
+                EffectorIndex._types = {}
+                EffectorIndex._agents = {}
+                return
+
+            EffectorIndex._available.pop(agent.anchor.id, None)
+            EffectorIndex._capable.pop(agent.anchor.id, None)
+            for agents in EffectorIndex._agents.values():
+                agents.discard(agent.anchor.id)
+
+    @classmethod
+    def _index(cls, agent: "Agent") -> Dict[str, Dict[str, Effector]]:
+        index = EffectorIndex._available.get(agent.anchor.id)
+        if index is not None:
+            return index
+
+        index = {}
+        capable = {}
+        EffectorIndex._available[agent.anchor.id] = index
+        EffectorIndex._capable[agent.anchor.id] = capable
+        for effector in agent.effectors():
+            types = [effector.anchor.id]
+            types += list(
+                map(lambda ancestor: ancestor.id, effector.anchor.ancestors())
+            )
+            EffectorIndex._types[effector.anchor.id] = types
+            EffectorIndex._agents.setdefault(effector.anchor.id, set()).add(
+                agent.anchor.id
+            )
+            for type in types:
+                capable.setdefault(type, []).append(effector)
+
+            if ReservationManager.is_available(effector):
+                for type in types:
+                    index.setdefault(type, {})[effector.anchor.id] = effector
+        return index
+
+
+class EffectorQueue(object):
+    """Bounded, per-effector queues of work waiting for a busy effector, served
+    highest priority first as the effector is released."""
+
+    size = 16
+
+    _queues: Dict[str, List[Tuple[float, int, Any, Callable, Callable]]] = {}
+    _counter = itertools.count()
+    _lock = ReservationManager._lock
+
+    @classmethod
+    def push(
+        cls,
+        effector: Effector,
+        holder: Any,
+        start: Callable[[Effector], bool],
+        priority: float = 0.0,
+        on_preempt: Callable[[Effector], None] = None,
+    ) -> bool:
+        """Queues `start` for `effector`, returning False if its queue is full.
+        If the effector is already free, the work is started at once. The claim
+        made for the work carries `priority` and `on_preempt`."""
+
+        with EffectorQueue._lock:
+            queue = EffectorQueue._queues.setdefault(effector.anchor.id, [])
+            if len(queue) >= EffectorQueue.size:
+                return False
+            heapq.heappush(
+                queue,
+                (-priority, next(EffectorQueue._counter), holder, start, on_preempt),
+            )
+
+        EffectorQueue.drain(effector)
+        return True
+
+    @classmethod
+    def is_full(cls, effector: Effector) -> bool:
+        with EffectorQueue._lock:
+            queue = EffectorQueue._queues.get(effector.anchor.id, [])
+            return len(queue) >= EffectorQueue.size
+
+    @classmethod
+    def length(cls, effector: Effector) -> int:
+        with EffectorQueue._lock:
+            return len(EffectorQueue._queues.get(effector.anchor.id, []))
+
+    @classmethod
+    def holders(cls, effector: Effector) -> List[Any]:
+        with EffectorQueue._lock:
+            queue = sorted(EffectorQueue._queues.get(effector.anchor.id, []))
+        return list(map(lambda entry: entry[2], queue))
+
+    @classmethod
+    def drain(cls, effector: Effector):
+        while True:
+            with EffectorQueue._lock:
+                queue = EffectorQueue._queues.get(effector.anchor.id)
+                if not queue:
+                    return
+                if not ReservationManager.is_available(effector):
+                    return
+                priority, _, holder, start, on_preempt = heapq.heappop(queue)
+                reservation = ReservationManager.claim(
+                    effector, holder, priority=-priority, on_preempt=on_preempt
+                )
+
+            try:
+                started = start(effector)
+            except Exception:
+                logger.exception(
+                    "Could not start queued work on %s." % effector.anchor.id
+                )
+                started = False
+
+            if started is not False:
+                return
+            ReservationManager.release(effector, reservation=reservation, drain=False)
+
+    @classmethod
+    def clear(cls):
+        with EffectorQueue._lock:
+            EffectorQueue._queues = {}
+
+
+KnowledgeLoader.on_change(EffectorIndex.invalidate)
+Caches.on_reset(ReservationManager.clear)
+Caches.on_reset(EffectorIndex.invalidate)
+Caches.on_reset(EffectorQueue.clear)
@@ -1,4 +1,9 @@
 from ontoagent.engine.report import Report
+from ontoagent.engine.stats import ExecutableStats
+from ontoagent.engine.watchdog import Watchdog
+from typing import Callable
+import threading
+import time
 
 from typing import TYPE_CHECKING
 
@@ -10,26 +15,92 @@ if TYPE_CHECKING:
 
 class Executable(object):
 
+    _timeouts = threading.Lock()
+
     def _run(self, agent: "Agent", **kwargs) -> Report:
         raise NotImplementedError
 
+    def _run_watched(
+        self,
+        agent: "Agent",
+        timeout: float = None,
+        on_timeout: Callable[[], None] = None,
+        **kwargs
+    ) -> Report:
+        if timeout is None:
+            return self._run(agent, **kwargs)
+
+        token = Watchdog.watch(timeout, lambda: self.time_out(timeout, on_timeout))
+        try:
+            return self._run(agent, **kwargs)
+        finally:
+            Watchdog.unwatch(token)
+
     def run(self, *args):
         raise NotImplementedError
 
+    def cancel(self):
+        self._cancelled = True
+
+    def cancelled(self) -> bool:
+        # Long-running executables should check this regularly and return early.
+        return getattr(self, "_cancelled", False)
+
+    def timed_out(self) -> bool:
+        return getattr(self, "_timed_out", False)
+
+    def time_out(self, timeout: float, on_timeout: Callable[[], None] = None):
+        with Executable._timeouts:
+            if getattr(self, "_finished", False):
+                return
+            self._timed_out = True
+
+        self.cancel()
+
+        report = getattr(self, "report", None)
+        if report is not None:
+            report.set_status(Report.Status.TIMED_OUT)
+            report.set_message("Timed out after %s seconds." % timeout)
+
+        if on_timeout is not None:
+            on_timeout()
+
+    def _finish(self):
+        # A report that already timed out keeps its status.
+        with Executable._timeouts:
+            self._finished = True
+            if self.timed_out():
+                return
+        self.report.set_status(Report.Status.FINISHED)
+
+    def _record(
+        self, started: int, failed: bool = False, exception: BaseException = None
+    ):
+        ExecutableStats.record(
+            self.__class__,
+            time.monotonic_ns() - started,
+            failed=failed,
+            timed_out=self.timed_out(),
+            exception=exception,
+        )
+
 
 class HandleExecutable(Executable):
 
     def _run(self, agent: "Agent", **kwargs) -> Report:
+        started = time.monotonic_ns()
         self.report = Report.build(self.__class__)
 
         signal: Signal = kwargs["signal"] if "signal" in kwargs else None
         if signal is None:
             self.report.set_status(Report.Status.FAILED)
-            self.report.anchor["MESSAGE"] = "No signal provided."
+            self.report.set_message("No signal provided.")
+            self._record(started, failed=True)
             return self.report
 
         signal.add_report(self.report)
 
+        exception = None
         try:
             valid = self.validate(agent, signal)
             self.report.set_validation(valid)
@@ -37,8 +108,10 @@ class HandleExecutable(Executable):
                 self.run(agent, signal)
         except Exception as e:
             self.report.add_execution_exception(e)
+            exception = e
 
-        self.report.set_status(Report.Status.FINISHED)
+        self._finish()
+        self._record(started, exception=exception)
         return self.report
 
     def validate(self, agent: "Agent", signal: "Signal") -> bool:
@@ -51,9 +124,15 @@ class HandleExecutable(Executable):
 class ProactiveExecutable(Executable):
 
     def _run(self, agent: "Agent", **kwargs) -> Report:
+        started = time.monotonic_ns()
         self.report = Report.build(self.__class__)
-        self.run(agent)
-        self.report.set_status(Report.Status.FINISHED)
+        try:
+            self.run(agent)
+        except BaseException as e:
+            self._record(started, exception=e)
+            raise
+        self._finish()
+        self._record(started)
         return self.report
 
     def run(self, agent: "Agent"):
@@ -63,6 +142,7 @@ class ProactiveExecutable(Executable):
 class EffectorExecutable(Executable):
 
     def _run(self, agent: "Agent", **kwargs) -> Report:
+        started = time.monotonic_ns()
         self.report = Report.build(self.__class__)
 
         xmr: XMR = kwargs["xmr"] if "xmr" in kwargs else None
@@ -70,18 +150,25 @@ class EffectorExecutable(Executable):
 
         if xmr is None:
             self.report.set_status(Report.Status.FAILED)
-            self.report.anchor["MESSAGE"] = "No XMR provided."
+            self.report.set_message("No XMR provided.")
+            self._record(started, failed=True)
             return self.report
 
         xmr.add_report(self.report)
 
         if effector is None:
             self.report.set_status(Report.Status.FAILED)
-            self.report.anchor["MESSAGE"] = "No effector provided."
+            self.report.set_message("No effector provided.")
+            self._record(started, failed=True)
             return self.report
 
-        self.run(agent, xmr, effector)
-        self.report.set_status(Report.Status.FINISHED)
+        try:
+            self.run(agent, xmr, effector)
+        except BaseException as e:
+            self._record(started, exception=e)
+            raise
+        self._finish()
+        self._record(started)
         return self.report
 
     def run(self, agent: "Agent", xmr: "XMR", effector: "Effector"):
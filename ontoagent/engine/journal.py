@@ -0,0 +1,255 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
+from ontoagent.engine.signal import Signal
+from ontoagent.utils.serialization import decode_filler, encode_filler, frame_to_dict
+from ontograph.Frame import Frame
+from ontograph.Identifier import Identifier
+from ontograph.Space import Space
+from typing import Callable, Dict, Iterator, List, Set, Tuple
+import json
+import os
+import threading
+import time
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ontoagent.agent import Agent
+
+
+class SignalJournal(object):
+    """Append-only, one-JSON-record-per-line log of the signals the agent is
+    given and sends to its effectors, with every frame needed to rebuild them."""
+
+    _local = threading.local()
+    _replayed: Set[str] = set()
+    _replayed_lock = threading.Lock()
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    @contextmanager
+    def suppressed(cls):
+        # Replayed signals are already in the journal; don't record them again.
+        previous = SignalJournal.is_suppressed()
+        cls._local.suppressed = True
+        try:
+            yield
+        finally:
+            cls._local.suppressed = previous
+
+    @classmethod
+    def is_suppressed(cls) -> bool:
+        return getattr(SignalJournal._local, "suppressed", False)
+
+    @classmethod
+    def carry(cls, fn: Callable) -> Callable:
+        # Work dispatched while suppressed (e.g. a replayed input's handling,
+        # run on a worker) stays suppressed on whichever thread runs it.
+        if not SignalJournal.is_suppressed():
+            return fn
+
+        def _suppressed(*args, **kwargs):
+            with SignalJournal.suppressed():
+                return fn(*args, **kwargs)
+
+        return _suppressed
+
+    @classmethod
+    def queued(cls, signal: Signal):
+        # Queued signals are drained by whichever worker is free, so a replayed
+        # one is remembered by anchor rather than by thread.
+        if SignalJournal.is_suppressed():
+            with SignalJournal._replayed_lock:
+                SignalJournal._replayed.add(signal.anchor.id)
+
+    @classmethod
+    def drained(cls, signal: Signal) -> bool:
+        with SignalJournal._replayed_lock:
+            if signal.anchor.id not in SignalJournal._replayed:
+                return False
+            SignalJournal._replayed.discard(signal.anchor.id)
+            return True
+
+    def record(self, kind: str, signal: Signal):
+        if SignalJournal.is_suppressed():
+            return
+
+        self._write(
+            {
+                "kind": kind,
+                "recorded": time.time_ns(),
+                "type": encode_filler(type(signal)),
+                "anchor": signal.anchor.id,
+                "space": signal.space().name,
+                "frames": list(map(frame_to_dict, SignalJournal.frames(signal))),
+            }
+        )
+
+    def checkpoint(self, anchor: str, status: Signal.Status):
+        # Written when a signal is compacted away, so recovery knows it finished.
+        self._write(
+            {
+                "kind": "status",
+                "recorded": time.time_ns(),
+                "anchor": anchor,
+                "status": status.value,
+            }
+        )
+
+    def _write(self, record: dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @classmethod
+    def frames(cls, signal: Signal) -> List[Frame]:
+        frames = [signal.anchor] + signal.constituents()
+
+        space = signal.space()
+        if "#" in space.name:
+            frames += list(space)
+
+        unique = {}
+        for frame in frames:
+            unique[frame.id] = frame
+        return list(unique.values())
+
+
+class JournalReplay(object):
+    """Feeds the signals recorded in a SignalJournal back into an agent, rebuilt
+    in freshly allocated spaces; only "input" records by default."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def entries(self, kinds: Tuple[str, ...] = ("input",)) -> Iterator[dict]:
+        with open(self.path) as file:
+            for line in file:
+                line = line.strip()
+                if line == "":
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash mid-write leaves at most one partial, final record.
+                    continue
+                if kinds is None or entry["kind"] in kinds:
+                    yield entry
+
+    def restore(self, entry: dict) -> Signal:
+        source = entry["space"]
+        space = Space(source)
+        if "#" in source:
+            space = Signal.next_available_space(source.split("#")[0])
+
+        anchor_type = Identifier.parse(entry["anchor"])[1]
+        mapping: Dict[str, Frame] = {
+            entry["anchor"]: Frame("@IO.%s.?" % anchor_type),
+        }
+        for frame in entry["frames"]:
+            if Identifier.parse(frame["id"])[0] == source and "#" in source:
+                type = Identifier.parse(frame["id"])[1]
+                mapping[frame["id"]] = space.frame("@.%s.?" % type)
+
+        for frame in entry["frames"]:
+            target = mapping.get(frame["id"])
+            if target is None:
+                target = Frame(frame["id"])
+                if len(list(target.slots())) > 0:
+                    continue
+
+            for slot, facet, filler in frame["rows"]:
+                if frame["id"] == entry["anchor"] and slot in (
+                    "STATUS",
+                    "TIMESTAMP",
+                    "HAS-REPORT",
+                ):
+                    continue
+                filler = decode_filler(filler)
+                if isinstance(filler, Frame) and filler.id in mapping:
+                    filler = mapping[filler.id]
+                if slot == "SPACE" and filler == "@" + source:
+                    filler = "@" + space.name
+                target[slot][facet] += filler
+
+        signal = decode_filler(entry["type"])(mapping[entry["anchor"]])
+        signal.set_timestamp(time.time_ns())
+        signal.set_status(Signal.Status.RECEIVED)
+        return signal
+
+    def replay(
+        self,
+        agent: "Agent",
+        speed: float = None,
+        kinds: Tuple[str, ...] = ("input",),
+        join: bool = None,
+    ) -> List[Future]:
+        """Replays the journal into `agent`. With a `speed`, the recorded gaps
+        between signals are kept (scaled by 1/speed); without one, signals are
+        replayed as fast as the agent accepts them."""
+
+        futures = []
+        previous = None
+        started = time.monotonic()
+
+        for entry in self.entries(kinds=kinds):
+            if speed is not None and previous is not None:
+                started += (entry["recorded"] - previous) / 1e9 / speed
+                delay = started - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            previous = entry["recorded"]
+
+            signal = self.restore(entry)
+            with SignalJournal.suppressed():
+                if entry["kind"] == "input":
+                    futures.append(agent.input(signal, join=join))
+                else:
+                    futures.append(agent.handle(signal, join=join))
+
+        return futures
+
+    def recover(self, agent: "Agent", join: bool = None) -> List[Future]:
+        """Re-inputs every journaled input neither the graph nor the journal has
+        a record of finishing: signals still RECEIVED are input again as they
+        are, and signals missing from the graph (but not checkpointed as
+        compacted) are restored from the journal first."""
+
+        finished = set()
+        for entry in self.entries(kinds=("status",)):
+            if entry["status"] != Signal.Status.RECEIVED.value:
+                finished.add(entry["anchor"])
+
+        futures = []
+        for entry in self.entries():
+            if entry["anchor"] in finished:
+                continue
+            anchor = Frame(entry["anchor"])
+            if len(list(anchor.slots())) == 0:
+                signal = self.restore(entry)
+            else:
+                signal = decode_filler(entry["type"])(anchor)
+                if signal.status() != Signal.Status.RECEIVED:
+                    continue
+            with SignalJournal.suppressed():
+                futures.append(agent.input(signal, join=join))
+
+        return futures
@@ -1,17 +1,23 @@
-from ontoagent.engine.effector import Effector
+from ontoagent.engine.effector import Effector, ReservationManager
 from ontoagent.engine.executable import Executable
 from ontoagent.engine.report import Report
 from ontoagent.engine.signal import Signal, XMR
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.common import AnchoredObject
+from ontoagent.utils.loader import KnowledgeLoader
 from ontograph.Frame import Frame
 from ontograph.Space import Space
-from typing import List, Type, Union
+from typing import Dict, List, Type, Union
+import logging
+import threading
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ontoagent.agent import Agent
 
+logger = logging.getLogger(__name__)
+
 
 class Operation(AnchoredObject):
 
@@ -33,13 +39,31 @@ class Operation(AnchoredObject):
         xmr: XMR = None,
         effector: Effector = None,
     ) -> Report:
-        return self.executable()._run(agent, signal=signal, xmr=xmr, effector=effector)
+        # An operation that times out hands back any effector it was given, as
+        # long as it is still held under the reservation the operation began with.
+        on_timeout = None
+        if effector is not None:
+            reservation = ReservationManager.reservation(effector)
+            on_timeout = lambda: effector.release(reservation=reservation)
+
+        return self.executable()._run_watched(
+            agent,
+            timeout=self.timeout(),
+            on_timeout=on_timeout,
+            signal=signal,
+            xmr=xmr,
+            effector=effector,
+        )
 
     def executable(self) -> Executable:
-        return self.anchor["EXECUTABLE"].singleton()()
+        return self.executable_type()()
+
+    def executable_type(self) -> Type[Executable]:
+        return self.anchor["EXECUTABLE"].singleton()
 
     def set_executable(self, execute: Type[Executable]):
         self.anchor["EXECUTABLE"] = execute
+        DispatchTable.invalidate_operation(self.anchor)
 
     def requires_effector(self) -> Union[None, Effector]:
         if "REQUIRES-EFFECTOR" in self.anchor:
@@ -53,6 +77,122 @@ class Operation(AnchoredObject):
         if isinstance(effector, Effector):
             effector = effector.anchor
         self.anchor["REQUIRES-EFFECTOR"] = effector
+        DispatchTable.invalidate_operation(self.anchor)
+
+    def timeout(self) -> Union[None, float]:
+        if "TIMEOUT" in self.anchor:
+            return self.anchor["TIMEOUT"].singleton()
+        return None
+
+    def set_timeout(self, timeout: Union[None, float]):
+        self.anchor["TIMEOUT"] = [] if timeout is None else timeout
+        DispatchTable.invalidate_operation(self.anchor)
+
+    def after(self) -> List[Frame]:
+        return list(self.anchor["AFTER"])
+
+    def add_after(self, operation: Union[Frame, "Operation"]):
+        if isinstance(operation, Operation):
+            operation = operation.anchor
+        self.anchor["AFTER"] += operation
+        DispatchTable.invalidate_operation(self.anchor)
+
+    @classmethod
+    def ordered(cls, operations: List["Operation"]) -> List["Operation"]:
+        """Orders operations so that each one runs after every operation it
+        declares (with AFTER) that is also in the list, otherwise keeping the
+        given order."""
+
+        return Operation._schedule(operations)[0]
+
+    @classmethod
+    def layers(cls, operations: List["Operation"]) -> List[List["Operation"]]:
+        """Groups operations into layers that can each run concurrently, once all
+        previous layers have finished."""
+
+        order, depth = Operation._schedule(operations)
+
+        layers = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for operation in order:
+            layers[depth[operation.anchor.id]].append(operation)
+        return layers
+
+    @classmethod
+    def _schedule(cls, operations: List["Operation"]):
+        ids = set(map(lambda operation: operation.anchor.id, operations))
+        after = {}
+        for operation in operations:
+            dependencies = map(lambda frame: frame.id, operation.after())
+            after[operation.anchor.id] = set(filter(lambda id: id in ids, dependencies))
+
+        order = []
+        depth = {}
+        remaining = list(operations)
+        while len(remaining) > 0:
+            ready = None
+            for operation in remaining:
+                if after[operation.anchor.id].issubset(depth.keys()):
+                    ready = operation
+                    break
+
+            if ready is None:
+                logger.warning(
+                    "Circular AFTER dependencies between %s; running them in order."
+                    % ", ".join(map(lambda operation: operation.anchor.id, remaining))
+                )
+                ready = remaining[0]
+                after[ready.anchor.id] = after[ready.anchor.id] & depth.keys()
+
+            levels = map(lambda id: depth[id] + 1, after[ready.anchor.id])
+            depth[ready.anchor.id] = max(levels, default=0)
+            order.append(ready)
+            remaining.remove(ready)
+
+        return order, depth
+
+
+class CompiledOperation(Operation):
+    """An operation whose executable, required effector, timeout and dependencies
+    were read from the graph once, when its dispatch table entry was compiled."""
+
+    def __init__(
+        self,
+        anchor: Frame,
+        executable: Type[Executable],
+        effector: Union[None, Effector],
+        after: List[Frame] = None,
+        timeout: float = None,
+    ):
+        if after is None:
+            after = []
+
+        super().__init__(anchor)
+        self._executable = executable
+        self._effector = effector
+        self._after = after
+        self._timeout = timeout
+
+    @classmethod
+    def compile(cls, operation: Operation) -> "CompiledOperation":
+        return CompiledOperation(
+            operation.anchor,
+            operation.executable_type(),
+            operation.requires_effector(),
+            after=operation.after(),
+            timeout=operation.timeout(),
+        )
+
+    def timeout(self) -> Union[None, float]:
+        return self._timeout
+
+    def after(self) -> List[Frame]:
+        return self._after
+
+    def executable_type(self) -> Type[Executable]:
+        return self._executable
+
+    def requires_effector(self) -> Union[None, Effector]:
+        return self._effector
 
 
 class Operable(AnchoredObject):
@@ -64,6 +204,49 @@ class Operable(AnchoredObject):
         if isinstance(operation, Operation):
             operation = operation.anchor
         self.anchor["HAS-OPERATION"] += operation
+        DispatchTable.invalidate()
 
     def clear_operations(self):
         self.anchor["HAS-OPERATION"] = []
+        DispatchTable.invalidate()
+
+
+class DispatchTable(object):
+    """Compiled routes from a concept to its ordered operations, so that routing a
+    signal does no graph reads once its concept has been seen."""
+
+    _routes: Dict[str, List[CompiledOperation]] = {}
+    _generation = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def operations(cls, concept: Frame) -> List[CompiledOperation]:
+        routes = DispatchTable._routes.get(concept.id)
+        if routes is not None:
+            return routes
+
+        # Anything invalidated while this entry compiles must not be cached.
+        generation = DispatchTable._generation
+        routes = list(map(CompiledOperation.compile, Operable(concept).operations()))
+        with DispatchTable._lock:
+            if generation == DispatchTable._generation:
+                DispatchTable._routes[concept.id] = routes
+        return routes
+
+    @classmethod
+    def invalidate(cls):
+        with DispatchTable._lock:
+            DispatchTable._generation += 1
+            DispatchTable._routes = {}
+
+    @classmethod
+    def invalidate_operation(cls, operation: Frame):
+        with DispatchTable._lock:
+            DispatchTable._generation += 1
+            for concept, routes in list(DispatchTable._routes.items()):
+                if any(map(lambda route: route.anchor.id == operation.id, routes)):
+                    del DispatchTable._routes[concept]
+
+
+KnowledgeLoader.on_change(DispatchTable.invalidate)
+Caches.on_reset(DispatchTable.invalidate)
@@ -1,7 +1,13 @@
 from ontoagent.engine.executable import ProactiveExecutable
-from ontoagent.engine.operation import Operable, Operation
+from ontoagent.engine.operation import DispatchTable, Operable, Operation
+from ontoagent.utils.caches import Caches
+from ontoagent.utils.loader import KnowledgeLoader
+from ontograph.Frame import Frame
 from ontograph.Space import Space
-from typing import List, Type, Union
+from typing import Dict, List, Type, Union
+import random
+import threading
+import time
 
 from typing import TYPE_CHECKING
 
@@ -26,10 +32,205 @@ class Proactivity(Operable):
 
         return p
 
-    def run(self, agent: "Agent"):
-        for op in self.operations():
+    def run(self, agent: "Agent", now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        for op in DispatchTable.operations(self.anchor):
+            if not ProactivityScheduler.due(op, agent, now):
+                continue
             op.run(agent)
+            ProactivityScheduler.ran(op, now)
 
     def add_executable(self, executable: Type[ProactiveExecutable]):
         op = Operation.build("EXE", executable)
         self.add_operation(op)
+
+
+class ProactiveTrigger(object):
+    """A condition that lets a proactive operation run (see ProactiveOperation).
+    It is asked on every heartbeat the operation is not otherwise due, so it
+    should be cheap."""
+
+    def fire(self, agent: "Agent") -> bool:
+        raise NotImplementedError
+
+
+class ProactiveOperation(Operation):
+    """The scheduling slots (PERIOD, JITTER, CATCH-UP, TRIGGER and MIN-GAP) of
+    a proactive operation. An operation with none of them runs on every heartbeat."""
+
+    def period(self) -> Union[None, float]:
+        return self._slot("PERIOD")
+
+    def set_period(self, period: Union[None, float]):
+        self._set_slot("PERIOD", period)
+
+    def jitter(self) -> Union[None, float]:
+        return self._slot("JITTER")
+
+    def set_jitter(self, jitter: Union[None, float]):
+        self._set_slot("JITTER", jitter)
+
+    def catch_up(self) -> int:
+        catch_up = self._slot("CATCH-UP")
+        return 0 if catch_up is None else catch_up
+
+    def set_catch_up(self, catch_up: Union[None, int]):
+        self._set_slot("CATCH-UP", catch_up)
+
+    def trigger(self) -> Union[None, Type[ProactiveTrigger]]:
+        return self._slot("TRIGGER")
+
+    def set_trigger(self, trigger: Union[None, Type[ProactiveTrigger]]):
+        self._set_slot("TRIGGER", trigger)
+
+    def min_gap(self) -> Union[None, float]:
+        return self._slot("MIN-GAP")
+
+    def set_min_gap(self, min_gap: Union[None, float]):
+        self._set_slot("MIN-GAP", min_gap)
+
+    def _slot(self, slot: str):
+        if slot in self.anchor:
+            return self.anchor[slot].singleton()
+        return None
+
+    def _set_slot(self, slot: str, value):
+        self.anchor[slot] = [] if value is None else value
+        ProactivityScheduler.invalidate(self.anchor)
+
+
+class Schedule(object):
+
+    def __init__(
+        self,
+        period: float = None,
+        jitter: float = None,
+        catch_up: int = 0,
+        trigger: ProactiveTrigger = None,
+        min_gap: float = None,
+    ):
+        self.period = period
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.trigger = trigger
+        self.min_gap = min_gap
+
+        # When the next periodic run is due, without and with jitter.
+        self.base: float = None
+        self.due: float = None
+        self.last_run: float = None
+
+    @classmethod
+    def compile(cls, operation: Frame) -> "Schedule":
+        op = ProactiveOperation(operation)
+        trigger = op.trigger()
+        return Schedule(
+            period=op.period(),
+            jitter=op.jitter(),
+            catch_up=op.catch_up(),
+            trigger=None if trigger is None else trigger(),
+            min_gap=op.min_gap(),
+        )
+
+    def unscheduled(self) -> bool:
+        return self.period is None and self.trigger is None and self.min_gap is None
+
+    def is_due(self, agent: "Agent", now: float) -> bool:
+        if self.unscheduled():
+            return True
+
+        if self.min_gap is not None and self.last_run is not None:
+            if now - self.last_run < self.min_gap:
+                return False
+
+        if self.period is not None:
+            if self.due is None:
+                self.base = now
+                self.due = now + self._jitter()
+            if now >= self.due:
+                return True
+
+        if self.trigger is not None:
+            return self.trigger.fire(agent)
+
+        return self.period is None
+
+    def ran(self, now: float):
+        self.last_run = now
+
+        if self.period is not None and self.due is not None and now >= self.due:
+            # Keep at most `catch_up` missed runs owing and drop any beyond that,
+            # staying on the original period grid (jitter does not accumulate).
+            missed = int((now - self.base) // self.period)
+            self.base += max(1, missed + 1 - self.catch_up) * self.period
+            self.due = self.base + self._jitter()
+
+    def _jitter(self) -> float:
+        if not self.jitter:
+            return 0.0
+        return random.uniform(0.0, self.jitter)
+
+
+class ProactivityScheduler(object):
+    """Decides, on each heartbeat, which proactive operations are due (see
+    ProactiveOperation). Schedules are read from the graph once per operation
+    and dropped when its scheduling slots change or knowledge is loaded; the
+    time of each operation's last and next run is kept across that."""
+
+    _schedules: Dict[str, Schedule] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def due(cls, operation: Operation, agent: "Agent", now: float = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+
+        with ProactivityScheduler._lock:
+            schedule = ProactivityScheduler._schedule(operation)
+            return schedule.is_due(agent, now)
+
+    @classmethod
+    def ran(cls, operation: Operation, now: float = None):
+        if now is None:
+            now = time.monotonic()
+
+        with ProactivityScheduler._lock:
+            ProactivityScheduler._schedule(operation).ran(now)
+
+    @classmethod
+    def invalidate(cls, operation: Frame = None):
+        with ProactivityScheduler._lock:
+            if operation is None:
+                for id in list(ProactivityScheduler._schedules.keys()):
+                    ProactivityScheduler._recompile(id)
+            elif operation.id in ProactivityScheduler._schedules:
+                ProactivityScheduler._recompile(operation.id)
+
+    @classmethod
+    def clear(cls):
+        with ProactivityScheduler._lock:
+            ProactivityScheduler._schedules = {}
+
+    @classmethod
+    def _schedule(cls, operation: Operation) -> Schedule:
+        schedule = ProactivityScheduler._schedules.get(operation.anchor.id)
+        if schedule is None:
+            schedule = Schedule.compile(operation.anchor)
+            ProactivityScheduler._schedules[operation.anchor.id] = schedule
+        return schedule
+
+    @classmethod
+    def _recompile(cls, id: str):
+        previous = ProactivityScheduler._schedules[id]
+        schedule = Schedule.compile(Frame(id))
+        schedule.last_run = previous.last_run
+        if schedule.period is not None and schedule.period == previous.period:
+            schedule.base = previous.base
+            schedule.due = previous.due
+        ProactivityScheduler._schedules[id] = schedule
+
+
+KnowledgeLoader.on_change(ProactivityScheduler.invalidate)
+Caches.on_reset(ProactivityScheduler.clear)
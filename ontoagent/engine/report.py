@@ -1,51 +1,258 @@
+from collections import OrderedDict
 from enum import Enum
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.common import AnchoredObject
+from ontograph import graph
 from ontograph.Frame import Frame
-from typing import List, Type
+from typing import Any, Dict, List, Type
+import random
+import threading
 import time
 
 
 class Report(AnchoredObject):
+    """The outcome of one executable run; kept in memory (see ReportBuffer)
+    unless its persistence level writes it to the graph."""
 
     class Status(Enum):
         PENDING = "PENDING"
         FINISHED = "FINISHED"
         FAILED = "FAILED"
+        TIMED_OUT = "TIMED_OUT"
+
+    class Persistence(Enum):
+        NONE = "NONE"
+        FAILURES = "FAILURES"
+        SAMPLED = "SAMPLED"
+        ALL = "ALL"
+
+    persistence: Persistence = Persistence.ALL
+    sample_rate = 0.1
+    batch_size = 0
+
+    _lock = threading.RLock()
+
+    def __init__(self, anchor: Frame = None):
+        super().__init__(anchor)
+        self._rows: Dict[str, List[Any]] = {} if anchor is None else None
+        self._signal: Frame = None
 
     @classmethod
     def build(cls, executable: Type) -> "Report":
-        r = Report(Frame("@EXE.SYSTEM-REPORT.?").add_parent("@ONT.SYSTEM-REPORT"))
+        if Report.persistence == Report.Persistence.ALL and Report.batch_size == 0:
+            r = Report(Frame("@EXE.SYSTEM-REPORT.?").add_parent("@ONT.SYSTEM-REPORT"))
+        else:
+            r = Report()
+            ReportBuffer.add(r)
         r.set_executable(executable)
         r.set_status(Report.Status.PENDING)
         r.set_timestamp(time.time_ns())
         return r
 
+    def __eq__(self, other):
+        if self._rows is not None or (
+            isinstance(other, Report) and other._rows is not None
+        ):
+            return self is other
+        return super().__eq__(other)
+
+    def __hash__(self):
+        if self.anchor is None:
+            return id(self)
+        return super().__hash__()
+
+    def persisted(self) -> bool:
+        return self._rows is None
+
     def executable(self) -> Type:
-        return self.anchor["EXECUTABLE"].singleton()
+        return self._singleton("EXECUTABLE")
 
     def set_executable(self, executable: Type):
-        self.anchor["EXECUTABLE"] = executable
+        self._set("EXECUTABLE", executable)
 
     def status(self) -> Status:
-        return self.anchor["STATUS"].singleton()
+        return self._singleton("STATUS")
 
     def set_status(self, status: Status):
-        self.anchor["STATUS"] = status
+        self._set("STATUS", status)
+        if status != Report.Status.PENDING and not self.persisted():
+            ReportBuffer.finished(self)
 
     def validation(self) -> bool:
-        return self.anchor["VALIDATION"].singleton()
+        return self._singleton("VALIDATION")
 
     def set_validation(self, validation: bool):
-        self.anchor["VALIDATION"] = validation
+        self._set("VALIDATION", validation)
 
     def timestamp(self) -> int:
-        return self.anchor["TIMESTAMP"].singleton()
+        return self._singleton("TIMESTAMP")
 
     def set_timestamp(self, timestamp: int):
-        self.anchor["TIMESTAMP"] = timestamp
+        self._set("TIMESTAMP", timestamp)
+
+    def message(self) -> str:
+        fillers = self._fillers("MESSAGE")
+        return None if len(fillers) == 0 else fillers[0]
+
+    def set_message(self, message: str):
+        self._set("MESSAGE", message)
 
     def execution_exceptions(self) -> List[Exception]:
-        return list(self.anchor["WITH-EXECUTION-EXCEPTION"])
+        return self._fillers("WITH-EXECUTION-EXCEPTION")
 
     def add_execution_exception(self, exception: Exception):
+        with Report._lock:
+            if self._rows is not None:
+                self._rows.setdefault("WITH-EXECUTION-EXCEPTION", []).append(exception)
+                return
         self.anchor["WITH-EXECUTION-EXCEPTION"] += exception
+
+    def is_failure(self) -> bool:
+        if self.status() in [Report.Status.FAILED, Report.Status.TIMED_OUT]:
+            return True
+        return len(self.execution_exceptions()) > 0
+
+    def _singleton(self, slot: str) -> Any:
+        rows = self._rows
+        if rows is None:
+            return self.anchor[slot].singleton()
+        return rows.get(slot, [None])[0]
+
+    def _fillers(self, slot: str) -> List[Any]:
+        rows = self._rows
+        if rows is None:
+            return list(self.anchor[slot])
+        return list(rows.get(slot, []))
+
+    def _set(self, slot: str, value: Any):
+        with Report._lock:
+            if self._rows is not None:
+                self._rows[slot] = [value]
+                return
+        self.anchor[slot] = value
+
+    def _persist(self):
+        frame = Frame("@EXE.SYSTEM-REPORT.?").add_parent("@ONT.SYSTEM-REPORT")
+        with Report._lock:
+            if self._rows is None:
+                return
+            for slot, fillers in self._rows.items():
+                for filler in fillers:
+                    frame[slot] += filler
+            self.anchor = frame
+            self._rows = None
+
+        if self._signal is not None:
+            self._signal["HAS-REPORT"] += frame
+
+
+class ReportBuffer(object):
+    """Ring buffer of the most recent in-memory reports, indexed by signal, plus
+    the queue of finished reports waiting to be written to the graph."""
+
+    size = 1000
+
+    # Both keyed by id(report), in insertion order, so membership checks and
+    # removals do not scan the buffer.
+    _recent: Dict[int, Report] = OrderedDict()
+    _by_signal: Dict[str, List[Report]] = {}
+    _pending: Dict[int, Report] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def add(cls, report: Report):
+        with ReportBuffer._lock:
+            ReportBuffer._recent[id(report)] = report
+            while len(ReportBuffer._recent) > ReportBuffer.size:
+                _, evicted = ReportBuffer._recent.popitem(last=False)
+                if evicted._signal is not None:
+                    reports = ReportBuffer._by_signal.get(evicted._signal.id, [])
+                    if evicted in reports:
+                        reports.remove(evicted)
+                    if len(reports) == 0:
+                        ReportBuffer._by_signal.pop(evicted._signal.id, None)
+
+    @classmethod
+    def attach(cls, signal: Frame, report: Report):
+        with ReportBuffer._lock:
+            report._signal = signal
+            if id(report) in ReportBuffer._recent:
+                ReportBuffer._by_signal.setdefault(signal.id, []).append(report)
+
+    @classmethod
+    def reports_for(cls, signal: Frame) -> List[Report]:
+        with ReportBuffer._lock:
+            reports = list(ReportBuffer._by_signal.get(signal.id, []))
+        return list(filter(lambda report: not report.persisted(), reports))
+
+    @classmethod
+    def recent(cls, limit: int = None) -> List[Report]:
+        with ReportBuffer._lock:
+            reports = list(reversed(ReportBuffer._recent.values()))
+        if limit is not None:
+            reports = reports[0:limit]
+        return reports
+
+    @classmethod
+    def forget(cls, signal: Frame):
+        with ReportBuffer._lock:
+            reports = ReportBuffer._by_signal.pop(signal.id, [])
+            for report in reports:
+                ReportBuffer._recent.pop(id(report), None)
+                ReportBuffer._pending.pop(id(report), None)
+
+    @classmethod
+    def finished(cls, report: Report):
+        if not ReportBuffer.is_chosen(report):
+            return
+
+        with ReportBuffer._lock:
+            if id(report) in ReportBuffer._pending:
+                return
+            ReportBuffer._pending[id(report)] = report
+            full = len(ReportBuffer._pending) >= max(Report.batch_size, 1)
+
+        if full:
+            ReportBuffer.flush()
+
+    @classmethod
+    def is_chosen(cls, report: Report) -> bool:
+        if Report.persistence == Report.Persistence.ALL:
+            return True
+        if Report.persistence == Report.Persistence.NONE:
+            return False
+        if report.is_failure():
+            return True
+        if Report.persistence == Report.Persistence.SAMPLED:
+            # Decide once per report, so a report re-finishing is not re-rolled.
+            if not hasattr(report, "_sampled"):
+                report._sampled = random.random() < Report.sample_rate
+            return report._sampled
+        return False
+
+    @classmethod
+    def flush(cls) -> int:
+        with ReportBuffer._lock:
+            reports = list(ReportBuffer._pending.values())
+            ReportBuffer._pending = {}
+
+        if len(reports) == 0:
+            return 0
+
+        graph.driver.disable_auto_commit()
+        try:
+            for report in reports:
+                report._persist()
+        finally:
+            graph.driver.enable_auto_commit(commit_now=True)
+        return len(reports)
+
+    @classmethod
+    def clear(cls):
+        with ReportBuffer._lock:
+            ReportBuffer._recent = OrderedDict()
+            ReportBuffer._by_signal = {}
+            ReportBuffer._pending = {}
+
+
+Caches.on_reset(ReportBuffer.clear)
@@ -0,0 +1,163 @@
+from ontoagent.engine.journal import SignalJournal
+from ontoagent.engine.report import ReportBuffer
+from ontoagent.engine.signal import Signal, SignalIndex
+from ontoagent.utils.common import StoppableThread
+from ontoagent.utils.serialization import erase_frame, frame_to_dict
+from ontoagent.views.agenda import Agenda
+from ontograph import graph
+from ontograph.Frame import Frame
+from ontograph.Identifier import Identifier
+from typing import Callable, List, Set
+import bisect
+import json
+import threading
+import time
+
+
+class RetentionPolicy(object):
+    """Decides which CONSUMED and REJECTED signals to keep, and removes the rest
+    along with their reports, constituents and dedicated spaces."""
+
+    def __init__(
+        self,
+        keep_last: int = None,
+        keep_for: float = None,
+        keep_failed: bool = False,
+        archive: Callable[[Signal], None] = None,
+        batch_size: int = 100,
+        journal: SignalJournal = None,
+        agendas: List[Agenda] = None,
+    ):
+        self.keep_last = keep_last
+        self.keep_for = keep_for
+        self.keep_failed = keep_failed
+        self.archive = archive
+        self.batch_size = batch_size
+        self.journal = journal
+        # Signals that live goals and steps on these agendas still refer to are
+        # never removed.
+        self.agendas = [] if agendas is None else agendas
+
+        # Signals found to have failed (kept with keep_failed) are not read again.
+        self._failed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def candidates(self, status: Signal.Status) -> List[Signal]:
+        entries = SignalIndex.entries(status)
+
+        if self.keep_last is not None:
+            entries = entries[0 : max(len(entries) - self.keep_last, 0)]
+
+        if self.keep_for is not None:
+            cutoff = time.time_ns() - int(self.keep_for * 1e9)
+            entries = entries[0 : bisect.bisect_left(entries, (cutoff,))]
+
+        return list(map(lambda entry: Signal(Frame(entry[1])), entries))
+
+    def compact(self) -> int:
+        # Only one compaction runs at a time; a pass removes at most one batch.
+        if not self._lock.acquire(blocking=False):
+            return 0
+
+        try:
+            references = self.references()
+            spaces = set(map(lambda id: Identifier.parse(id)[0], references))
+
+            removed = 0
+            for status in [Signal.Status.CONSUMED, Signal.Status.REJECTED]:
+                for signal in self.candidates(status):
+                    if removed >= self.batch_size:
+                        return removed
+                    if signal.anchor.id in references:
+                        continue
+                    space = signal.space().name
+                    if "#" in space and space in spaces:
+                        continue
+                    if self.keep_failed:
+                        if signal.anchor.id in self._failed:
+                            continue
+                        if self.is_failed(signal):
+                            self._failed.add(signal.anchor.id)
+                            continue
+                    if self.archive is not None:
+                        self.archive(signal)
+                    # Checkpointed first, so recovery never restores it.
+                    if self.journal is not None:
+                        self.journal.checkpoint(signal.anchor.id, status)
+                    self.remove(signal)
+                    removed += 1
+            return removed
+        finally:
+            self._lock.release()
+
+    def references(self) -> Set[str]:
+        references = set()
+        for agenda in self.agendas:
+            references.update(agenda.references())
+        return references
+
+    @classmethod
+    def is_failed(cls, signal: Signal) -> bool:
+        return any(map(lambda report: report.is_failure(), signal.reports()))
+
+    @classmethod
+    def remove(cls, signal: Signal):
+        for report in signal.reports():
+            if report.persisted():
+                erase_frame(report.anchor)
+        ReportBuffer.forget(signal.anchor)
+
+        # Only spaces allocated for this signal (e.g. TMR#12) are removed whole;
+        # constituents that live elsewhere (such as agenda steps) are left alone.
+        # Finished goals and steps may be left referring to erased frames.
+        space = signal.space()
+        if "#" in space.name:
+            for frame in list(space):
+                erase_frame(frame)
+
+        SignalIndex.remove(signal.anchor.id)
+        erase_frame(signal.anchor)
+
+
+class JSONLinesArchive(object):
+    """Appends each archived signal, its constituents and its reports to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, signal: Signal):
+        frames = [signal.anchor] + signal.constituents()
+        reports = filter(lambda report: report.persisted(), signal.reports())
+        frames += list(map(lambda report: report.anchor, reports))
+
+        record = {
+            "signal": signal.anchor.id,
+            "archived": time.time_ns(),
+            "frames": list(map(lambda frame: frame_to_dict(frame), frames)),
+        }
+
+        with self._lock:
+            with open(self.path, "a") as file:
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class RetentionThread(StoppableThread):
+
+    def __init__(self, policy: RetentionPolicy, interval: float = 5.0):
+        self.policy = policy
+        self.interval = interval
+        super().__init__()
+        self.daemon = True
+
+    def run(self):
+        while not self.stopped():
+            self._stop_event.wait(self.interval)
+            if self.stopped():
+                break
+            # Keep compacting while there is a backlog, one batch at a time.
+            while (
+                not self.stopped() and self.policy.compact() >= self.policy.batch_size
+            ):
+                pass
+        graph.driver.close_connection()
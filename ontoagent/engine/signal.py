@@ -1,18 +1,66 @@
 from enum import Enum
-from ontoagent.engine.report import Report
+from ontoagent.engine.report import Report, ReportBuffer
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.common import AnchoredObject
+from ontoagent.utils.loader import KnowledgeLoader
 from ontograph import graph
 from ontograph.Frame import Frame
 from ontograph.Space import Space
-from typing import List, Union
+from typing import Dict, List, Tuple, Union
+import bisect
+import threading
 import time
 
 
+class SpaceAllocator(object):
+    """Hands out numbered spaces (e.g. XMR#12) from a per-header counter kept on
+    @SYS.SPACE-ALLOCATOR, so allocation is O(1) and the counter survives restarts.
+    The first allocation for a header seeds the counter from the spaces that
+    already exist in the graph."""
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def allocate(cls, header: str) -> Space:
+        allocator = Frame("@SYS.SPACE-ALLOCATOR")
+        slot = "LAST-" + header
+
+        with SpaceAllocator._lock:
+            if slot in allocator:
+                last = allocator[slot].singleton()
+            else:
+                last = cls._scan(header)
+
+            # Skip any number already in use, e.g. a space created by hand or by
+            # another process sharing the graph.
+            space = Space(header + "#" + str(last + 1))
+            while len(list(space)) > 0:
+                last += 1
+                space = Space(header + "#" + str(last + 1))
+
+            allocator[slot] = last + 1
+
+        return space
+
+    @classmethod
+    def _scan(cls, header: str) -> int:
+        spaces = list(graph)
+        spaces = filter(lambda space: space.name.startswith(header + "#"), spaces)
+        spaces = map(lambda space: int(space.name.replace(header + "#", "")), spaces)
+        spaces = list(spaces)
+
+        return 0 if len(spaces) == 0 else max(spaces)
+
+
 class Signal(AnchoredObject):
 
     class Status(Enum):
         RECEIVED = "RECEIVED"
         CONSUMED = "CONSUMED"
+        REJECTED = "REJECTED"
+
+    # Root concepts, keyed by the (ontological) parents of a signal's root.
+    _concepts: Dict[Tuple[str, ...], Frame] = {}
 
     @classmethod
     def build(
@@ -50,13 +98,7 @@ class Signal(AnchoredObject):
         if header is None:
             header = "XMR"
 
-        spaces = list(graph)
-        spaces = filter(lambda space: space.name.startswith(header + "#"), spaces)
-        spaces = map(lambda space: int(space.name.replace(header + "#", "")), spaces)
-        spaces = list(spaces)
-
-        next = 1 if len(spaces) == 0 else max(spaces) + 1
-        return Space(header + "#" + str(next))
+        return SpaceAllocator.allocate(header)
 
     def status(self) -> Status:
         try:
@@ -66,6 +108,7 @@ class Signal(AnchoredObject):
 
     def set_status(self, status: Status):
         self.anchor["STATUS"] = status
+        SignalIndex.update(self.anchor.id, status)
 
     def root(self) -> Frame:
         return self.anchor["ROOT"].singleton()
@@ -78,18 +121,37 @@ class Signal(AnchoredObject):
 
     def set_timestamp(self, timestamp: int):
         self.anchor["TIMESTAMP"] = timestamp
+        SignalIndex.update_timestamp(self.anchor.id, timestamp)
 
     def get_root_concept(self) -> Frame:
         root = self.root()
         if root.space() == "ONT":
             return root
 
+        # Roots are fresh instances, but their parents are (almost always) concepts;
+        # the walk up the ontology is only needed once per distinct set of parents.
+        # Roots with instance parents are never cached, as those can change freely.
+        parents = root.parents()
+        key = tuple(sorted(map(lambda parent: parent.id, parents)))
+        cacheable = len(parents) > 0 and all(
+            map(lambda parent: parent.space() == "ONT", parents)
+        )
+
+        if cacheable and key in Signal._concepts:
+            return Signal._concepts[key]
+
         for a in root.ancestors():
             if a.space() == "ONT":
+                if cacheable:
+                    Signal._concepts[key] = a
                 return a
 
         raise Exception("Signal %s has no ontological root." % self.anchor.id)
 
+    @classmethod
+    def clear_concept_cache(cls):
+        Signal._concepts = {}
+
     def space(self) -> Space:
         return Space(self.anchor["SPACE"].singleton().replace("@", "", 1))
 
@@ -105,14 +167,134 @@ class Signal(AnchoredObject):
         self.anchor["HAS-CONSTITUENT"] += constituent
 
     def reports(self) -> List[Report]:
-        return list(map(lambda r: Report(r), self.anchor["HAS-REPORT"]))
+        reports = list(map(lambda r: Report(r), self.anchor["HAS-REPORT"]))
+        return reports + ReportBuffer.reports_for(self.anchor)
 
     def add_report(self, report: Union[Frame, Report]):
         if isinstance(report, Report):
+            # In-memory reports are linked to the signal when they are flushed.
+            if not report.persisted():
+                ReportBuffer.attach(self.anchor, report)
+                return
             report = report.anchor
         self.anchor["HAS-REPORT"] += report
 
 
+KnowledgeLoader.on_change(Signal.clear_concept_cache)
+
+
+class SignalIndex(object):
+    """In-memory index from signal status to signal anchors, ordered by TIMESTAMP
+    and built from Space("IO") the first time it is queried."""
+
+    _loaded = False
+    _entries = {}
+    _by_status = {}
+    _timestamps = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def update(cls, anchor: str, status: Signal.Status):
+        with SignalIndex._lock:
+            if not SignalIndex._loaded:
+                return
+            timestamp = SignalIndex._timestamps.get(anchor)
+            if timestamp is None:
+                frame = Frame(anchor)
+                timestamp = (
+                    frame["TIMESTAMP"].singleton() if "TIMESTAMP" in frame else 0
+                )
+            cls._index(anchor, status, timestamp)
+
+    @classmethod
+    def update_timestamp(cls, anchor: str, timestamp: int):
+        with SignalIndex._lock:
+            if not SignalIndex._loaded:
+                return
+            SignalIndex._timestamps[anchor] = timestamp
+            if anchor in SignalIndex._entries:
+                cls._index(anchor, SignalIndex._entries[anchor][0], timestamp)
+
+    @classmethod
+    def signals(
+        cls,
+        status: Signal.Status,
+        offset: int = 0,
+        limit: int = None,
+        newest_first: bool = False,
+    ) -> List[Signal]:
+        with SignalIndex._lock:
+            cls._load()
+            entries = SignalIndex._by_status.get(status, [])
+            if newest_first:
+                start = max(len(entries) - offset, 0)
+                stop = 0 if limit is None else max(start - limit, 0)
+                page = entries[stop:start][::-1]
+            else:
+                stop = None if limit is None else offset + limit
+                page = entries[offset:stop]
+        return list(map(lambda entry: Signal(Frame(entry[1])), page))
+
+    @classmethod
+    def entries(cls, status: Signal.Status) -> List[Tuple[int, str]]:
+        """The (timestamp, anchor id) of each signal with the status, oldest
+        first."""
+
+        with SignalIndex._lock:
+            cls._load()
+            return list(SignalIndex._by_status.get(status, []))
+
+    @classmethod
+    def count(cls, status: Signal.Status) -> int:
+        with SignalIndex._lock:
+            cls._load()
+            return len(SignalIndex._by_status.get(status, []))
+
+    @classmethod
+    def remove(cls, anchor: str):
+        with SignalIndex._lock:
+            cls._unindex(anchor)
+            SignalIndex._timestamps.pop(anchor, None)
+
+    @classmethod
+    def clear(cls):
+        with SignalIndex._lock:
+            SignalIndex._loaded = False
+            SignalIndex._entries = {}
+            SignalIndex._by_status = {}
+            SignalIndex._timestamps = {}
+
+    @classmethod
+    def _load(cls):
+        if SignalIndex._loaded:
+            return
+
+        SignalIndex._loaded = True
+        for frame in Space("IO"):
+            if "STATUS" not in frame or "TIMESTAMP" not in frame:
+                continue
+            timestamp = frame["TIMESTAMP"].singleton()
+            SignalIndex._timestamps[frame.id] = timestamp
+            cls._index(frame.id, frame["STATUS"].singleton(), timestamp)
+
+    @classmethod
+    def _index(cls, anchor: str, status: Signal.Status, timestamp: int):
+        cls._unindex(anchor)
+        entries = SignalIndex._by_status.setdefault(status, [])
+        bisect.insort(entries, (timestamp, anchor))
+        SignalIndex._entries[anchor] = (status, timestamp)
+
+    @classmethod
+    def _unindex(cls, anchor: str):
+        if anchor not in SignalIndex._entries:
+            return
+        status, timestamp = SignalIndex._entries.pop(anchor)
+        entries = SignalIndex._by_status[status]
+        i = bisect.bisect_left(entries, (timestamp, anchor))
+        if i < len(entries) and entries[i] == (timestamp, anchor):
+            del entries[i]
+
+
 class XMR(Signal):
 
     @classmethod
@@ -183,3 +365,7 @@ class VMR(XMR):
 
         xmr = super().build(root, space=space, anchor=anchor)
         return VMR(xmr.anchor)
+
+
+Caches.on_reset(Signal.clear_concept_cache)
+Caches.on_reset(SignalIndex.clear)
@@ -0,0 +1,121 @@
+from ontoagent.utils.caches import Caches
+from typing import Dict, List, Type
+import bisect
+import threading
+
+
+class LatencyHistogram(object):
+    """Fixed, log-spaced latency buckets (about 19% apart, from 10us to over an
+    hour), so recording is a bisect and percentiles are accurate to a bucket."""
+
+    BOUNDS_NS: List[int] = [int(10_000 * 1.19**i) for i in range(150)]
+
+    def __init__(self):
+        self.counts = [0] * (len(LatencyHistogram.BOUNDS_NS) + 1)
+        self.total = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns: int):
+        self.counts[bisect.bisect_left(LatencyHistogram.BOUNDS_NS, duration_ns)] += 1
+        self.total += 1
+        self.max_ns = max(self.max_ns, duration_ns)
+
+    def percentile(self, p: float) -> int:
+        if self.total == 0:
+            return 0
+
+        rank = p * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if i == len(LatencyHistogram.BOUNDS_NS):
+                    return self.max_ns
+                return min(LatencyHistogram.BOUNDS_NS[i], self.max_ns)
+        return self.max_ns
+
+
+class ExecutableStatistics(object):
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.exceptions: Dict[str, int] = {}
+        self.total_ns = 0
+        self.histogram = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        return {
+            "executable": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "exceptions": dict(self.exceptions),
+            "mean-ms": 0.0 if self.calls == 0 else self.total_ns / self.calls / 1e6,
+            "max-ms": self.histogram.max_ns / 1e6,
+            "p50-ms": self.histogram.percentile(0.50) / 1e6,
+            "p95-ms": self.histogram.percentile(0.95) / 1e6,
+            "p99-ms": self.histogram.percentile(0.99) / 1e6,
+        }
+
+
+class ExecutableStats(object):
+    """Call counts, failures, exception types and latency per executable class,
+    kept in memory and fed by every executable run."""
+
+    enabled = True
+
+    _stats: Dict[str, ExecutableStatistics] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def name_of(cls, executable: Type) -> str:
+        return executable.__module__ + "." + executable.__qualname__
+
+    @classmethod
+    def record(
+        cls,
+        executable: Type,
+        duration_ns: int,
+        failed: bool = False,
+        timed_out: bool = False,
+        exception: BaseException = None,
+    ):
+        if not ExecutableStats.enabled:
+            return
+
+        name = ExecutableStats.name_of(executable)
+        with ExecutableStats._lock:
+            stats = ExecutableStats._stats.get(name)
+            if stats is None:
+                stats = ExecutableStatistics(name)
+                ExecutableStats._stats[name] = stats
+
+            stats.calls += 1
+            stats.total_ns += duration_ns
+            stats.histogram.record(duration_ns)
+            if failed or timed_out or exception is not None:
+                stats.failures += 1
+            if timed_out:
+                stats.timeouts += 1
+            if exception is not None:
+                type_name = type(exception).__name__
+                stats.exceptions[type_name] = stats.exceptions.get(type_name, 0) + 1
+
+    @classmethod
+    def stats(cls, executable: Type = None) -> Dict[str, dict]:
+        with ExecutableStats._lock:
+            if executable is not None:
+                stats = ExecutableStats._stats.get(ExecutableStats.name_of(executable))
+                return {} if stats is None else {stats.name: stats.to_dict()}
+            return {name: s.to_dict() for name, s in ExecutableStats._stats.items()}
+
+    @classmethod
+    def clear(cls):
+        with ExecutableStats._lock:
+            ExecutableStats._stats = {}
+
+
+Caches.on_reset(ExecutableStats.clear)
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from ontoagent.engine.signal import Signal
+from ontoagent.utils.caches import Caches
+from typing import Dict, Iterator, List, Union
+import json
+import threading
+import time
+
+
+class Span(object):
+
+    def __init__(
+        self, trace: str, name: str, start: int, end: int, attributes: dict = None
+    ):
+        if attributes is None:
+            attributes = {}
+
+        self.trace = trace
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attributes = attributes
+
+    def duration_ms(self) -> float:
+        return (self.end - self.start) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "trace": self.trace,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration-ms": self.duration_ms(),
+            "attributes": self.attributes,
+        }
+
+
+class Tracer(object):
+    """Keeps timed spans for the most recent signals in memory, one trace per
+    input shared by every signal derived from it."""
+
+    enabled = True
+    max_traces = 1000
+
+    _traces: Dict[str, List[Span]] = OrderedDict()
+    _links: Dict[str, str] = OrderedDict()
+    _local = threading.local()
+    _lock = threading.RLock()
+
+    @classmethod
+    def trace_of(cls, signal: Union[Signal, str]) -> str:
+        if isinstance(signal, Signal):
+            signal = signal.anchor.id
+        with Tracer._lock:
+            return Tracer._links.get(signal, signal)
+
+    @classmethod
+    def link(cls, signal: Signal, origin: Union[Signal, str]):
+        if not Tracer.enabled:
+            return
+
+        trace = Tracer.trace_of(origin)
+        with Tracer._lock:
+            if signal.anchor.id == trace or signal.anchor.id in Tracer._links:
+                return
+            Tracer._links[signal.anchor.id] = trace
+            while len(Tracer._links) > Tracer.max_traces * 4:
+                Tracer._links.popitem(last=False)
+
+    @classmethod
+    def current(cls) -> Union[str, None]:
+        stack = getattr(Tracer._local, "stack", None)
+        if not stack:
+            return None
+        return stack[-1]
+
+    @classmethod
+    def record(
+        cls, signal: Union[Signal, str], name: str, start: int, end: int, **attributes
+    ):
+        if not Tracer.enabled:
+            return
+
+        trace = Tracer.trace_of(signal)
+        span = Span(trace, name, start, end, attributes=attributes)
+
+        with Tracer._lock:
+            if trace not in Tracer._traces:
+                Tracer._traces[trace] = []
+                while len(Tracer._traces) > Tracer.max_traces:
+                    Tracer._traces.popitem(last=False)
+            Tracer._traces[trace].append(span)
+
+    @classmethod
+    @contextmanager
+    def span(cls, signal: Union[Signal, str], name: str, **attributes) -> Iterator:
+        if not Tracer.enabled:
+            yield
+            return
+
+        trace = Tracer.trace_of(signal)
+        if not hasattr(Tracer._local, "stack"):
+            Tracer._local.stack = []
+
+        Tracer._local.stack.append(trace)
+        start = time.time_ns()
+        try:
+            yield
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            Tracer._local.stack.pop()
+            Tracer.record(trace, name, start, time.time_ns(), **attributes)
+
+    @classmethod
+    def spans(cls, signal: Union[Signal, str]) -> List[Span]:
+        trace = Tracer.trace_of(signal)
+        with Tracer._lock:
+            spans = list(Tracer._traces.get(trace, []))
+        return sorted(spans, key=lambda span: span.start)
+
+    @classmethod
+    def traces(cls, limit: int = None) -> List[str]:
+        with Tracer._lock:
+            traces = list(reversed(Tracer._traces.keys()))
+        if limit is not None:
+            traces = traces[0:limit]
+        return traces
+
+    @classmethod
+    def to_dict(cls, signal: Union[Signal, str]) -> dict:
+        spans = Tracer.spans(signal)
+
+        total = 0.0
+        if len(spans) > 0:
+            end = max(map(lambda span: span.end, spans))
+            total = (end - spans[0].start) / 1e6
+
+        return {
+            "trace": Tracer.trace_of(signal),
+            "total-ms": total,
+            "spans": list(map(lambda span: span.to_dict(), spans)),
+        }
+
+    @classmethod
+    def export(cls, path: str, limit: int = None) -> int:
+        """Appends the given number of most recent traces (all by default) to
+        `path`, one JSON record per line, and returns how many were written."""
+
+        traces = Tracer.traces(limit=limit)
+        with open(path, "a") as file:
+            for trace in reversed(traces):
+                file.write(json.dumps(Tracer.to_dict(trace)) + "\n")
+        return len(traces)
+
+    @classmethod
+    def clear(cls):
+        with Tracer._lock:
+            Tracer._traces.clear()
+            Tracer._links.clear()
+
+
+Caches.on_reset(Tracer.clear)
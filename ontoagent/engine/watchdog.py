@@ -0,0 +1,74 @@
+from typing import Callable, Dict, List, Tuple
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Watchdog(object):
+    """A single daemon thread that calls back when watched work overruns its
+    deadline. Callbacks run on the watchdog thread, so they must be quick."""
+
+    _deadlines: List[Tuple[float, int]] = []
+    _callbacks: Dict[int, Callable[[], None]] = {}
+    _counter = itertools.count()
+    _condition = threading.Condition()
+    _thread: threading.Thread = None
+
+    fired = 0
+
+    @classmethod
+    def watch(cls, timeout: float, callback: Callable[[], None]) -> int:
+        token = next(Watchdog._counter)
+        with Watchdog._condition:
+            heapq.heappush(Watchdog._deadlines, (time.monotonic() + timeout, token))
+            Watchdog._callbacks[token] = callback
+
+            if Watchdog._thread is None or not Watchdog._thread.is_alive():
+                Watchdog._thread = threading.Thread(
+                    target=Watchdog._run, name="watchdog", daemon=True
+                )
+                Watchdog._thread.start()
+            Watchdog._condition.notify()
+        return token
+
+    @classmethod
+    def unwatch(cls, token: int):
+        # The deadline stays in the heap and is skipped when it comes up.
+        with Watchdog._condition:
+            Watchdog._callbacks.pop(token, None)
+
+    @classmethod
+    def watching(cls) -> int:
+        with Watchdog._condition:
+            return len(Watchdog._callbacks)
+
+    @classmethod
+    def _run(cls):
+        while True:
+            with Watchdog._condition:
+                while len(Watchdog._deadlines) > 0:
+                    deadline, token = Watchdog._deadlines[0]
+                    if token not in Watchdog._callbacks:
+                        heapq.heappop(Watchdog._deadlines)
+                        continue
+                    if deadline <= time.monotonic():
+                        break
+                    Watchdog._condition.wait(deadline - time.monotonic())
+                else:
+                    Watchdog._condition.wait()
+                    continue
+
+                heapq.heappop(Watchdog._deadlines)
+                callback = Watchdog._callbacks.pop(token, None)
+                if callback is None:
+                    continue
+                Watchdog.fired += 1
+
+            try:
+                callback()
+            except Exception:
+                logger.exception("Watchdog callback failed.")
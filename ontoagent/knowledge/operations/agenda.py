@@ -1,11 +1,26 @@
-from ontoagent.engine.effector import Effector
+from ontoagent.engine.changes import ChangeTracker
+from ontoagent.engine.effector import (
+    Effector,
+    EffectorIndex,
+    EffectorQueue,
+    ReservationManager,
+)
 from ontoagent.engine.executable import HandleExecutable, ProactiveExecutable
 from ontoagent.engine.signal import Signal, XMR
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.instancing import instanceof, Instantiable
 from ontoagent.utils.states import does_state_exist
-from ontoagent.views.agenda import Goal, Impasse, Option, Plan, Step
+from ontoagent.views.agenda import (
+    Goal,
+    Impasse,
+    Option,
+    OptionPool,
+    OptionScores,
+    Plan,
+    Step,
+)
 from ontograph.Frame import Frame
-from typing import Iterable, List
+from typing import Callable, Dict, Iterable, List, Tuple
 import time
 
 from typing import TYPE_CHECKING
@@ -58,12 +73,44 @@ class AddGoalInstanceExecutable(HandleExecutable):
 
 class ProcessAgendaExecutable(ProactiveExecutable):
 
+    # Without any tracked change (see ChangeTracker), the agenda is still
+    # processed this often, in seconds, to pick up changes made directly in the
+    # graph (e.g. to the environment an impasse detector looks at). None turns
+    # this off.
+    idle_interval = 5.0
+
+    _processed: Dict[str, Tuple[int, float]] = {}
+
     def run(self, agent: "Agent"):
-        self.handle_impasses(agent)
-        self.generate_options(agent)
-        effectors_map = self.select_options(agent)
-        self.queue_options(agent, effectors_map)
-        self.cleanup(agent)
+        # Taken before processing, so changes made by this pass (e.g. a step
+        # finishing during cleanup) cause one more.
+        scope = agent.agenda().anchor.id
+        generation = ChangeTracker.generation(scope)
+        if not self.is_dirty(agent, generation):
+            return
+
+        with ChangeTracker.scope(scope):
+            self.handle_impasses(agent)
+            scores = self.generate_options(agent)
+            effectors_map = self.select_options(agent, scores)
+            self.queue_options(agent, effectors_map)
+            self.cleanup(agent)
+
+        ProcessAgendaExecutable._processed[agent.anchor.id] = (
+            generation,
+            time.monotonic(),
+        )
+
+    def is_dirty(self, agent: "Agent", generation: int) -> bool:
+        processed = ProcessAgendaExecutable._processed.get(agent.anchor.id)
+        if processed is None or processed[0] != generation:
+            return True
+        interval = ProcessAgendaExecutable.idle_interval
+        return interval is not None and time.monotonic() - processed[1] >= interval
+
+    @classmethod
+    def clear(cls):
+        ProcessAgendaExecutable._processed = {}
 
     def handle_impasses(self, agent: "Agent"):
         agenda = agent.agenda()
@@ -116,10 +163,14 @@ class ProcessAgendaExecutable(ProactiveExecutable):
                             if impasse.detect()(step).detect():
                                 _build_impasse(step, impasse)
 
-    def generate_options(self, agent: "Agent"):
+    def generate_options(self, agent: "Agent") -> Dict[Frame, float]:
+        # Returns the score of each option built, for select_options to order
+        # them by without reading the scores back from the graph.
         agenda = agent.agenda()
 
         timestamp = time.time_ns()
+        weights = OptionScores.weights(agent)
+        scores = {}
 
         for goal in agenda.goals():
             for plan in goal.plans():
@@ -128,66 +179,72 @@ class ProcessAgendaExecutable(ProactiveExecutable):
                         continue
                     if step.status() == Step.Status.PLANNED:
                         option = Option.build(goal, plan, step, timestamp=timestamp)
-
-                        priority_weight = (
-                            1.0
-                            if "PRIORITY-WEIGHT" not in agent.anchor
-                            else agent.anchor["PRIORITY-WEIGHT"].singleton()
-                        )
-                        cost_weight = (
-                            1.0
-                            if "COST-WEIGHT" not in agent.anchor
-                            else agent.anchor["COST-WEIGHT"].singleton()
-                        )
-                        score = (goal.priority() * priority_weight) - (
-                            plan.cost() * cost_weight
-                        )
+                        score = OptionScores.score(agent, goal, plan, weights=weights)
                         option.set_score(score)
+                        scores[option.anchor] = score
 
                         agenda.add_option(option)
                     break
 
-    def select_options(self, agent: "Agent") -> dict:
+        return scores
+
+    def select_options(self, agent: "Agent", scores: Dict[Frame, float] = None) -> dict:
         effectors_map = {}
 
         def _select(option: Option):
             option.set_selected(True)
             option.step().set_status(Step.Status.EXECUTING)
 
-        options = sorted(
-            agent.agenda().options(), key=lambda o: o.score(), reverse=True
-        )
-        for option in options:
-            if (
-                len(list(option.step().anchor["AGENT"])) > 0
-                and option.step().anchor["AGENT"] != agent
-            ):
-                option.step().set_status(Step.Status.DEFERRED)
+        # Highest score first, ties in agenda order. Every option is visited, so
+        # they are sorted once, on the scores generate_options just computed.
+        if scores is None:
+            scores = {}
+        ranked = []
+        for i, option in enumerate(agent.agenda().options()):
+            score = scores.get(option.anchor)
+            if score is None:
+                score = option.score()
+            ranked.append((-score, i, option))
+        ranked.sort(key=lambda entry: entry[:2])
+
+        for score, _, option in ranked:
+            score = -score
+            step = option.step()
+            if len(list(step.anchor["AGENT"])) > 0 and step.anchor["AGENT"] != agent:
+                step.set_status(Step.Status.DEFERRED)
                 continue
 
             required_effector = None
-            if len(option.step().operations()) == 1:
-                required_effector = option.step().operations()[0].requires_effector()
+            operations = step.operations()
+            if len(operations) == 1:
+                required_effector = operations[0].requires_effector()
 
             if required_effector is None:
                 _select(option)
                 continue
 
-            available_effectors = agent.effectors()
-            available_effectors = filter(
-                lambda effector: effector.status() == Effector.Status.AVAILABLE,
-                available_effectors,
-            )
-            available_effectors = filter(
-                lambda effector: effector.anchor ^ required_effector,
-                available_effectors,
+            on_preempt = self._requeue(agent, option)
+            effector = EffectorIndex.claim(
+                agent,
+                required_effector,
+                option.anchor,
+                priority=score,
+                on_preempt=on_preempt,
             )
-            available_effectors = list(available_effectors)
+            if effector is None:
+                effector = EffectorIndex.preempt(
+                    agent,
+                    required_effector,
+                    option.anchor,
+                    score,
+                    on_preempt=on_preempt,
+                )
 
-            for effector in available_effectors:
-                if effector not in effectors_map.values():
-                    _select(option)
-                    effectors_map[option.anchor] = effector
+            if effector is not None:
+                _select(option)
+                effectors_map[option.anchor] = effector
+            else:
+                self.queue_for_effector(agent, option, required_effector)
 
         return effectors_map
 
@@ -199,26 +256,90 @@ class ProcessAgendaExecutable(ProactiveExecutable):
         options = filter(lambda option: option.selected(), options)
 
         for option in options:
-            xmr = XMR.build(option.step().anchor)
-            option.step().set_xmr(xmr)
-
-            if option.anchor in effectors_map:
-                effector = effectors_map[option.anchor]
-                effector.set_status(Effector.Status.RESERVED)
-                agent.output(xmr, effector)
-                option.step().set_with_effector(effector)
+            effector = effectors_map.get(option.anchor)
+            if effector is not None:
+                if ReservationManager.claim(effector, option.anchor) is None:
+                    # Claimed by someone else since it was selected; retry later.
+                    option.set_selected(False)
+                    option.step().set_status(Step.Status.PLANNED)
+                    continue
+
+            if effector is not None:
+                self.start_on_effector(agent, option.step(), effector)
             else:
+                xmr = XMR.build(option.step().anchor)
+                option.step().set_xmr(xmr)
                 agent.handle(xmr)
                 option.step().set_with_effector(None)
 
+    def queue_for_effector(
+        self, agent: "Agent", option: Option, required_effector: Effector
+    ) -> bool:
+        """Queues the option's step on the least busy effector able to run it, to
+        start as soon as that effector is released. Returns False (leaving the
+        step as it is) if the agent has no such effector or its queue is full."""
+
+        effectors = EffectorIndex.capable(agent, required_effector)
+        if len(effectors) == 0:
+            return False
+        effector = min(effectors, key=EffectorQueue.length)
+
+        return self.queue_on_effector(agent, option, effector)
+
+    def queue_on_effector(
+        self, agent: "Agent", option: Option, effector: Effector
+    ) -> bool:
+        step = option.step()
+
+        def _start(effector: Effector) -> bool:
+            if step.status() != Step.Status.QUEUED:
+                return False
+            step.set_status(Step.Status.EXECUTING)
+            self.start_on_effector(agent, step, effector)
+            return True
+
+        # A full queue leaves the step as it was, rather than marking it QUEUED
+        # and back again (and so the agenda dirty) on every pass.
+        if EffectorQueue.is_full(effector):
+            return False
+
+        step.set_status(Step.Status.QUEUED)
+        if not EffectorQueue.push(
+            effector,
+            option.anchor,
+            _start,
+            priority=option.score(),
+            on_preempt=self._requeue(agent, option),
+        ):
+            step.set_status(Step.Status.PLANNED)
+            return False
+        return True
+
+    def _requeue(self, agent: "Agent", option: Option) -> Callable[[Effector], None]:
+        # A preempted step goes back on its effector's queue (ordered by its
+        # score), to resume once the preempting work releases the effector.
+        def _on_preempt(effector: Effector):
+            self.queue_on_effector(agent, option, effector)
+
+        return _on_preempt
+
+    def start_on_effector(self, agent: "Agent", step: Step, effector: Effector):
+        xmr = XMR.build(step.anchor)
+        step.set_xmr(xmr)
+        reservation = ReservationManager.assign(effector, xmr)
+        holder = None if reservation is None else reservation.holder
+        agent.output(xmr, effector, holder=holder)
+        step.set_with_effector(effector)
+
     def cleanup(self, agent: "Agent"):
         options = agent.agenda().options()
-        options = filter(
-            lambda option: option.status() == Option.Status.CURRENT, options
+        options = list(
+            filter(lambda option: option.status() == Option.Status.CURRENT, options)
         )
 
         for option in options:
             option.set_status(Option.Status.EXPIRED)
+        OptionPool.release(agent.agenda().remove_options(options))
 
         for goal in agent.agenda().goals():
             for plan in goal.plans():
@@ -227,7 +348,11 @@ class ProcessAgendaExecutable(ProactiveExecutable):
                         step.anchor
                     ):
                         step.set_status(Step.Status.FINISHED)
-                if (
+                        # Its output is done with, and may now be compacted.
+                        xmr = step.xmr()
+                        if xmr is not None and xmr.status() == Signal.Status.RECEIVED:
+                            xmr.set_status(Signal.Status.CONSUMED)
+                if plan.status() != Plan.Status.FINISHED and (
                     len(
                         list(
                             filter(
@@ -239,7 +364,7 @@ class ProcessAgendaExecutable(ProactiveExecutable):
                     == 0
                 ):
                     plan.set_status(Plan.Status.FINISHED)
-            if (
+            if goal.status() != Goal.Status.SATISFIED and (
                 len(
                     list(
                         filter(
@@ -251,3 +376,8 @@ class ProcessAgendaExecutable(ProactiveExecutable):
                 > 0
             ):
                 goal.set_status(Goal.Status.SATISFIED)
+
+        agent.agenda().archive_goals()
+
+
+Caches.on_reset(ProcessAgendaExecutable.clear)
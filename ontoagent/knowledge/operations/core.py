@@ -1,6 +1,6 @@
 from ontoagent.agent import Agent
 
-from ontoagent.engine.effector import Effector
+from ontoagent.engine.effector import Effector, ReservationManager
 from ontoagent.engine.executable import HandleExecutable
 from ontoagent.engine.signal import Signal, XMR
 from ontoagent.utils.states import PhasedEvent
@@ -10,8 +10,25 @@ class ReleaseEffectorExecutable(HandleExecutable):
 
     def run(self, agent: "Agent", signal: "Signal"):
         effector = Effector(signal.root()["THEME"].singleton())
-        effector.set_status(Effector.Status.AVAILABLE)
 
-        xmr: XMR = effector.reserved_to()
+        # Read before releasing: the release may start queued work on the
+        # effector, which reserves it to a new XMR.
+        reservation = ReservationManager.reservation(effector)
+        xmr: XMR = None if reservation is None else reservation.xmr
+        if xmr is None:
+            xmr = effector.reserved_to()
+
+        # A release naming the XMR it finished is ignored once that XMR no longer
+        # holds the effector (e.g. it was preempted and the release came late).
+        if "XMR" in signal.root():
+            finished = signal.root()["XMR"].singleton()
+            if xmr is None or xmr.anchor != finished:
+                return
+
+        if not effector.release(reservation=reservation):
+            return
+
         if xmr is not None:
             PhasedEvent(xmr.root()).set_ended()
+            if xmr.status() == Signal.Status.RECEIVED:
+                xmr.set_status(Signal.Status.CONSUMED)
@@ -35,8 +35,13 @@ class Analyzer(object):
         return list(Frame("@SYS.ANALYZER-REGISTRY")["HAS-ANALYZER"])
 
     @classmethod
-    def analyzer_for_signal(cls, signal: Signal) -> "Analyzer":
-        for analyzer in Analyzer.get_registered_analyzers():
+    def analyzer_for_signal(
+        cls, signal: Signal, analyzers: List[Type["Analyzer"]] = None
+    ) -> "Analyzer":
+        if analyzers is None:
+            analyzers = Analyzer.get_registered_analyzers()
+
+        for analyzer in analyzers:
             analyzer = analyzer()
             if analyzer.is_appropriate(signal):
                 return analyzer
@@ -0,0 +1,18 @@
+from typing import Callable, List
+
+
+class Caches(object):
+    """Every in-memory cache and index the engine keeps beside the graph, so they
+    can all be dropped at once (e.g. after resetting the graph)."""
+
+    resets: List[Callable[[], None]] = []
+
+    @classmethod
+    def on_reset(cls, reset: Callable[[], None]):
+        if reset not in Caches.resets:
+            Caches.resets.append(reset)
+
+    @classmethod
+    def reset(cls):
+        for reset in list(Caches.resets):
+            reset()
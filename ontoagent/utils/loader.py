@@ -1,20 +1,35 @@
 from ontoagent.utils.ontolang import OntoAgentOntoLang
 from ontograph import graph
+from typing import Callable, List
 
 
 class KnowledgeLoader(object):
 
     loaded = []
+    listeners: List[Callable[[], None]] = []
 
     @classmethod
     def load_script(cls, script: str):
         graph.ontolang().run(script)
+        KnowledgeLoader.changed()
 
     @classmethod
     def load_resource(cls, package: str, file: str):
         ontolang: OntoAgentOntoLang = graph.ontolang()
         ontolang.load_knowledge(package, file)
         KnowledgeLoader.loaded.append(package + "." + file)
+        KnowledgeLoader.changed()
+
+    @classmethod
+    def on_change(cls, listener: Callable[[], None]):
+        # Listeners (typically cache invalidators) run whenever knowledge is loaded.
+        if listener not in KnowledgeLoader.listeners:
+            KnowledgeLoader.listeners.append(listener)
+
+    @classmethod
+    def changed(cls):
+        for listener in list(KnowledgeLoader.listeners):
+            listener()
 
     @classmethod
     def list_resources(cls, package: str):
@@ -74,3 +74,4 @@ class OntologyServiceLoader(OntologyLoader):
                 )
 
         driver.enable_auto_commit(commit_now=True)
+        KnowledgeLoader.changed()
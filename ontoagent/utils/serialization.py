@@ -0,0 +1,67 @@
+from enum import Enum
+from ontograph.Frame import Frame
+from typing import Any, List
+import sys
+
+
+def frame_to_dict(frame: Frame) -> dict:
+    rows = map(lambda row: [row[0], row[1], encode_filler(row[2])], frame_rows(frame))
+    return {"id": frame.id, "rows": list(rows)}
+
+
+def frame_rows(frame: Frame) -> List[tuple]:
+    rows = []
+    for slot in frame.slots():
+        for facet in slot.facets():
+            for filler in facet:
+                rows.append((slot.property, facet.type, filler))
+    return rows
+
+
+def erase_frame(frame: Frame):
+    for slot, facet, filler in frame_rows(frame):
+        frame[slot][facet] -= filler
+
+
+def encode_filler(filler: Any) -> list:
+    if isinstance(filler, Frame):
+        return ["f", filler.id]
+    if isinstance(filler, Enum):
+        return ["e", _qualified(type(filler)), filler.name]
+    if isinstance(filler, type):
+        return ["c", _qualified(filler)]
+    if isinstance(filler, Exception):
+        return ["x", _qualified(type(filler)), list(map(str, filler.args))]
+    if filler is None or isinstance(filler, (bool, int, float, str)):
+        return ["v", filler]
+    return ["r", repr(filler)]
+
+
+def decode_filler(encoded: list) -> Any:
+    tag = encoded[0]
+    if tag == "f":
+        return Frame(encoded[1])
+    if tag == "e":
+        return _resolve(encoded[1])[encoded[2]]
+    if tag == "c":
+        return _resolve(encoded[1])
+    if tag == "x":
+        try:
+            return _resolve(encoded[1])(*encoded[2])
+        except Exception:
+            return Exception(*encoded[2])
+    return encoded[1]
+
+
+def _qualified(clazz: type) -> str:
+    return clazz.__module__ + ":" + clazz.__qualname__
+
+
+def _resolve(qualified: str) -> Any:
+    module, path = qualified.split(":")
+    __import__(module)
+
+    resolved = sys.modules[module]
+    for name in path.split("."):
+        resolved = getattr(resolved, name)
+    return resolved
@@ -1,3 +1,4 @@
+from ontoagent.engine.changes import ChangeTracker
 from ontoagent.utils.common import AnchoredObject
 from ontograph.Frame import Frame
 from ontograph.Identifier import Identifier
@@ -71,6 +72,7 @@ class PhasedEvent(AnchoredObject):
 
     def set_phase(self, phase: str):
         self.anchor["PHASE"] = phase
+        ChangeTracker.mark()
 
     def set_ended(self):
         self.set_phase("END")
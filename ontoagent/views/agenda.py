@@ -1,42 +1,218 @@
+from collections import OrderedDict
 from enum import Enum
-from ontoagent.engine.effector import Effector
+from ontoagent.engine.changes import ChangeTracker
+from ontoagent.engine.effector import Effector, ReservationManager
 from ontoagent.engine.operation import Operable
 from ontoagent.engine.signal import XMR
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.common import AnchoredObject
+from ontoagent.utils.loader import KnowledgeLoader
+from ontoagent.utils.serialization import erase_frame, frame_rows
 from ontograph.Focus import Focus
 from ontograph.Frame import Frame
 from ontograph.Space import Space
-from typing import List, Type, Union
+from typing import Any, Callable, Dict, List, Set, Tuple, Type, Union
+import threading
 import time
 
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ontoagent.agent import Agent
+
+
+class AgendaModel(object):
+    """An optional in-memory copy of what the agenda views read. Code writing
+    those slots directly in the graph must call invalidate()."""
+
+    enabled = False
+    max_frames = 100_000
+
+    _values: Dict[str, Dict[str, Any]] = OrderedDict()
+    _generation = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def read(cls, frame: Frame, key: str, load: Callable[[], Any]) -> Any:
+        if not AgendaModel.enabled:
+            return load()
+
+        with AgendaModel._lock:
+            values = AgendaModel._values.get(frame.id)
+            if values is not None and key in values:
+                return values[key]
+            generation = AgendaModel._generation
+
+        value = load()
+        with AgendaModel._lock:
+            # Anything written meanwhile may have made the value stale.
+            if generation == AgendaModel._generation:
+                AgendaModel._store(frame.id, key, value)
+        return value
+
+    @classmethod
+    def write(cls, frame: Frame, key: str, value: Any):
+        with AgendaModel._lock:
+            AgendaModel._generation += 1
+            if AgendaModel.enabled:
+                AgendaModel._store(frame.id, key, value)
+            elif frame.id in AgendaModel._values:
+                AgendaModel._values[frame.id].pop(key, None)
+
+    @classmethod
+    def drop(cls, frame: Frame, key: str):
+        with AgendaModel._lock:
+            AgendaModel._generation += 1
+            if frame.id in AgendaModel._values:
+                AgendaModel._values[frame.id].pop(key, None)
+
+    @classmethod
+    def invalidate(cls, frame: Frame = None):
+        with AgendaModel._lock:
+            AgendaModel._generation += 1
+            if frame is None:
+                AgendaModel._values.clear()
+            else:
+                AgendaModel._values.pop(frame.id, None)
+
+    @classmethod
+    def _store(cls, id: str, key: str, value: Any):
+        values = AgendaModel._values.get(id)
+        if values is None:
+            values = {}
+            AgendaModel._values[id] = values
+            while len(AgendaModel._values) > AgendaModel.max_frames:
+                AgendaModel._values.popitem(last=False)
+        values[key] = value
+
+
+def _referenced(frame: Frame) -> List[str]:
+    return [
+        filler.id for _, _, filler in frame_rows(frame) if isinstance(filler, Frame)
+    ]
+
 
 class Agenda(AnchoredObject):
 
+    # HAS-GOAL and HAS-OPTION are rewritten whole when goals or options leave the
+    # agenda, so every change to them is made under one lock to keep concurrent
+    # additions from being overwritten.
+    _lock = threading.RLock()
+
     def goals(self) -> List["Goal"]:
-        return list(
-            map(lambda frame: Goal(frame), self.anchor["HAS-GOAL", Focus.Inh.LOC])
+        goals = AgendaModel.read(
+            self.anchor,
+            "HAS-GOAL",
+            lambda: tuple(self.anchor["HAS-GOAL", Focus.Inh.LOC]),
         )
+        return list(map(lambda frame: Goal(frame), goals))
 
     def add_goal(self, goal: Union[Frame, "Goal"]):
         if isinstance(goal, Goal):
             goal = goal.anchor
-        self.anchor["HAS-GOAL"] += goal
+        with Agenda._lock:
+            self.anchor["HAS-GOAL"] += goal
+            AgendaModel.drop(self.anchor, "HAS-GOAL")
+        ChangeTracker.mark()
+
+    def archived_goals(self) -> List["Goal"]:
+        goals = AgendaModel.read(
+            self.anchor,
+            "HAS-ARCHIVED-GOAL",
+            lambda: tuple(self.anchor["HAS-ARCHIVED-GOAL", Focus.Inh.LOC]),
+        )
+        return list(map(lambda frame: Goal(frame), goals))
+
+    def archive_goals(self, goals: List["Goal"] = None) -> List["Goal"]:
+        """Moves the given goals, along with any that are no longer ACTIVE, from
+        the agenda (HAS-GOAL) to its archive (HAS-ARCHIVED-GOAL), and returns
+        those moved. Archived goals are kept, but agenda processing no longer
+        visits them."""
+
+        if goals is None:
+            goals = []
+        ids = set(map(lambda goal: goal.anchor.id, goals))
+
+        with Agenda._lock:
+            kept = []
+            archived = []
+            for goal in self.goals():
+                if goal.anchor.id in ids or goal.status() != Goal.Status.ACTIVE:
+                    archived.append(goal)
+                else:
+                    kept.append(goal.anchor)
+
+            if len(archived) > 0:
+                self.anchor["HAS-GOAL"] = kept
+                for goal in archived:
+                    self.anchor["HAS-ARCHIVED-GOAL"] += goal.anchor
+                AgendaModel.drop(self.anchor, "HAS-GOAL")
+                AgendaModel.drop(self.anchor, "HAS-ARCHIVED-GOAL")
+
+        if len(archived) > 0:
+            for goal in archived:
+                OptionScores.invalidate(goal.anchor)
+            ChangeTracker.mark()
+        return archived
+
+    def references(self) -> Set[str]:
+        # Every frame an ACTIVE goal, or an unfinished step of one, points at
+        # (e.g. a step's GENERATED-XMR, or a TMR frame a goal is bound to).
+        references = set()
+        for goal in self.goals():
+            if goal.status() != Goal.Status.ACTIVE:
+                continue
+            references.update(_referenced(goal.anchor))
+            for plan in goal.plans():
+                for step in plan.steps():
+                    if step.status() != Step.Status.FINISHED:
+                        references.update(_referenced(step.anchor))
+        return references
 
     def options(self) -> List["Option"]:
         return list(
             filter(
                 lambda option: option.status() == Option.Status.CURRENT,
-                map(
-                    lambda filler: Option(filler),
-                    self.anchor["HAS-OPTION", Focus.Inh.LOC],
-                ),
+                map(lambda filler: Option(filler), self._option_frames()),
             )
         )
 
     def add_option(self, option: Union[Frame, "Option"]):
         if isinstance(option, Option):
             option = option.anchor
-        self.anchor["HAS-OPTION"] += option
+        with Agenda._lock:
+            self.anchor["HAS-OPTION"] += option
+            AgendaModel.drop(self.anchor, "HAS-OPTION")
+
+    def remove_options(self, options: List["Option"] = None) -> List["Option"]:
+        """Takes the given options off the agenda, along with any that are no
+        longer CURRENT, and returns those removed."""
+
+        if options is None:
+            options = []
+        ids = set(map(lambda option: option.anchor.id, options))
+
+        with Agenda._lock:
+            kept = []
+            removed = []
+            for frame in self._option_frames():
+                option = Option(frame)
+                if frame.id in ids or option.status() != Option.Status.CURRENT:
+                    removed.append(option)
+                else:
+                    kept.append(frame)
+
+            if len(removed) > 0:
+                self.anchor["HAS-OPTION"] = kept
+                AgendaModel.drop(self.anchor, "HAS-OPTION")
+        return removed
+
+    def _option_frames(self) -> List[Frame]:
+        return AgendaModel.read(
+            self.anchor,
+            "HAS-OPTION",
+            lambda: tuple(self.anchor["HAS-OPTION", Focus.Inh.LOC]),
+        )
 
 
 class Goal(AnchoredObject):
@@ -47,30 +223,48 @@ class Goal(AnchoredObject):
         SATISFIED = "SATISFIED"
 
     def plans(self) -> List["Plan"]:
-        return list(
-            map(lambda frame: Plan(frame), self.anchor["HAS-PLAN", Focus.Inh.LOC])
+        plans = AgendaModel.read(
+            self.anchor,
+            "HAS-PLAN",
+            lambda: tuple(self.anchor["HAS-PLAN", Focus.Inh.LOC]),
         )
+        return list(map(lambda frame: Plan(frame), plans))
 
     def add_plan(self, plan: Union[Frame, "Plan"]):
         if isinstance(plan, Plan):
             plan = plan.anchor
         self.anchor["HAS-PLAN"] += plan
+        AgendaModel.drop(self.anchor, "HAS-PLAN")
+        ChangeTracker.mark()
 
     def priority(self) -> float:
+        return AgendaModel.read(self.anchor, "PRIORITY", self._priority)
+
+    def _priority(self) -> float:
         if "PRIORITY" not in self.anchor:
             return 0.5
         return self.anchor["PRIORITY"].singleton()
 
     def set_priority(self, priority: float):
         self.anchor["PRIORITY"] += priority
+        AgendaModel.drop(self.anchor, "PRIORITY")
+        OptionScores.invalidate(self.anchor)
+        ChangeTracker.mark()
 
     def status(self) -> Status:
+        return AgendaModel.read(self.anchor, "STATUS", self._status)
+
+    def _status(self) -> Status:
         if "STATUS" not in self.anchor:
             return Goal.Status.ACTIVE
         return self.anchor["STATUS"].singleton()
 
     def set_status(self, status: Status):
+        if self.status() == status:
+            return
         self.anchor["STATUS"] = status
+        AgendaModel.write(self.anchor, "STATUS", status)
+        ChangeTracker.mark()
 
 
 class Plan(AnchoredObject):
@@ -80,48 +274,76 @@ class Plan(AnchoredObject):
         FINISHED = "FINISHED"
 
     def steps(self) -> List["Step"]:
-        return list(
-            map(lambda frame: Step(frame), self.anchor["HAS-STEP", Focus.Inh.LOC])
+        steps = AgendaModel.read(
+            self.anchor,
+            "HAS-STEP",
+            lambda: tuple(self.anchor["HAS-STEP", Focus.Inh.LOC]),
         )
+        return list(map(lambda frame: Step(frame), steps))
 
     def add_step(self, step: Union[Frame, "Step"]):
         if isinstance(step, Step):
             step = step.anchor
         self.anchor["HAS-STEP"] += step
+        AgendaModel.drop(self.anchor, "HAS-STEP")
+        ChangeTracker.mark()
 
     def cost(self) -> float:
+        return AgendaModel.read(self.anchor, "COST", self._cost)
+
+    def _cost(self) -> float:
         if "COST" not in self.anchor:
             return 0.5
         return self.anchor["COST"].singleton()
 
     def set_cost(self, cost: float):
         self.anchor["COST"] += cost
+        AgendaModel.drop(self.anchor, "COST")
+        OptionScores.invalidate(self.anchor)
+        ChangeTracker.mark()
 
     def status(self) -> Status:
+        return AgendaModel.read(self.anchor, "STATUS", self._status)
+
+    def _status(self) -> Status:
         if "STATUS" not in self.anchor:
             return Plan.Status.PENDING
         return self.anchor["STATUS"].singleton()
 
     def set_status(self, status: Status):
+        if self.status() == status:
+            return
         self.anchor["STATUS"] = status
+        AgendaModel.write(self.anchor, "STATUS", status)
+        ChangeTracker.mark()
 
 
 class Step(Operable):
 
     class Status(Enum):
         PLANNED = "PLANNED"
+        QUEUED = "QUEUED"
         EXECUTING = "EXECUTING"
         IMPASSED = "IMPASSED"
         DEFERRED = "DEFERRED"
         FINISHED = "FINISHED"
 
     def status(self) -> Status:
+        return AgendaModel.read(self.anchor, "STEP-STATUS", self._status)
+
+    def _status(self) -> Status:
         if "STEP-STATUS" in self.anchor:
             return self.anchor["STEP-STATUS"].singleton()
         return Step.Status.PLANNED
 
     def set_status(self, status: Status):
+        # Unchanged statuses are not written, so they do not mark the agenda
+        # dirty (see ChangeTracker).
+        if self.status() == status:
+            return
         self.anchor["STEP-STATUS"] = status
+        AgendaModel.write(self.anchor, "STEP-STATUS", status)
+        ChangeTracker.mark()
 
     def impasses(self) -> List["Impasse"]:
         return list(map(lambda filler: Impasse(filler), self.anchor["HAS-IMPASSE"]))
@@ -130,14 +352,20 @@ class Step(Operable):
         if isinstance(impasse, Impasse):
             impasse = impasse.anchor
         self.anchor["HAS-IMPASSE"] += impasse
+        ChangeTracker.mark()
 
     def subgoals(self) -> List[Goal]:
-        return list(map(lambda filler: Goal(filler), self.anchor["HAS-SUBGOAL"]))
+        subgoals = AgendaModel.read(
+            self.anchor, "HAS-SUBGOAL", lambda: tuple(self.anchor["HAS-SUBGOAL"])
+        )
+        return list(map(lambda filler: Goal(filler), subgoals))
 
     def add_subgoal(self, subgoal: Union[Frame, Goal]):
         if isinstance(subgoal, Goal):
             subgoal = subgoal.anchor
         self.anchor["HAS-SUBGOAL"] += subgoal
+        AgendaModel.drop(self.anchor, "HAS-SUBGOAL")
+        ChangeTracker.mark()
 
     def xmr(self) -> Union[None, XMR]:
         if "GENERATED-XMR" not in self.anchor:
@@ -185,68 +413,263 @@ class Option(AnchoredObject):
         if status is None:
             status = Option.Status.CURRENT
 
-        option = Option(space.frame("@.OPTION.?"))
+        frame = OptionPool.acquire(space)
+        option = Option(space.frame("@.OPTION.?") if frame is None else frame)
         option.set_goal(goal)
         option.set_plan(plan)
         option.set_step(step)
         option.set_timestamp(timestamp)
         option.set_status(status)
+        if frame is not None:
+            option.set_selected(False)
+            option.set_score(0.0)
 
         return option
 
     def goal(self) -> Goal:
-        return Goal(self.anchor["GOAL"].singleton())
+        return Goal(self._slot("GOAL"))
 
     def set_goal(self, goal: Union[Frame, Goal]):
         if isinstance(goal, Goal):
             goal = goal.anchor
-        self.anchor["GOAL"] = goal
+        self._set_slot("GOAL", goal)
 
     def plan(self) -> Plan:
-        return Plan(self.anchor["PLAN"].singleton())
+        return Plan(self._slot("PLAN"))
 
     def set_plan(self, plan: Union[Frame, Plan]):
         if isinstance(plan, Plan):
             plan = plan.anchor
-        self.anchor["PLAN"] = plan
+        self._set_slot("PLAN", plan)
 
     def step(self) -> Step:
-        return Step(self.anchor["STEP"].singleton())
+        return Step(self._slot("STEP"))
 
     def set_step(self, step: Union[Frame, Step]):
         if isinstance(step, Step):
             step = step.anchor
-        self.anchor["STEP"] = step
+        self._set_slot("STEP", step)
 
     def timestamp(self) -> int:
-        return self.anchor["TIMESTAMP"].singleton()
+        return self._slot("TIMESTAMP")
 
     def set_timestamp(self, timestamp: int):
-        self.anchor["TIMESTAMP"] = timestamp
+        self._set_slot("TIMESTAMP", timestamp)
 
     def status(self) -> Status:
-        if "STATUS" not in self.anchor:
-            return Option.Status.CURRENT
-        return self.anchor["STATUS"].singleton()
+        return self._slot("STATUS", default=Option.Status.CURRENT)
 
     def set_status(self, status: Status):
-        self.anchor["STATUS"] = status
+        self._set_slot("STATUS", status)
 
     def selected(self) -> bool:
-        if "SELECTED" not in self.anchor:
-            return False
-        return self.anchor["SELECTED"].singleton()
+        return self._slot("SELECTED", default=False)
 
     def set_selected(self, selected: bool):
-        self.anchor["SELECTED"] = selected
+        self._set_slot("SELECTED", selected)
 
     def score(self) -> float:
-        if "SCORE" not in self.anchor:
-            return 0.0
-        return self.anchor["SCORE"].singleton()
+        return self._slot("SCORE", default=0.0)
 
     def set_score(self, score: float):
-        self.anchor["SCORE"] = score
+        self._set_slot("SCORE", score)
+
+    def _slot(self, slot: str, default: Any = None) -> Any:
+        def _load():
+            if default is not None and slot not in self.anchor:
+                return default
+            return self.anchor[slot].singleton()
+
+        return AgendaModel.read(self.anchor, slot, _load)
+
+    def _set_slot(self, slot: str, value: Any):
+        self.anchor[slot] = value
+        AgendaModel.write(self.anchor, slot, value)
+
+
+class OptionScores(object):
+    """Cached option scores per agent, goal and plan. Code changing PRIORITY or
+    COST directly in the graph must call invalidate()."""
+
+    _scores: Dict[str, Dict[Tuple[str, str], float]] = {}
+    _weights: Dict[str, Tuple[float, float]] = {}
+    _keys: Dict[str, Set[Tuple[str, str, str]]] = {}
+    _generation = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def weights(cls, agent: "Agent") -> Tuple[float, float]:
+        """Reads the agent's weights, dropping its scores if they changed."""
+
+        weights = (
+            OptionScores._weight(agent.anchor, "PRIORITY-WEIGHT"),
+            OptionScores._weight(agent.anchor, "COST-WEIGHT"),
+        )
+        with OptionScores._lock:
+            if OptionScores._weights.get(agent.anchor.id) != weights:
+                OptionScores._weights[agent.anchor.id] = weights
+                OptionScores._scores.pop(agent.anchor.id, None)
+        return weights
+
+    @classmethod
+    def score(
+        cls,
+        agent: "Agent",
+        goal: Goal,
+        plan: Plan,
+        weights: Tuple[float, float] = None,
+    ) -> float:
+        if weights is None:
+            weights = OptionScores.weights(agent)
+
+        id = agent.anchor.id
+        key = (goal.anchor.id, plan.anchor.id)
+        with OptionScores._lock:
+            scores = OptionScores._scores.get(id)
+            if scores is not None and key in scores:
+                return scores[key]
+            generation = OptionScores._generation
+
+        score = (goal.priority() * weights[0]) - (plan.cost() * weights[1])
+
+        with OptionScores._lock:
+            # Kept only if nothing was invalidated meanwhile.
+            if (
+                generation == OptionScores._generation
+                and OptionScores._weights.get(id) == weights
+            ):
+                OptionScores._scores.setdefault(id, {})[key] = score
+                for frame in key:
+                    OptionScores._keys.setdefault(frame, set()).add((id,) + key)
+        return score
+
+    @classmethod
+    def invalidate(cls, frame: Frame = None):
+        with OptionScores._lock:
+            OptionScores._generation += 1
+            if frame is None:
+                OptionScores._scores = {}
+                OptionScores._weights = {}
+                OptionScores._keys = {}
+                return
+
+            for agent, goal, plan in OptionScores._keys.pop(frame.id, set()):
+                OptionScores._scores.get(agent, {}).pop((goal, plan), None)
+                for other in [goal, plan]:
+                    if other in OptionScores._keys:
+                        OptionScores._keys[other].discard((agent, goal, plan))
+                        if len(OptionScores._keys[other]) == 0:
+                            del OptionScores._keys[other]
+
+    @classmethod
+    def _weight(cls, agent: Frame, slot: str) -> float:
+        if slot not in agent:
+            return 1.0
+        return agent[slot].singleton()
+
+
+class OptionPool(object):
+    """Options taken off the agenda, recycled for Option.build once their step
+    no longer holds (or waits for) an effector. With an `archive`, options are
+    archived instead, and their frames are left to it rather than recycled."""
+
+    size = 1000
+    archive: Callable[[List[Option]], None] = None
+    batch_size = 100
+
+    _free: Dict[str, List[Frame]] = {}
+    # Released options whose step was still in use, recycled once it is not.
+    _held: Dict[str, Option] = {}
+    _archiving: List[Option] = []
+    _lock = threading.RLock()
+
+    @classmethod
+    def release(cls, options: List[Option]):
+        if OptionPool.archive is None:
+            with OptionPool._lock:
+                held = list(OptionPool._held.values())
+                OptionPool._held = {}
+            for option in held + options:
+                OptionPool._recycle(option)
+            return
+
+        with OptionPool._lock:
+            OptionPool._archiving.extend(options)
+        OptionPool._flush(whole_batches=True)
+
+    @classmethod
+    def acquire(cls, space: Space) -> Union[None, Frame]:
+        with OptionPool._lock:
+            free = OptionPool._free.get(space.name)
+            if not free:
+                return None
+            return free.pop()
+
+    @classmethod
+    def flush(cls) -> int:
+        return OptionPool._flush()
+
+    @classmethod
+    def available(cls, space: Union[str, Space] = None) -> int:
+        with OptionPool._lock:
+            if space is None:
+                return sum(map(len, OptionPool._free.values()))
+            if isinstance(space, Space):
+                space = space.name
+            return len(OptionPool._free.get(space, []))
+
+    @classmethod
+    def clear(cls):
+        with OptionPool._lock:
+            OptionPool._free = {}
+            OptionPool._held = {}
+            OptionPool._archiving = []
+
+    @classmethod
+    def held(cls) -> int:
+        with OptionPool._lock:
+            return len(OptionPool._held)
+
+    @classmethod
+    def is_recyclable(cls, option: Option) -> bool:
+        step = option.step()
+        if step.status() in [Step.Status.QUEUED, Step.Status.EXECUTING]:
+            return False
+        effector = step.with_effector()
+        return effector is None or ReservationManager.holder(effector) != option.anchor
+
+    @classmethod
+    def _flush(cls, whole_batches: bool = False) -> int:
+        flushed = 0
+        while True:
+            with OptionPool._lock:
+                size = max(OptionPool.batch_size, 1)
+                pending = len(OptionPool._archiving)
+                if pending == 0 or (whole_batches and pending < size):
+                    return flushed
+                options = OptionPool._archiving[0:size]
+                OptionPool._archiving = OptionPool._archiving[size:]
+
+            if OptionPool.archive is not None:
+                OptionPool.archive(options)
+            flushed += len(options)
+
+    @classmethod
+    def _recycle(cls, option: Option):
+        if not OptionPool.is_recyclable(option):
+            with OptionPool._lock:
+                OptionPool._held[option.anchor.id] = option
+            return
+
+        space = option.anchor.space().name
+        with OptionPool._lock:
+            free = OptionPool._free.setdefault(space, [])
+            if len(free) < OptionPool.size:
+                free.append(option.anchor)
+                return
+
+        erase_frame(option.anchor)
+        AgendaModel.invalidate(option.anchor)
 
 
 class Impasse(AnchoredObject):
@@ -286,3 +709,10 @@ class ImpasseDetectionExecutable(object):
 
     def detect(self) -> bool:
         raise NotImplementedError
+
+
+KnowledgeLoader.on_change(AgendaModel.invalidate)
+KnowledgeLoader.on_change(OptionScores.invalidate)
+Caches.on_reset(AgendaModel.invalidate)
+Caches.on_reset(OptionPool.clear)
+Caches.on_reset(OptionScores.invalidate)
@@ -2,8 +2,12 @@ from flask import Flask, request, abort, render_template
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from ontoagent.agent import Agent
+from ontoagent.engine.admission import SignalRejected
+from ontoagent.engine.dispatch import SynchronousDispatcher, ThreadPoolDispatcher
 from ontoagent.engine.report import Report
 from ontoagent.engine.signal import Signal, XMR
+from ontoagent.engine.stats import ExecutableStats
+from ontoagent.engine.tracing import Tracer
 from ontoagent.utils.instancing import instanceof, Instantiable
 from ontoagent.utils.loader import KnowledgeLoader
 from ontoagent.views.agenda import Impasse
@@ -107,8 +111,14 @@ def signal_release():
     root = instanceof(
         Frame("@ONT.RELEASE-EFFECTOR"), in_space=space, variables={variable: effector}
     )
+    # Naming the finished XMR lets a late release of preempted work be ignored.
+    if "xmr" in data:
+        root["XMR"] = Frame(data["xmr"])
     mmr = XMR.build(root, anchor="@IO.RMR.?", space=space)
-    _agent.input(mmr)
+    try:
+        _agent.input(mmr)
+    except SignalRejected as e:
+        return json.dumps({"signal": "rejected", "reason": e.reason}), 429
 
     emit_pulse_payload()
 
@@ -122,7 +132,10 @@ def signal_speech():
 
     data = request.get_json()
     signal = input_speech(data)
-    _agent.input(signal)
+    try:
+        _agent.input(signal)
+    except SignalRejected as e:
+        return json.dumps({"signal": "rejected", "reason": e.reason}), 429
 
     emit_pulse_payload()
 
@@ -146,10 +159,42 @@ def api_impasse():
 
 @app.route("/api/signals", methods=["GET"])
 def api_queue():
-    queue = Payload.output_signals(status=Signal.Status[request.args["status"]])
+    status = Signal.Status[request.args["status"]]
+    offset = int(request.args.get("offset", 0))
+    limit = int(request.args.get("limit", 100))
+
+    queue = Payload.output_signals(status=status, offset=offset, limit=limit)
     return json.dumps(queue)
 
 
+@app.route("/api/dispatch", methods=["GET"])
+def api_dispatch():
+    return json.dumps(Agent.dispatcher.metrics())
+
+
+@app.route("/api/admission", methods=["GET"])
+def api_admission():
+    return json.dumps(Agent.signals.metrics())
+
+
+@app.route("/api/executables", methods=["GET"])
+def api_executables():
+    return json.dumps(ExecutableStats.stats())
+
+
+@app.route("/api/traces", methods=["GET"])
+def api_traces():
+    limit = int(request.args.get("limit", 100))
+
+    traces = list(map(Tracer.to_dict, Tracer.traces(limit=limit)))
+    return json.dumps(traces)
+
+
+@app.route("/api/trace", methods=["GET"])
+def api_trace():
+    return json.dumps(Tracer.to_dict(request.args["id"]))
+
+
 @app.route("/api/report", methods=["GET"])
 def api_report():
     report = Payload.output_report(Report(Frame(request.args["id"])))
@@ -189,6 +234,7 @@ def ontolang_execute():
 
     try:
         result = graph.ontolang().run(data["ontolang"])
+        KnowledgeLoader.changed()
         if (
             isinstance(result, list)
             and len(result) > 0
@@ -288,7 +334,7 @@ def ui_ontolang():
 
 @app.route("/ui/signals", methods=["GET"])
 def ui_signals():
-    payload = {"signals": Payload.output_signals()}
+    payload = {"signals": Payload.output_signals(limit=100)}
 
     return render_template("signals.html", payload=json.dumps(payload))
 
@@ -309,7 +355,7 @@ if __name__ == "__main__":
             if k == "port":
                 port = int(v)
 
-    Agent.auto_join = True
+    Agent.dispatcher = SynchronousDispatcher()
 
     from ontograph.drivers.SQLiteDriver import SQLiteDriver
 
@@ -328,6 +374,6 @@ if __name__ == "__main__":
 
     # ------------------------------------------------------ #
 
-    Agent.auto_join = False
+    Agent.dispatcher = ThreadPoolDispatcher()
 
     socketio.run(app, host=host, port=port, debug=False)
@@ -1,12 +1,11 @@
 from enum import Enum
 from ontoagent.engine.report import Report
-from ontoagent.engine.signal import Signal
+from ontoagent.engine.signal import Signal, SignalIndex
 from ontoagent.utils.loader import KnowledgeLoader
 from ontoagent.views.agenda import Agenda, Goal, Impasse, Option, Plan, Resolution, Step
 from ontograph import graph
 from ontograph.Focus import Focus
 from ontograph.Frame import Frame
-from ontograph.Space import Space
 from typing import List
 
 import inspect
@@ -31,6 +30,9 @@ class Payload(object):
     def output_agenda(cls, agenda: Agenda) -> dict:
         return {
             "goals": list(map(lambda goal: Payload.output_goal(goal), agenda.goals())),
+            "archived-goals": list(
+                map(lambda goal: Payload.output_goal(goal), agenda.archived_goals())
+            ),
             "options": list(
                 map(lambda option: Payload.output_option(option), agenda.options())
             ),
@@ -102,24 +104,39 @@ class Payload(object):
 
     @classmethod
     def output_report(cls, report: Report) -> dict:
+        # In-memory reports (see ReportBuffer) have no frame to show.
+        persisted = report.persisted()
         return {
-            "anchor": report.anchor.id,
+            "anchor": report.anchor.id if persisted else None,
             "executable-module": report.executable().__module__,
             "executable-class": report.executable().__name__,
             "status": report.status().name,
             "validation": report.validation(),
             "timestamp": report.timestamp(),
-            "contents": Payload.output_frame(report.anchor),
+            "message": report.message(),
+            "contents": Payload.output_frame(report.anchor) if persisted else None,
         }
 
     @classmethod
     def output_signal_anchor(cls, signal: Signal) -> dict:
+        reports = signal.reports()
         return {
             "anchor": signal.anchor.id,
             "status": signal.status().name,
             "timestamp": signal.timestamp(),
             "root": signal.root().id,
-            "reports": list(map(lambda report: report.anchor.id, signal.reports())),
+            "reports": list(
+                map(
+                    lambda report: report.anchor.id,
+                    filter(lambda report: report.persisted(), reports),
+                )
+            ),
+            "buffered-reports": list(
+                map(
+                    lambda report: Payload.output_report(report),
+                    filter(lambda report: not report.persisted(), reports),
+                )
+            ),
         }
 
     @classmethod
@@ -130,10 +147,14 @@ class Payload(object):
 
     @classmethod
     def output_signals(
-        cls, status: Signal.Status = Signal.Status.CONSUMED
+        cls,
+        status: Signal.Status = Signal.Status.CONSUMED,
+        offset: int = 0,
+        limit: int = None,
     ) -> List[dict]:
-        signals = map(lambda frame: Signal(frame), Space("IO"))
-        signals = filter(lambda signal: signal.status() == status, signals)
+        signals = SignalIndex.signals(
+            status, offset=offset, limit=limit, newest_first=True
+        )
         return list(map(lambda signal: Payload.output_signal_anchor(signal), signals))
 
     @classmethod
@@ -23,9 +23,9 @@ function apiGetImpasse(id, callback) {
     });
 }
 
-function apiGetSignals(status, callback) {
+function apiGetSignals(status, callback, offset = 0, limit = 100) {
     $.ajax({
-        url: "/api/signals?status=" + status,
+        url: "/api/signals?status=" + status + "&offset=" + offset + "&limit=" + limit,
         method: "GET",
     }).done(function(data) {
         var output = JSON.parse(data);
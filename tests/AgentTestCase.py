@@ -1,4 +1,6 @@
+from concurrent.futures import Future
 from ontoagent.agent import Agent
+from ontoagent.engine.dispatch import ThreadPoolDispatcher
 from ontoagent.engine.effector import Effector
 from ontoagent.engine.executable import HandleExecutable
 from ontoagent.engine.operation import Operable, Operation
@@ -7,6 +9,9 @@ from ontograph.Frame import Frame
 from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
 from unittest.mock import MagicMock, patch
 
+import asyncio
+import threading
+
 
 class AgentTestCase(OntoAgentTestCase):
 
@@ -126,19 +131,235 @@ class AgentTestCase(OntoAgentTestCase):
         self.assertEqual(1, Frame("@TEST.RESPONSE.1")["VALUE"])
         self.assertEqual(2, Frame("@TEST.RESPONSE.2")["VALUE"])
 
+    def test_handle_respects_after(self):
+        op1 = Operation.build("SYS", TestableExecutable1)
+        op2 = Operation.build("SYS", TestableExecutable2)
+        op1.add_after(op2)
+
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(op1)
+        Operable(root).add_operation(op2)
+
+        signal = Signal.build(root)
+        self.agent.handle(signal, join=True)
+
+        executables = [report.executable() for report in signal.reports()]
+        self.assertEqual([TestableExecutable2, TestableExecutable1], executables)
+
+    def test_handle_concurrently(self):
+        Agent.concurrent_operations = True
+
+        op1 = Operation.build("SYS", TestableExecutable1)
+        op2 = Operation.build("SYS", TestableExecutable2)
+
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(op1)
+        Operable(root).add_operation(op2)
+
+        signal = Signal.build(root)
+        self.agent.handle(signal, join=True)
+
+        self.assertEqual(1, Frame("@TEST.RESPONSE.1")["VALUE"])
+        self.assertEqual(2, Frame("@TEST.RESPONSE.2")["VALUE"])
+        self.assertEqual(2, len(signal.reports()))
+        self.assertEqual(Signal.Status.CONSUMED, signal.status())
+        self.assertEqual(2, Agent.dispatcher.metrics()["operation"]["completed"])
+
+    def test_handle_concurrently_overlaps_operations(self):
+        Agent.concurrent_operations = True
+        Agent.dispatcher = ThreadPoolDispatcher(workers=2)
+
+        # Each operation only gets past the barrier once the other reaches it,
+        # so both complete only if they run at the same time.
+        TestableBarrierExecutable.barrier = threading.Barrier(2, timeout=5)
+
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(Operation.build("SYS", TestableBarrierExecutable))
+        Operable(root).add_operation(Operation.build("SYS", TestableBarrierExecutable))
+
+        signal = Signal.build(root)
+        try:
+            self.agent.handle(signal, join=True).result(timeout=10)
+        finally:
+            Agent.dispatcher.shutdown()
+
+        self.assertEqual(2, len(Frame("@TEST.RESPONSE.BARRIER")["VALUE"]))
+        self.assertEqual(Signal.Status.CONSUMED, signal.status())
+
+    def test_handle_concurrently_failure_leaves_signal_unconsumed(self):
+        Agent.concurrent_operations = True
+
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(Operation.build("SYS", TestableExecutable1))
+        signal = Signal.build(root)
+
+        with patch.object(Operation, "run", side_effect=ValueError()):
+            future = self.agent.handle(signal, join=True)
+
+        self.assertIsInstance(future.exception(), ValueError)
+        self.assertEqual(Signal.Status.RECEIVED, signal.status())
+
+    def test_input_many(self):
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(Operation.build("SYS", TestableExecutable1))
+
+        signals = [XMR.build(root), XMR.build(root)]
+        futures = self.agent.input_many(signals, join=True)
+
+        self.assertEqual(2, len(futures))
+        for signal in signals:
+            self.assertEqual(Signal.Status.CONSUMED, signal.status())
+        self.assertEqual(1, Frame("@TEST.RESPONSE.1")["VALUE"])
+
+    @patch("ontoagent.utils.analysis.Analyzer.analyzer_for_signal")
+    def test_input_many_analyzes_signals(self, mock_analyzer_for_signal: MagicMock):
+        xmr = XMR.build(Frame("@ONT.ROOT"))
+
+        mock_analyzer = MagicMock()
+        mock_analyzer.to_signal = MagicMock(return_value=xmr)
+        mock_analyzer_for_signal.return_value = mock_analyzer
+
+        signal = Signal.build(Frame("@ONT.ROOT"))
+        self.agent.input_many([signal, xmr], join=True)
+
+        mock_analyzer_for_signal.assert_called_once()
+        self.assertEqual(Signal.Status.CONSUMED, signal.status())
+        self.assertEqual(Signal.Status.CONSUMED, xmr.status())
+
+    def test_input_many_resolves_operations_once_per_concept(self):
+        r1 = Frame("@ONT.ROOT-1")
+        r2 = Frame("@ONT.ROOT-2")
+        Operable(r1).add_operation(Operation.build("SYS", TestableExecutable1))
+        Operable(r2).add_operation(Operation.build("SYS", TestableExecutable2))
+
+        signals = [XMR.build(r1), XMR.build(r2), XMR.build(r1), XMR.build(r2)]
+
+        with patch(
+            "ontoagent.agent.Operable.operations",
+            autospec=True,
+            side_effect=Operable.operations,
+        ) as mock_operations:
+            self.agent.input_many(signals, join=True)
+
+        self.assertEqual(2, mock_operations.call_count)
+        self.assertEqual(1, Frame("@TEST.RESPONSE.1")["VALUE"])
+        self.assertEqual(2, Frame("@TEST.RESPONSE.2")["VALUE"])
+
     def test_output(self):
         effector = Effector.build(
             Frame("@TEST.EFFECTOR.?"), executable=TestableExecutable
         )
-        effector.interrupt = MagicMock()
         effector.run = MagicMock()
 
         xmr = XMR.build(Frame("@IO.TEST-EVENT.?"))
         self.agent.output(xmr, effector, join=True)
 
-        effector.interrupt.assert_called_once()
         effector.run.assert_called_once_with(self.agent, xmr)
 
+    def test_entry_points_dispatch_to_pools(self):
+        xmr = XMR.build(Frame("@ONT.ROOT"))
+
+        future = self.agent.input(xmr, join=True)
+
+        self.assertTrue(future.done())
+        metrics = Agent.dispatcher.metrics()
+        self.assertEqual(1, metrics["input"]["completed"])
+        self.assertEqual(1, metrics["handle"]["completed"])
+
+    def test_ahandle(self):
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(Operation.build("SYS", TestableExecutable1))
+
+        signal = Signal.build(root)
+        asyncio.run(self.agent.ahandle(signal))
+
+        self.assertEqual(1, Frame("@TEST.RESPONSE.1")["VALUE"])
+        self.assertEqual(Signal.Status.CONSUMED, signal.status())
+
+    def test_ainput_waits_for_handle(self):
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(Operation.build("SYS", TestableExecutable1))
+
+        xmr = XMR.build(root)
+        asyncio.run(self.agent.ainput(xmr))
+
+        self.assertEqual(1, Frame("@TEST.RESPONSE.1")["VALUE"])
+        self.assertEqual(Signal.Status.CONSUMED, xmr.status())
+
+    def test_aoutput(self):
+        effector = Effector.build(
+            Frame("@TEST.EFFECTOR.?"), executable=TestableExecutable
+        )
+        effector.interrupt = MagicMock()
+        effector.run = MagicMock()
+
+        xmr = XMR.build(Frame("@IO.TEST-EVENT.?"))
+        asyncio.run(self.agent.aoutput(xmr, effector))
+
+        effector.run.assert_called_once_with(self.agent, xmr)
+
+    def test_astart_runs_background(self):
+        self.agent.background = MagicMock()
+
+        async def _beat():
+            await self.agent.astart(heartbeat=0.01)
+            await asyncio.sleep(0.1)
+            self.agent.stop()
+
+        asyncio.run(_beat())
+
+        self.assertIsNone(Agent.heartbeat)
+        self.assertTrue(self.agent.background.called)
+
+    def test_astart_keeps_beating_after_a_failure(self):
+        self.agent.background = MagicMock(side_effect=ValueError("Failed."))
+
+        async def _beat():
+            await self.agent.astart(heartbeat=0.01)
+            await asyncio.sleep(0.1)
+            stopped = Agent.heartbeat.stopped()
+            self.agent.stop()
+            return stopped
+
+        with self.assertLogs("ontoagent.agent", level="ERROR"):
+            stopped = asyncio.run(_beat())
+
+        self.assertFalse(stopped)
+        self.assertGreater(self.agent.background.call_count, 1)
+
+    def test_abackground_runs_off_the_event_loop(self):
+        threads = []
+        self.agent.background = lambda: threads.append(threading.current_thread())
+
+        asyncio.run(self.agent.abackground())
+
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual(threading.current_thread(), threads[0])
+
+    def test_async_calls_run_off_the_event_loop(self):
+        threads = []
+
+        def _submit(*args):
+            threads.append(threading.current_thread())
+            future = Future()
+            future.set_result(None)
+            return future
+
+        self.agent.input = _submit
+        self.agent.handle = _submit
+        self.agent.output = _submit
+
+        async def _calls():
+            xmr = XMR.build(Frame("@IO.TEST-EVENT.?"))
+            await self.agent.ainput(xmr)
+            await self.agent.ahandle(xmr)
+            await self.agent.aoutput(xmr, Effector.build(Frame("@TEST.EFFECTOR.?")))
+
+        asyncio.run(_calls())
+
+        self.assertEqual(3, len(threads))
+        self.assertNotIn(threading.current_thread(), threads)
+
 
 class TestableExecutable1(HandleExecutable):
     def run(self, agent: Agent, signal: Signal):
@@ -148,3 +369,11 @@ class TestableExecutable1(HandleExecutable):
 class TestableExecutable2(HandleExecutable):
     def run(self, agent: Agent, signal: Signal):
         Frame("@TEST.RESPONSE.2")["VALUE"] = 2
+
+
+class TestableBarrierExecutable(HandleExecutable):
+    barrier: threading.Barrier = None
+
+    def run(self, agent: Agent, signal: Signal):
+        TestableBarrierExecutable.barrier.wait()
+        Frame("@TEST.RESPONSE.BARRIER")["VALUE"] += threading.current_thread().name
@@ -1,11 +1,16 @@
 from ontoagent.agent import Agent
+from ontoagent.engine.admission import SignalQueue
+from ontoagent.engine.dispatch import SynchronousDispatcher
+from ontoagent.engine.effector import ReservationManager
 from ontoagent.engine.executable import HandleExecutable
+from ontoagent.engine.report import Report
 from ontoagent.engine.signal import Signal
 from ontoagent.utils.analysis import Analyzer
+from ontoagent.utils.caches import Caches
 from ontoagent.utils.loader import KnowledgeLoader
 from ontoagent.utils.ontolang import OntoAgentOntoLang
 from ontoagent.utils.ontology import OntologyOntoLangLoader
-from ontoagent.views.agenda import ImpasseDetectionExecutable
+from ontoagent.views.agenda import AgendaModel, ImpasseDetectionExecutable, OptionPool
 from ontograph import graph
 from ontograph.drivers.PostgreSQLDriver import PostgreSQLDriver
 from ontograph.drivers.SQLiteDriver import SQLiteDriver
@@ -19,7 +24,19 @@ class OntoAgentTestCase(unittest.TestCase):
     driver = "sqlite"
 
     def setUp(self):
-        Agent.auto_join = True
+        Agent.dispatcher = SynchronousDispatcher()
+        Agent.signals = SignalQueue()
+        Agent.retention = None
+        Agent.journal = None
+        Agent.concurrent_operations = False
+        Report.persistence = Report.Persistence.ALL
+        Report.batch_size = 0
+        ReservationManager.lease = 60.0
+        AgendaModel.enabled = False
+        OptionPool.archive = None
+        OptionPool.batch_size = 100
+        OptionPool.size = 1000
+        Caches.reset()
 
         if OntoAgentTestCase.driver == "sqlite":
             self.setUpSQLiteDriver()
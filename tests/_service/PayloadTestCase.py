@@ -0,0 +1,25 @@
+from ontoagent.engine.report import Report
+from ontoagent.engine.signal import Signal
+from ontograph.Frame import Frame
+from service.payload import Payload
+from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
+
+
+class PayloadTestCase(OntoAgentTestCase):
+
+    def test_output_signal_anchor_includes_buffered_reports(self):
+        Report.persistence = Report.Persistence.NONE
+        signal = Signal.build(Frame("@TEST.ROOT.?"))
+        report = Report.build(TestableExecutable)
+        signal.add_report(report)
+        report.set_status(Report.Status.FINISHED)
+
+        payload = Payload.output_signal_anchor(signal)
+
+        self.assertEqual([], payload["reports"])
+        self.assertEqual(1, len(payload["buffered-reports"]))
+        self.assertIsNone(payload["buffered-reports"][0]["anchor"])
+        self.assertEqual("FINISHED", payload["buffered-reports"][0]["status"])
+        self.assertEqual(
+            "TestableExecutable", payload["buffered-reports"][0]["executable-class"]
+        )
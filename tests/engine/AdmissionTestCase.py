@@ -0,0 +1,122 @@
+from ontoagent.engine.admission import SignalQueue, SignalRejected
+from ontoagent.engine.signal import Signal, XMR
+from ontograph.Frame import Frame
+from tests.OntoAgentTestCase import OntoAgentTestCase
+from unittest.mock import MagicMock
+
+
+class SignalQueueTestCase(OntoAgentTestCase):
+
+    def build(self, type: str) -> XMR:
+        return XMR.build(Frame("@TEST.ROOT.?"), anchor="@IO.%s.?" % type)
+
+    def test_type_of(self):
+        self.assertEqual("@ONT.RMR", SignalQueue.type_of(self.build("RMR")))
+        self.assertEqual("@ONT.TMR", SignalQueue.type_of(self.build("TMR")))
+
+    def test_priority(self):
+        queue = SignalQueue(priorities={"@ONT.MMR": 5}, default_priority=1)
+
+        self.assertEqual(5, queue.priority(self.build("MMR")))
+        self.assertEqual(1, queue.priority(self.build("TMR")))
+
+        queue.set_priority("@ONT.TMR", 7)
+        self.assertEqual(7, queue.priority(self.build("TMR")))
+
+    def test_no_default_priority_for_mmrs(self):
+        queue = SignalQueue(default_priority=1)
+
+        self.assertEqual(1, queue.priority(self.build("MMR")))
+
+    def test_zero_depth_rejects(self):
+        queue = SignalQueue(max_depth=0)
+
+        signal = self.build("TMR")
+        with self.assertRaises(SignalRejected):
+            queue.put(signal)
+        self.assertEqual(Signal.Status.REJECTED, signal.status())
+        self.assertEqual(0, queue.depth())
+
+    def test_is_express(self):
+        queue = SignalQueue(priorities={"@ONT.RMR": 100}, express_priority=100)
+
+        self.assertTrue(queue.is_express(self.build("RMR")))
+        self.assertFalse(queue.is_express(self.build("TMR")))
+
+    def test_get_returns_highest_priority_first(self):
+        queue = SignalQueue(priorities={"@ONT.MMR": 50, "@ONT.TMR": 20})
+
+        t1 = self.build("TMR")
+        m1 = self.build("MMR")
+        t2 = self.build("TMR")
+        m2 = self.build("MMR")
+
+        for signal in [t1, m1, t2, m2]:
+            queue.put(signal)
+
+        self.assertEqual(
+            [m1, m2, t1, t2], list(map(lambda _: queue.get()[0], range(4)))
+        )
+        self.assertIsNone(queue.get())
+
+    def test_reject_policy(self):
+        queue = SignalQueue(max_depth=1, policy=SignalQueue.Policy.REJECT)
+
+        queue.put(self.build("TMR"))
+        rejected = self.build("MMR")
+
+        with self.assertRaises(SignalRejected):
+            queue.put(rejected)
+
+        self.assertEqual(1, queue.depth())
+        self.assertEqual(Signal.Status.REJECTED, rejected.status())
+        self.assertEqual(1, queue.metrics()["types"]["@ONT.MMR"]["rejected"])
+
+    def test_drop_lowest_policy(self):
+        queue = SignalQueue(
+            max_depth=1,
+            policy=SignalQueue.Policy.DROP_LOWEST,
+            priorities={"@ONT.MMR": 50, "@ONT.TMR": 20},
+        )
+
+        low = self.build("TMR")
+        high = self.build("MMR")
+
+        displaced = queue.put(low)
+        queue.put(high)
+
+        self.assertIsInstance(displaced.exception(), SignalRejected)
+        self.assertEqual(Signal.Status.REJECTED, low.status())
+        self.assertEqual(high, queue.get()[0])
+
+    def test_drop_lowest_policy_rejects_lower_priority(self):
+        queue = SignalQueue(
+            max_depth=1,
+            policy=SignalQueue.Policy.DROP_LOWEST,
+            priorities={"@ONT.MMR": 50, "@ONT.TMR": 20},
+        )
+
+        queue.put(self.build("MMR"))
+
+        with self.assertRaises(SignalRejected):
+            queue.put(self.build("TMR"))
+
+    def test_agent_input_uses_queue(self):
+        xmr = self.build("TMR")
+        self.agent.handle = MagicMock()
+
+        future = self.agent.input(xmr, join=True)
+
+        self.assertTrue(future.done())
+        self.agent.handle.assert_called_once_with(xmr, join=True)
+        self.assertEqual(0, self.agent.signals.depth())
+
+    def test_agent_input_skips_queue_for_express_signals(self):
+        xmr = self.build("RMR")
+        self.agent.handle = MagicMock()
+        self.agent.signals.put = MagicMock()
+
+        self.agent.input(xmr, join=True)
+
+        self.agent.handle.assert_called_once_with(xmr, join=True)
+        self.agent.signals.put.assert_not_called()
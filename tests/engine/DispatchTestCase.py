@@ -0,0 +1,151 @@
+from concurrent.futures import wait
+from ontoagent.engine.dispatch import (
+    DispatchRejected,
+    SynchronousDispatcher,
+    ThreadPoolDispatcher,
+    WorkerPool,
+)
+from tests.OntoAgentTestCase import OntoAgentTestCase
+import threading
+
+
+class SynchronousDispatcherTestCase(OntoAgentTestCase):
+
+    def test_submit_runs_inline(self):
+        dispatcher = SynchronousDispatcher()
+
+        future = dispatcher.submit("test", lambda: threading.current_thread())
+
+        self.assertTrue(future.done())
+        self.assertEqual(threading.current_thread(), future.result())
+
+    def test_submit_captures_exceptions(self):
+        dispatcher = SynchronousDispatcher()
+
+        def _fail():
+            raise ValueError("Something went wrong.")
+
+        future = dispatcher.submit("test", _fail)
+
+        self.assertIsInstance(future.exception(), ValueError)
+
+    def test_metrics(self):
+        dispatcher = SynchronousDispatcher()
+
+        dispatcher.submit("a", lambda: None)
+        dispatcher.submit("a", lambda: None)
+        dispatcher.submit("b", lambda: None)
+
+        metrics = dispatcher.metrics()
+        self.assertEqual(2, metrics["a"]["submitted"])
+        self.assertEqual(2, metrics["a"]["completed"])
+        self.assertEqual(1, metrics["b"]["submitted"])
+
+
+class ThreadPoolDispatcherTestCase(OntoAgentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.dispatcher = ThreadPoolDispatcher(workers=2, queue_depth=4)
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    def test_submit_runs_on_worker(self):
+        future = self.dispatcher.submit("test", lambda: threading.current_thread())
+
+        self.assertNotEqual(threading.current_thread(), future.result(timeout=5))
+
+    def test_worker_count_is_bounded(self):
+        release = threading.Event()
+        threads = set()
+
+        def _work():
+            threads.add(threading.current_thread())
+            release.wait(5)
+
+        futures = [self.dispatcher.submit("test", _work) for _ in range(4)]
+        release.set()
+        wait(futures, timeout=5)
+
+        self.assertLessEqual(len(threads), 2)
+        self.assertEqual(4, self.dispatcher.metrics()["test"]["completed"])
+
+    def test_pool_overrides(self):
+        dispatcher = ThreadPoolDispatcher(workers=2, pools={"input": {"workers": 1}})
+
+        self.assertEqual(1, dispatcher.pool("input").workers)
+        self.assertEqual(2, dispatcher.pool("handle").workers)
+
+    def _occupy(self, dispatcher: ThreadPoolDispatcher) -> tuple:
+        # Keeps a worker busy until the returned event is set.
+        started = threading.Event()
+        release = threading.Event()
+
+        def _work():
+            started.set()
+            release.wait(5)
+
+        blocking = dispatcher.submit("test", _work)
+        self.assertTrue(started.wait(5))
+        return blocking, release
+
+    def test_full_queue_runs_on_caller(self):
+        dispatcher = ThreadPoolDispatcher(workers=1, queue_depth=1)
+        blocking, release = self._occupy(dispatcher)
+        dispatcher.submit("test", lambda: None)
+        inline = dispatcher.submit("test", lambda: threading.current_thread())
+
+        self.assertEqual(threading.current_thread(), inline.result())
+        self.assertEqual(1, dispatcher.metrics()["test"]["inline"])
+
+        release.set()
+        blocking.result(timeout=5)
+        dispatcher.shutdown()
+
+    def test_submit_starts_a_worker_while_others_are_busy(self):
+        release = threading.Event()
+
+        blocking = self.dispatcher.submit("test", release.wait, 5)
+        quick = self.dispatcher.submit("test", lambda: None)
+
+        quick.result(timeout=5)
+        self.assertFalse(blocking.done())
+
+        release.set()
+        blocking.result(timeout=5)
+
+    def test_call_from_a_worker_runs_inline(self):
+        dispatcher = ThreadPoolDispatcher(
+            workers=1, queue_depth=1, policy=WorkerPool.Policy.BLOCK
+        )
+
+        def _outer():
+            inner = dispatcher.call("test", lambda: threading.current_thread())
+            return threading.current_thread(), inner.result()
+
+        outer, inner = dispatcher.submit("test", _outer).result(timeout=5)
+        self.assertEqual(outer, inner)
+        self.assertEqual(1, dispatcher.metrics()["test"]["inline"])
+        dispatcher.shutdown()
+
+    def test_call_from_another_thread_waits(self):
+        future = self.dispatcher.call("test", lambda: threading.current_thread())
+
+        self.assertTrue(future.done())
+        self.assertNotEqual(threading.current_thread(), future.result())
+
+    def test_full_queue_rejects(self):
+        dispatcher = ThreadPoolDispatcher(
+            workers=1, queue_depth=1, policy=WorkerPool.Policy.REJECT
+        )
+        blocking, release = self._occupy(dispatcher)
+        dispatcher.submit("test", lambda: None)
+
+        with self.assertRaises(DispatchRejected):
+            dispatcher.submit("test", lambda: None)
+        self.assertEqual(1, dispatcher.metrics()["test"]["rejected"])
+
+        release.set()
+        blocking.result(timeout=5)
+        dispatcher.shutdown()
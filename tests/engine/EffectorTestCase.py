@@ -1,7 +1,15 @@
-from ontoagent.engine.effector import Effector
+from ontoagent.engine.effector import (
+    Effector,
+    EffectorIndex,
+    EffectorQueue,
+    ReservationManager,
+)
+from ontoagent.engine.executable import EffectorExecutable
 from ontoagent.engine.signal import XMR
 from ontograph.Frame import Frame
 from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
+from unittest.mock import MagicMock, patch
+import time
 
 
 class EffectorTestCase(OntoAgentTestCase):
@@ -66,3 +74,398 @@ class EffectorTestCase(OntoAgentTestCase):
 
         Effector(e).set_interrupt(TestableExecutable)
         self.assertEqual([TestableExecutable], e["INTERRUPT"])
+
+    def test_timeout(self):
+        e = Frame("@TEST.EFFECTOR.?")
+        self.assertIsNone(Effector(e).timeout())
+
+        Effector(e).set_timeout(2.5)
+        self.assertEqual(2.5, Effector(e).timeout())
+
+    def test_release(self):
+        e = Effector.build()
+        e.set_status(Effector.Status.RESERVED)
+
+        e.release()
+        self.assertEqual(Effector.Status.AVAILABLE, e.status())
+
+
+class ReservationManagerTestCase(OntoAgentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.watches = []
+
+    def watch(self, timeout, callback):
+        self.watches.append(callback)
+        return len(self.watches)
+
+    def test_claim(self):
+        e = Effector.build()
+        holder = Frame("@TEST.HOLDER.?")
+
+        self.assertTrue(ReservationManager.is_available(e))
+
+        reservation = ReservationManager.claim(e, holder)
+        self.assertIsNotNone(reservation)
+        self.assertEqual(holder, ReservationManager.holder(e))
+        self.assertEqual(Effector.Status.RESERVED, e.status())
+        self.assertFalse(ReservationManager.is_available(e))
+
+    def test_claim_is_exclusive(self):
+        e = Effector.build()
+        h1 = Frame("@TEST.HOLDER.?")
+        h2 = Frame("@TEST.HOLDER.?")
+
+        reservation = ReservationManager.claim(e, h1)
+        self.assertIsNone(ReservationManager.claim(e, h2))
+        self.assertIs(reservation, ReservationManager.claim(e, h1))
+        self.assertEqual(h1, ReservationManager.holder(e))
+
+    def test_claim_respects_status_in_graph(self):
+        e = Frame("@TEST.EFFECTOR.?")
+        e["STATUS"] = Effector.Status.RESERVED
+
+        self.assertFalse(ReservationManager.is_available(Effector(e)))
+        self.assertIsNone(ReservationManager.claim(Effector(e), Frame("@TEST.H.?")))
+
+    def test_set_status_is_seen(self):
+        e = Effector.build()
+        self.assertTrue(ReservationManager.is_available(e))
+
+        e.set_status(Effector.Status.RESERVED)
+        self.assertFalse(ReservationManager.is_available(e))
+
+        e.release()
+        self.assertTrue(ReservationManager.is_available(e))
+
+    def test_stale_release_is_ignored(self):
+        e = Effector.build()
+
+        first = ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+        ReservationManager.release(e)
+        second = ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        self.assertFalse(ReservationManager.release(e, reservation=first))
+        self.assertIs(second, ReservationManager.reservation(e))
+        self.assertEqual(Effector.Status.RESERVED, e.status())
+
+    def test_default_lease(self):
+        e = Effector.build()
+
+        with patch("ontoagent.engine.effector.Watchdog.watch", self.watch):
+            reservation = ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        self.assertEqual(ReservationManager.lease, reservation.lease)
+        self.assertEqual(1, len(self.watches))
+
+    def test_running_work_is_renewed(self):
+        e = Effector.build()
+
+        with patch("ontoagent.engine.effector.Watchdog.watch", self.watch):
+            running = ReservationManager.claim(e, Frame("@TEST.HOLDER.?"), lease=5.0)
+            ReservationManager.started(running)
+            idle = ReservationManager.claim(
+                Effector.build(), Frame("@TEST.HOLDER.?"), lease=5.0
+            )
+
+            running.deadline = idle.deadline = time.monotonic() + 1.0
+            self.assertEqual(1, ReservationManager.renew_running())
+
+            ReservationManager.finished(running)
+            running.deadline = time.monotonic() + 1.0
+            self.assertEqual(0, ReservationManager.renew_running())
+
+        self.assertGreater(running.deadline, idle.deadline)
+
+    def test_lease_expires(self):
+        e = Effector.build()
+
+        with patch("ontoagent.engine.effector.Watchdog.watch", self.watch):
+            ReservationManager.claim(e, Frame("@TEST.HOLDER.?"), lease=5.0)
+
+        self.assertEqual(1, len(self.watches))
+        self.watches[0]()
+
+        self.assertTrue(ReservationManager.is_available(e))
+        self.assertEqual(Effector.Status.AVAILABLE, e.status())
+
+    def test_expired_lease_of_released_claim_is_ignored(self):
+        e = Effector.build()
+
+        with patch("ontoagent.engine.effector.Watchdog.watch", self.watch):
+            ReservationManager.claim(e, Frame("@TEST.HOLDER.?"), lease=5.0)
+            ReservationManager.release(e)
+            ReservationManager.claim(e, Frame("@TEST.HOLDER.?"), lease=5.0)
+
+        self.watches[0]()
+        self.assertFalse(ReservationManager.is_available(e))
+
+    def test_renew(self):
+        e = Effector.build()
+
+        with patch("ontoagent.engine.effector.Watchdog.watch", self.watch):
+            reservation = ReservationManager.claim(e, Frame("@TEST.H.?"), lease=5.0)
+            self.assertTrue(ReservationManager.renew(reservation, lease=10.0))
+
+        self.assertEqual(10.0, reservation.lease)
+        self.assertEqual(2, len(self.watches))
+
+    def test_preempt(self):
+        e = Effector.build()
+        e.set_interrupt(InterruptExecutable)
+        xmr = XMR.build(Frame("@TEST.EVENT.?"))
+
+        preempted = []
+        low = Frame("@TEST.HOLDER.?")
+        high = Frame("@TEST.HOLDER.?")
+        ReservationManager.claim(e, low, priority=1.0, on_preempt=preempted.append)
+        ReservationManager.assign(e, xmr)
+
+        reservation = ReservationManager.preempt(self.agent, e, high, 5.0)
+
+        self.assertIsNotNone(reservation)
+        self.assertEqual(high, ReservationManager.holder(e))
+        self.assertEqual(5.0, reservation.priority)
+        self.assertEqual([e], preempted)
+        self.assertEqual(xmr.anchor, Frame("@TEST.INTERRUPTED")["XMR"].singleton())
+
+    def test_preempt_drops_queued_output(self):
+        e = Effector.build()
+        e.set_interrupt(InterruptExecutable)
+        e.run = MagicMock()
+
+        low = Frame("@TEST.HOLDER.?")
+        high = Frame("@TEST.HOLDER.?")
+        ReservationManager.claim(e, low, priority=1.0)
+        xmr = XMR.build(Frame("@TEST.EVENT.?"))
+        ReservationManager.assign(e, xmr)
+
+        # The output is queued, but has not started yet.
+        queued = []
+        with patch.object(
+            self.agent,
+            "_dispatch",
+            side_effect=lambda pool, fn, *args, join=None: queued.append((fn, args)),
+        ):
+            self.agent.output(xmr, e, holder=low)
+
+        ReservationManager.preempt(self.agent, e, high, 5.0)
+        self.assertEqual(xmr.anchor, Frame("@TEST.INTERRUPTED")["XMR"].singleton())
+
+        for fn, args in queued:
+            fn(*args)
+
+        e.run.assert_not_called()
+        self.assertEqual(high, ReservationManager.holder(e))
+
+    def test_preempted_timeout_keeps_new_holder(self):
+        e = Effector.build(executable=TestableEffectorExecutable)
+        e.set_interrupt(InterruptExecutable)
+        e.set_timeout(5.0)
+
+        low = Frame("@TEST.HOLDER.?")
+        high = Frame("@TEST.HOLDER.?")
+        ReservationManager.claim(e, low, priority=1.0)
+        with patch.object(TestableEffectorExecutable, "_run_watched") as run_watched:
+            e.run(self.agent, XMR.build(Frame("@TEST.EVENT.?")))
+
+        ReservationManager.preempt(self.agent, e, high, 5.0)
+
+        # The preempted run times out after losing the effector.
+        run_watched.call_args.kwargs["on_timeout"]()
+
+        self.assertEqual(high, ReservationManager.holder(e))
+
+    def test_preempt_requires_higher_priority(self):
+        e = Effector.build()
+        e.set_interrupt(InterruptExecutable)
+
+        low = Frame("@TEST.HOLDER.?")
+        ReservationManager.claim(e, low, priority=5.0)
+
+        self.assertIsNone(
+            ReservationManager.preempt(self.agent, e, Frame("@TEST.H.?"), 5.0)
+        )
+        self.assertEqual(low, ReservationManager.holder(e))
+
+    def test_preempt_requires_interrupt(self):
+        e = Effector.build()
+
+        low = Frame("@TEST.HOLDER.?")
+        ReservationManager.claim(e, low, priority=1.0)
+
+        self.assertIsNone(
+            ReservationManager.preempt(self.agent, e, Frame("@TEST.H.?"), 5.0)
+        )
+        self.assertEqual(low, ReservationManager.holder(e))
+
+    def test_preempt_never_takes_unmanaged_reservations(self):
+        e = Effector.build()
+        e.set_interrupt(InterruptExecutable)
+        e.set_status(Effector.Status.RESERVED)
+
+        self.assertIsNone(
+            ReservationManager.preempt(self.agent, e, Frame("@TEST.H.?"), 100.0)
+        )
+
+    def test_preempt_available_effector_claims_it(self):
+        e = Effector.build()
+        holder = Frame("@TEST.HOLDER.?")
+
+        self.assertIsNotNone(ReservationManager.preempt(self.agent, e, holder, 1.0))
+        self.assertEqual(holder, ReservationManager.holder(e))
+        self.assertEqual([], Frame("@TEST.INTERRUPTED")["XMR"])
+
+
+class EffectorIndexTestCase(OntoAgentTestCase):
+
+    def test_available(self):
+        hand = Effector.build(type=Frame("@ONT.HAND"))
+        speaker = Effector.build(type=Frame("@ONT.SPEAKER"))
+        self.agent.add_effector(hand)
+        self.agent.add_effector(speaker)
+
+        self.assertEqual(hand, EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+        self.assertEqual(
+            speaker,
+            EffectorIndex.available(self.agent, Effector(Frame("@ONT.SPEAKER"))),
+        )
+        self.assertIsNone(EffectorIndex.available(self.agent, Frame("@ONT.WHEEL")))
+
+    def test_available_includes_ancestors(self):
+        Frame("@ONT.HAND").add_parent("@ONT.LIMB")
+        hand = Effector.build(type=Frame("@ONT.HAND"))
+        self.agent.add_effector(hand)
+
+        self.assertEqual(hand, EffectorIndex.available(self.agent, Frame("@ONT.LIMB")))
+
+    def test_follows_reservations(self):
+        hand = Effector.build(type=Frame("@ONT.HAND"))
+        self.agent.add_effector(hand)
+        self.assertEqual(hand, EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+
+        ReservationManager.claim(hand, Frame("@TEST.HOLDER.?"))
+        self.assertIsNone(EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+
+        hand.release()
+        self.assertEqual(hand, EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+
+    def test_skips_reserved_effectors(self):
+        hand = Effector.build(type=Frame("@ONT.HAND"))
+        hand.set_status(Effector.Status.RESERVED)
+        self.agent.add_effector(hand)
+
+        self.assertIsNone(EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+
+    def test_claim(self):
+        h1 = Effector.build(type=Frame("@ONT.HAND"))
+        h2 = Effector.build(type=Frame("@ONT.HAND"))
+        self.agent.add_effector(h1)
+        self.agent.add_effector(h2)
+
+        first = EffectorIndex.claim(self.agent, Frame("@ONT.HAND"), Frame("@TEST.H.?"))
+        second = EffectorIndex.claim(self.agent, Frame("@ONT.HAND"), Frame("@TEST.H.?"))
+        third = EffectorIndex.claim(self.agent, Frame("@ONT.HAND"), Frame("@TEST.H.?"))
+
+        self.assertEqual({h1, h2}, {first, second})
+        self.assertIsNone(third)
+
+    def test_add_effector_invalidates(self):
+        self.assertIsNone(EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+
+        hand = Effector.build(type=Frame("@ONT.HAND"))
+        self.agent.add_effector(hand)
+
+        self.assertEqual(hand, EffectorIndex.available(self.agent, Frame("@ONT.HAND")))
+
+    def test_preempt_lowest_priority(self):
+        h1 = Effector.build(type=Frame("@ONT.HAND"))
+        h2 = Effector.build(type=Frame("@ONT.HAND"))
+        h1.set_interrupt(InterruptExecutable)
+        h2.set_interrupt(InterruptExecutable)
+        self.agent.add_effector(h1)
+        self.agent.add_effector(h2)
+
+        ReservationManager.claim(h1, Frame("@TEST.H.?"), priority=3.0)
+        ReservationManager.claim(h2, Frame("@TEST.H.?"), priority=2.0)
+
+        holder = Frame("@TEST.HOLDER.?")
+        effector = EffectorIndex.preempt(self.agent, Frame("@ONT.HAND"), holder, 4.0)
+
+        self.assertEqual(h2, effector)
+        self.assertEqual(holder, ReservationManager.holder(h2))
+        self.assertIsNone(
+            EffectorIndex.preempt(self.agent, Frame("@ONT.HAND"), holder, 2.5)
+        )
+
+
+class EffectorQueueTestCase(OntoAgentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.started = []
+
+    def start(self, name, result=True):
+        def _start(effector):
+            self.started.append(name)
+            return result
+
+        return _start
+
+    def test_push_starts_at_once_if_available(self):
+        e = Effector.build()
+        holder = Frame("@TEST.HOLDER.?")
+
+        self.assertTrue(EffectorQueue.push(e, holder, self.start("a")))
+        self.assertEqual(["a"], self.started)
+        self.assertEqual(holder, ReservationManager.holder(e))
+
+    def test_release_drains_in_priority_order(self):
+        e = Effector.build()
+        ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        EffectorQueue.push(e, Frame("@TEST.HOLDER.?"), self.start("low"), priority=1)
+        EffectorQueue.push(e, Frame("@TEST.HOLDER.?"), self.start("hi"), priority=5)
+        EffectorQueue.push(e, Frame("@TEST.HOLDER.?"), self.start("low2"), priority=1)
+        self.assertEqual([], self.started)
+        self.assertEqual(3, EffectorQueue.length(e))
+
+        e.release()
+        self.assertEqual(["hi"], self.started)
+        e.release()
+        e.release()
+        self.assertEqual(["hi", "low", "low2"], self.started)
+        self.assertEqual(0, EffectorQueue.length(e))
+
+    def test_unwanted_work_is_skipped(self):
+        e = Effector.build()
+        ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        EffectorQueue.push(e, Frame("@TEST.HOLDER.?"), self.start("a", False))
+        EffectorQueue.push(e, Frame("@TEST.HOLDER.?"), self.start("b"))
+
+        e.release()
+        self.assertEqual(["a", "b"], self.started)
+        self.assertFalse(ReservationManager.is_available(e))
+
+    def test_bounded(self):
+        EffectorQueue.size = 1
+        try:
+            e = Effector.build()
+            ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+            self.assertTrue(EffectorQueue.push(e, Frame("@TEST.H.?"), self.start("a")))
+            self.assertFalse(EffectorQueue.push(e, Frame("@TEST.H.?"), self.start("b")))
+        finally:
+            EffectorQueue.size = 16
+
+
+class TestableEffectorExecutable(EffectorExecutable):
+    def run(self, agent, xmr, effector):
+        pass
+
+
+class InterruptExecutable(EffectorExecutable):
+    def run(self, agent, xmr, effector):
+        Frame("@TEST.INTERRUPTED")["XMR"] = xmr.anchor
@@ -5,6 +5,7 @@ from ontoagent.engine.executable import (
     HandleExecutable,
     ProactiveExecutable,
 )
+from ontoagent.engine.operation import Operation
 from ontoagent.engine.report import Report
 from ontoagent.engine.signal import Signal, XMR
 from ontograph.Frame import Frame
@@ -141,3 +142,86 @@ class EffectorExecutableTestCase(OntoAgentTestCase):
         )
 
         self.assertEqual(Report.Status.FINISHED, e.report.status())
+
+
+class TimeoutTestCase(OntoAgentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        _callbacks.clear()
+
+    def watch(self, timeout, callback):
+        _callbacks.append(callback)
+        return len(_callbacks)
+
+    def test_no_timeout_is_not_watched(self):
+        e = HangingHandleExecutable()
+
+        with patch("ontoagent.engine.executable.Watchdog.watch") as mock_watch:
+            e._run_watched(self.agent, signal=Signal.build(Frame("@TEST.ROOT.?")))
+
+        mock_watch.assert_not_called()
+        self.assertEqual(Report.Status.FINISHED, e.report.status())
+
+    def test_timeout_marks_report_and_cancels(self):
+        e = HangingHandleExecutable()
+
+        with patch("ontoagent.engine.executable.Watchdog.watch", self.watch):
+            e._run_watched(
+                self.agent, timeout=0.5, signal=Signal.build(Frame("@TEST.ROOT.?"))
+            )
+
+        self.assertTrue(e.timed_out())
+        self.assertTrue(Frame("@TEST.TIMEOUT")["CANCELLED"].singleton())
+        self.assertEqual(Report.Status.TIMED_OUT, e.report.status())
+        self.assertIsNotNone(e.report.message())
+
+    def test_timeout_after_finish_is_ignored(self):
+        e = ProactiveExecutableTestCase.TestableProactiveExecutable()
+        e._run(self.agent)
+
+        e.time_out(0.5)
+
+        self.assertFalse(e.timed_out())
+        self.assertEqual(Report.Status.FINISHED, e.report.status())
+
+    def test_operation_timeout(self):
+        op = Operation.build("SYS", HangingHandleExecutable)
+        op.set_timeout(0.5)
+        self.assertEqual(0.5, op.timeout())
+
+        with patch("ontoagent.engine.executable.Watchdog.watch", self.watch):
+            report = op.run(self.agent, signal=Signal.build(Frame("@TEST.ROOT.?")))
+
+        self.assertEqual(Report.Status.TIMED_OUT, report.status())
+
+    def test_effector_timeout_releases_effector(self):
+        effector = Effector.build(executable=HangingEffectorExecutable)
+        effector.set_timeout(0.5)
+        effector.set_status(Effector.Status.RESERVED)
+
+        with patch("ontoagent.engine.executable.Watchdog.watch", self.watch):
+            report = effector.run(self.agent, XMR.build(Frame("@TEST.ROOT.?")))
+
+        self.assertEqual(Report.Status.TIMED_OUT, report.status())
+        self.assertEqual(Effector.Status.AVAILABLE, effector.status())
+
+
+_callbacks = []
+
+
+def _fire():
+    # Stands in for the watchdog firing while an executable is running.
+    for callback in _callbacks:
+        callback()
+
+
+class HangingHandleExecutable(HandleExecutable):
+    def run(self, agent: "Agent", signal: "Signal"):
+        _fire()
+        Frame("@TEST.TIMEOUT")["CANCELLED"] = self.cancelled()
+
+
+class HangingEffectorExecutable(EffectorExecutable):
+    def run(self, agent: "Agent", xmr: "XMR", effector: "Effector"):
+        _fire()
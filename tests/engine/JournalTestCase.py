@@ -0,0 +1,164 @@
+from ontoagent.agent import Agent
+from ontoagent.engine.dispatch import ThreadPoolDispatcher
+from ontoagent.engine.journal import JournalReplay, SignalJournal
+from ontoagent.engine.retention import RetentionPolicy
+from ontoagent.engine.signal import Signal
+from ontoagent.utils.inputs import InputSignalSpeech
+from ontograph.Frame import Frame
+from tests.OntoAgentTestCase import OntoAgentTestCase
+from unittest.mock import MagicMock
+import json
+import os
+import tempfile
+
+
+class JournalTestCase(OntoAgentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "journal.jsonl")
+        self.journal = SignalJournal(self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_record(self):
+        signal = InputSignalSpeech.build_from_text("Hello.", speaker="@ENV.HUMAN.1")
+        self.journal.record("input", signal)
+        self.journal.close()
+
+        with open(self.path) as file:
+            records = list(map(json.loads, file.readlines()))
+
+        self.assertEqual(1, len(records))
+        self.assertEqual("input", records[0]["kind"])
+        self.assertEqual(signal.anchor.id, records[0]["anchor"])
+        self.assertEqual(signal.space().name, records[0]["space"])
+
+        ids = list(map(lambda frame: frame["id"], records[0]["frames"]))
+        self.assertIn(signal.anchor.id, ids)
+        self.assertIn(signal.root().id, ids)
+
+    def test_agent_records_input(self):
+        Agent.journal = self.journal
+        self.agent._input = MagicMock()
+
+        signal = InputSignalSpeech.build_from_text("Hello.")
+        self.agent.input(signal, join=True)
+        self.journal.close()
+
+        entries = list(JournalReplay(self.path).entries())
+        self.assertEqual(1, len(entries))
+        self.assertEqual(signal.anchor.id, entries[0]["anchor"])
+
+    def test_agent_does_not_record_handle(self):
+        Agent.journal = self.journal
+        self.agent._handle = MagicMock()
+
+        self.agent.handle(InputSignalSpeech.build_from_text("Hello."), join=True)
+        self.journal.close()
+
+        self.assertEqual(0, len(list(JournalReplay(self.path).entries(kinds=None))))
+
+    def test_restore(self):
+        signal = InputSignalSpeech.build_from_text("Hello.", speaker="@ENV.HUMAN.1")
+        self.journal.record("input", signal)
+        self.journal.close()
+
+        entry = next(JournalReplay(self.path).entries())
+        restored = JournalReplay(self.path).restore(entry)
+
+        self.assertIsInstance(restored, InputSignalSpeech)
+        self.assertNotEqual(signal.anchor, restored.anchor)
+        self.assertNotEqual(signal.space().name, restored.space().name)
+        self.assertEqual("Hello.", restored.text())
+        self.assertEqual(Frame("@ENV.HUMAN.1"), restored.speaker())
+        self.assertEqual(Signal.Status.RECEIVED, restored.status())
+        self.assertIn(restored.root(), restored.constituents())
+        self.assertEqual(restored.space().name, restored.root().space())
+
+    def test_replay(self):
+        self.journal.record("input", InputSignalSpeech.build_from_text("One."))
+        self.journal.record("output", InputSignalSpeech.build_from_text("Two."))
+        self.journal.record("input", InputSignalSpeech.build_from_text("Three."))
+        self.journal.close()
+
+        self.agent.input = MagicMock()
+        self.agent.handle = MagicMock()
+
+        futures = JournalReplay(self.path).replay(self.agent)
+
+        self.assertEqual(2, len(futures))
+        texts = [call.args[0].text() for call in self.agent.input.call_args_list]
+        self.assertEqual(["One.", "Three."], texts)
+        self.agent.handle.assert_not_called()
+
+    def test_recover(self):
+        consumed = InputSignalSpeech.build_from_text("One.")
+        pending = InputSignalSpeech.build_from_text("Two.")
+        self.journal.record("input", consumed)
+        self.journal.record("input", pending)
+        self.journal.close()
+
+        consumed.set_status(Signal.Status.CONSUMED)
+        self.agent.input = MagicMock()
+
+        JournalReplay(self.path).recover(self.agent)
+
+        self.agent.input.assert_called_once_with(pending, join=None)
+
+    def test_recover_does_not_record_again(self):
+        self.journal.record("input", InputSignalSpeech.build_from_text("One."))
+        self.journal.close()
+
+        Agent.journal = self.journal
+        self.agent._input = MagicMock()
+
+        JournalReplay(self.path).recover(self.agent, join=True)
+        self.journal.close()
+
+        self.agent._input.assert_called_once()
+        self.assertEqual(1, len(list(JournalReplay(self.path).entries(kinds=None))))
+
+    def test_recover_skips_compacted_signals(self):
+        signal = InputSignalSpeech.build_from_text("One.")
+        self.journal.record("input", signal)
+        signal.set_timestamp(1)
+        signal.set_status(Signal.Status.CONSUMED)
+
+        RetentionPolicy(journal=self.journal).compact()
+        self.journal.close()
+        self.assertEqual(0, len(list(signal.anchor.slots())))
+
+        self.agent.input = MagicMock()
+        JournalReplay(self.path).recover(self.agent)
+
+        self.agent.input.assert_not_called()
+
+    def test_recover_on_workers_does_not_record_outputs(self):
+        self.journal.record("input", InputSignalSpeech.build_from_text("One."))
+        self.journal.close()
+
+        Agent.journal = self.journal
+        Agent.dispatcher = ThreadPoolDispatcher(workers=1)
+        self.agent._input = lambda signal, join: self.agent.output(signal, MagicMock())
+        self.agent._output = MagicMock()
+        try:
+            JournalReplay(self.path).recover(self.agent, join=True)
+        finally:
+            Agent.dispatcher.shutdown()
+        self.journal.close()
+
+        self.agent._output.assert_called_once()
+        self.assertEqual(1, len(list(JournalReplay(self.path).entries(kinds=None))))
+
+    def test_partial_record_is_skipped(self):
+        self.journal.record("input", InputSignalSpeech.build_from_text("One."))
+        self.journal.close()
+
+        with open(self.path, "a") as file:
+            file.write('{"kind":"input","rec')
+
+        self.assertEqual(1, len(list(JournalReplay(self.path).entries())))
@@ -1,6 +1,12 @@
-from ontoagent.engine.operation import Operable, Operation
+from ontoagent.engine.operation import (
+    CompiledOperation,
+    DispatchTable,
+    Operable,
+    Operation,
+)
 from ontoagent.engine.report import Report
 from ontoagent.engine.signal import Signal
+from ontoagent.utils.loader import KnowledgeLoader
 from ontograph.Frame import Frame
 from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
 from unittest.mock import MagicMock, patch
@@ -69,3 +75,123 @@ class OperationTestCase(OntoAgentTestCase):
 
         Operation(o).set_requires_effector(e)
         self.assertEqual([e], o["REQUIRES-EFFECTOR"])
+
+    def test_add_after(self):
+        op1 = Operation.build("SYS", TestableExecutable)
+        op2 = Operation.build("SYS", TestableExecutable)
+        self.assertEqual([], op1.after())
+
+        op1.add_after(op2)
+        self.assertEqual([op2.anchor], op1.after())
+
+    def test_ordered(self):
+        a = Operation.build("SYS", TestableExecutable)
+        b = Operation.build("SYS", TestableExecutable)
+        c = Operation.build("SYS", TestableExecutable)
+        a.add_after(c)
+
+        self.assertEqual([b, c, a], Operation.ordered([a, b, c]))
+
+    def test_layers(self):
+        a = Operation.build("SYS", TestableExecutable)
+        b = Operation.build("SYS", TestableExecutable)
+        c = Operation.build("SYS", TestableExecutable)
+        d = Operation.build("SYS", TestableExecutable)
+        b.add_after(a)
+        c.add_after(a)
+        d.add_after(b)
+
+        self.assertEqual([[a], [b, c], [d]], Operation.layers([a, b, c, d]))
+
+    def test_layers_ignore_missing_dependencies(self):
+        a = Operation.build("SYS", TestableExecutable)
+        b = Operation.build("SYS", TestableExecutable)
+        a.add_after(Frame("@SYS.OPERATION.?"))
+
+        self.assertEqual([[a, b]], Operation.layers([a, b]))
+
+    def test_layers_break_cycles(self):
+        a = Operation.build("SYS", TestableExecutable)
+        b = Operation.build("SYS", TestableExecutable)
+        a.add_after(b)
+        b.add_after(a)
+
+        self.assertEqual([a, b], Operation.ordered([a, b]))
+
+
+class DispatchTableTestCase(OntoAgentTestCase):
+
+    def test_operations(self):
+        c = Frame("@ONT.CONCEPT.?")
+        op = Operation.build("SYS", TestableExecutable)
+        Operable(c).add_operation(op)
+
+        operations = DispatchTable.operations(c)
+
+        self.assertEqual([op], operations)
+        self.assertIsInstance(operations[0], CompiledOperation)
+        self.assertEqual(TestableExecutable, operations[0].executable_type())
+        self.assertIsNone(operations[0].requires_effector())
+
+    def test_operations_are_cached(self):
+        c = Frame("@ONT.CONCEPT.?")
+        Operable(c).add_operation(Operation.build("SYS", TestableExecutable))
+        DispatchTable.operations(c)
+
+        with patch.object(Operable, "operations") as mock_operations:
+            DispatchTable.operations(c)
+            mock_operations.assert_not_called()
+
+    def test_compiled_operation_does_not_read_graph(self):
+        c = Frame("@ONT.CONCEPT.?")
+        op = Operation.build("SYS", TestableExecutable)
+        Operable(c).add_operation(op)
+
+        compiled = DispatchTable.operations(c)[0]
+        op.anchor["EXECUTABLE"] = []
+
+        self.assertIsInstance(compiled.executable(), TestableExecutable)
+
+    def test_add_operation_invalidates(self):
+        c = Frame("@ONT.CONCEPT.?")
+        op1 = Operation.build("SYS", TestableExecutable)
+        op2 = Operation.build("SYS", TestableExecutable)
+
+        Operable(c).add_operation(op1)
+        self.assertEqual([op1], DispatchTable.operations(c))
+
+        Operable(c).add_operation(op2)
+        self.assertEqual([op1, op2], DispatchTable.operations(c))
+
+        Operable(c).clear_operations()
+        self.assertEqual([], DispatchTable.operations(c))
+
+    def test_add_operation_to_parent_invalidates_children(self):
+        parent = Frame("@ONT.CONCEPT.?")
+        child = Frame("@ONT.CONCEPT.?").add_parent(parent)
+        op = Operation.build("SYS", TestableExecutable)
+
+        self.assertEqual([], DispatchTable.operations(child))
+
+        Operable(parent).add_operation(op)
+        self.assertEqual([op], DispatchTable.operations(child))
+
+    def test_set_requires_effector_invalidates(self):
+        c = Frame("@ONT.CONCEPT.?")
+        e = Frame("@TEST.EFFECTOR.?")
+        op = Operation.build("SYS", TestableExecutable)
+        Operable(c).add_operation(op)
+        DispatchTable.operations(c)
+
+        op.set_requires_effector(e)
+
+        self.assertEqual(e, DispatchTable.operations(c)[0].requires_effector())
+
+    def test_knowledge_load_invalidates(self):
+        c = Frame("@ONT.CONCEPT.?")
+        Operable(c).add_operation(Operation.build("SYS", TestableExecutable))
+        DispatchTable.operations(c)
+
+        KnowledgeLoader.changed()
+
+        self.assertEqual({}, DispatchTable._routes)
@@ -1,10 +1,15 @@
 from ontoagent.agent import Agent
 from ontoagent.engine.executable import ProactiveExecutable
 from ontoagent.engine.operation import Operation
-from ontoagent.engine.proactivity import Proactivity
+from ontoagent.engine.proactivity import (
+    ProactiveOperation,
+    ProactiveTrigger,
+    Proactivity,
+)
 from ontograph.Frame import Frame
 from ontograph.Space import Space
 from tests.OntoAgentTestCase import OntoAgentTestCase
+from unittest.mock import patch
 
 
 class TestableProactiveExecutable(ProactiveExecutable):
@@ -60,3 +65,119 @@ class ProactivityTestCase(OntoAgentTestCase):
             p.operations()[0].executable(), TestableProactiveExecutable
         )
         self.assertIsNone(p.operations()[0].requires_effector())
+
+
+class ProactivitySchedulingTestCase(OntoAgentTestCase):
+
+    def runs(self) -> int:
+        return len(list(Frame("@TEST.TESTABLE.1")["RUN"]))
+
+    def build(self) -> (Proactivity, ProactiveOperation):
+        op = ProactiveOperation(
+            Operation.build(Space("TEST"), TestableProactiveExecutable).anchor
+        )
+        return Proactivity.build(Space("TEST"), operations=[op]), op
+
+    def test_scheduling_slots(self):
+        _, op = self.build()
+        self.assertIsNone(op.period())
+        self.assertEqual(0, op.catch_up())
+
+        op.set_period(2.0)
+        op.set_jitter(0.5)
+        op.set_catch_up(3)
+        op.set_min_gap(1.0)
+        op.set_trigger(TestableTrigger)
+
+        self.assertEqual(2.0, op.period())
+        self.assertEqual(0.5, op.jitter())
+        self.assertEqual(3, op.catch_up())
+        self.assertEqual(1.0, op.min_gap())
+        self.assertEqual(TestableTrigger, op.trigger())
+
+    def test_unscheduled_runs_every_time(self):
+        p, _ = self.build()
+        for now in [0.0, 0.1, 0.2]:
+            p.run(self.agent, now=now)
+        self.assertEqual(3, self.runs())
+
+    def test_period(self):
+        p, op = self.build()
+        op.set_period(1.0)
+
+        for now in [0.0, 0.25, 0.5, 0.75, 1.0, 1.25, 2.0]:
+            p.run(self.agent, now=now)
+        self.assertEqual(3, self.runs())
+
+    def test_period_drops_missed_runs(self):
+        p, op = self.build()
+        op.set_period(1.0)
+
+        for now in [0.0, 10.0, 10.25, 10.5]:
+            p.run(self.agent, now=now)
+        self.assertEqual(2, self.runs())
+
+    def test_period_catches_up(self):
+        p, op = self.build()
+        op.set_period(1.0)
+        op.set_catch_up(2)
+
+        for now in [0.0, 10.0, 10.25, 10.5, 10.75]:
+            p.run(self.agent, now=now)
+        self.assertEqual(4, self.runs())
+
+    def test_jitter(self):
+        p, op = self.build()
+        op.set_period(1.0)
+        op.set_jitter(0.5)
+
+        with patch("ontoagent.engine.proactivity.random.uniform", return_value=0.5):
+            for now in [0.0, 0.25]:
+                p.run(self.agent, now=now)
+            self.assertEqual(0, self.runs())
+
+            for now in [0.5, 1.0, 1.5]:
+                p.run(self.agent, now=now)
+            self.assertEqual(2, self.runs())
+
+    def test_min_gap(self):
+        p, op = self.build()
+        op.set_min_gap(1.0)
+
+        for now in [0.0, 0.5, 1.0, 1.5, 2.0]:
+            p.run(self.agent, now=now)
+        self.assertEqual(3, self.runs())
+
+    def test_trigger(self):
+        p, op = self.build()
+        op.set_trigger(TestableTrigger)
+
+        p.run(self.agent, now=0.0)
+        Frame("@TEST.TRIGGER")["FIRE"] = True
+        p.run(self.agent, now=0.1)
+        self.assertEqual(1, self.runs())
+
+    def test_trigger_with_period(self):
+        p, op = self.build()
+        op.set_period(10.0)
+        op.set_trigger(TestableTrigger)
+
+        p.run(self.agent, now=0.0)
+        p.run(self.agent, now=1.0)
+        Frame("@TEST.TRIGGER")["FIRE"] = True
+        p.run(self.agent, now=2.0)
+        self.assertEqual(2, self.runs())
+
+    def test_changing_the_schedule_keeps_the_last_run(self):
+        p, op = self.build()
+        op.set_min_gap(1.0)
+        p.run(self.agent, now=0.0)
+
+        op.set_min_gap(2.0)
+        p.run(self.agent, now=1.5)
+        self.assertEqual(1, self.runs())
+
+
+class TestableTrigger(ProactiveTrigger):
+    def fire(self, agent):
+        return Frame("@TEST.TRIGGER")["FIRE"].singleton() is True
@@ -1,4 +1,5 @@
-from ontoagent.engine.report import Report
+from ontoagent.engine.report import Report, ReportBuffer
+from ontoagent.engine.signal import Signal
 from ontograph.Frame import Frame
 from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
 
@@ -78,3 +79,114 @@ class ReportTestCase(OntoAgentTestCase):
         self.assertEqual(2, len(Report(r).execution_exceptions()))
         self.assertEqual(type(e2), type(Report(r).execution_exceptions()[1]))
         self.assertEqual(e2.args, Report(r).execution_exceptions()[1].args)
+
+
+class ReportPersistenceTestCase(OntoAgentTestCase):
+
+    def build(self, status: Report.Status) -> Report:
+        signal = Signal.build(Frame("@TEST.ROOT.?"))
+        report = Report.build(TestableExecutable)
+        signal.add_report(report)
+        report.set_status(status)
+        self.signal = signal
+        return report
+
+    def test_all_writes_through(self):
+        report = Report.build(TestableExecutable)
+
+        self.assertTrue(report.persisted())
+        self.assertEqual(Report.Status.PENDING, report.anchor["STATUS"].singleton())
+
+    def test_in_memory_report_api(self):
+        Report.persistence = Report.Persistence.NONE
+        report = Report.build(TestableExecutable)
+
+        report.set_validation(True)
+        report.set_message("Message.")
+        report.add_execution_exception(ValueError("Error."))
+
+        self.assertFalse(report.persisted())
+        self.assertIsNone(report.anchor)
+        self.assertEqual(TestableExecutable, report.executable())
+        self.assertEqual(Report.Status.PENDING, report.status())
+        self.assertTrue(report.validation())
+        self.assertEqual("Message.", report.message())
+        self.assertEqual(1, len(report.execution_exceptions()))
+        self.assertEqual([report], ReportBuffer.recent())
+
+    def test_none_keeps_reports_in_memory(self):
+        Report.persistence = Report.Persistence.NONE
+        report = self.build(Report.Status.FAILED)
+
+        self.assertFalse(report.persisted())
+        self.assertEqual([], self.signal.anchor["HAS-REPORT"])
+        self.assertEqual([report], self.signal.reports())
+
+    def test_failures(self):
+        Report.persistence = Report.Persistence.FAILURES
+        finished = self.build(Report.Status.FINISHED)
+        failed = self.build(Report.Status.FAILED)
+        timed_out = self.build(Report.Status.TIMED_OUT)
+
+        self.assertFalse(finished.persisted())
+        self.assertTrue(failed.persisted())
+        self.assertTrue(timed_out.persisted())
+
+    def test_sampled(self):
+        Report.persistence = Report.Persistence.SAMPLED
+        Report.sample_rate = 0.0
+        try:
+            finished = self.build(Report.Status.FINISHED)
+            failed = self.build(Report.Status.FAILED)
+        finally:
+            Report.sample_rate = 0.1
+
+        self.assertFalse(finished.persisted())
+        self.assertTrue(failed.persisted())
+
+    def test_batches(self):
+        Report.batch_size = 3
+        r1 = self.build(Report.Status.FINISHED)
+        r2 = self.build(Report.Status.FINISHED)
+
+        self.assertFalse(r1.persisted())
+        self.assertFalse(r2.persisted())
+
+        r3 = self.build(Report.Status.FINISHED)
+
+        self.assertTrue(r1.persisted())
+        self.assertTrue(r3.persisted())
+        self.assertEqual([r3.anchor], self.signal.anchor["HAS-REPORT"])
+        self.assertEqual(Report.Status.FINISHED, r3.anchor["STATUS"].singleton())
+
+    def test_flush(self):
+        Report.batch_size = 10
+        report = self.build(Report.Status.FINISHED)
+        pending = Report.build(TestableExecutable)
+
+        self.assertEqual(1, ReportBuffer.flush())
+
+        self.assertTrue(report.persisted())
+        self.assertFalse(pending.persisted())
+        self.assertEqual([report], self.signal.reports())
+
+    def test_ring_buffer_is_bounded(self):
+        Report.persistence = Report.Persistence.NONE
+        ReportBuffer.size = 2
+        try:
+            reports = [self.build(Report.Status.FINISHED) for _ in range(3)]
+        finally:
+            ReportBuffer.size = 1000
+
+        self.assertEqual([reports[2], reports[1]], ReportBuffer.recent())
+        self.assertEqual([], ReportBuffer.reports_for(reports[0]._signal))
+
+    def test_forget(self):
+        Report.persistence = Report.Persistence.NONE
+        report = self.build(Report.Status.FINISHED)
+        kept = self.build(Report.Status.FINISHED)
+
+        ReportBuffer.forget(report._signal)
+
+        self.assertEqual([kept], ReportBuffer.recent())
+        self.assertEqual([], ReportBuffer.reports_for(report._signal))
@@ -0,0 +1,164 @@
+from ontoagent.engine.report import Report
+from ontoagent.engine.retention import JSONLinesArchive, RetentionPolicy
+from ontoagent.engine.signal import Signal, SignalIndex
+from ontoagent.views.agenda import Agenda, Goal, Plan, Step
+from ontograph.Frame import Frame
+from ontograph.Space import Space
+from tests.OntoAgentTestCase import OntoAgentTestCase
+from unittest.mock import patch
+import json
+import os
+import tempfile
+
+
+class RetentionTestCase(OntoAgentTestCase):
+
+    def build_signal(self, timestamp: int, status: Signal.Status) -> Signal:
+        space = Signal.next_available_space("TMR")
+        root = space.frame("@.EVENT.?")
+        signal = Signal.build(root, space=space)
+        signal.set_timestamp(timestamp)
+        signal.set_status(status)
+        return signal
+
+    def test_compact_removes_consumed_signals(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        consumed = self.build_signal(1, Signal.Status.CONSUMED)
+        received = self.build_signal(2, Signal.Status.RECEIVED)
+
+        self.assertEqual(1, RetentionPolicy().compact())
+
+        self.assertEqual([], consumed.anchor["STATUS"])
+        self.assertEqual([], list(consumed.space()))
+        self.assertEqual(Signal.Status.RECEIVED, received.status())
+        self.assertEqual([], SignalIndex.signals(Signal.Status.CONSUMED))
+
+    def test_compact_removes_reports(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        signal = self.build_signal(1, Signal.Status.CONSUMED)
+        report = Report.build(Report)
+        signal.add_report(report)
+
+        RetentionPolicy().compact()
+
+        self.assertEqual([], report.anchor["STATUS"])
+
+    def test_keep_last(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        s1 = self.build_signal(1, Signal.Status.CONSUMED)
+        s2 = self.build_signal(2, Signal.Status.CONSUMED)
+        s3 = self.build_signal(3, Signal.Status.CONSUMED)
+
+        self.assertEqual(1, RetentionPolicy(keep_last=2).compact())
+        self.assertEqual([s2, s3], SignalIndex.signals(Signal.Status.CONSUMED))
+
+    def test_keep_for(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        old = self.build_signal(1, Signal.Status.CONSUMED)
+        new = self.build_signal(2**62, Signal.Status.CONSUMED)
+
+        self.assertEqual(1, RetentionPolicy(keep_for=60).compact())
+        self.assertEqual([new], SignalIndex.signals(Signal.Status.CONSUMED))
+
+    def test_keep_failed(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        failed = self.build_signal(1, Signal.Status.CONSUMED)
+        report = Report.build(Report)
+        report.set_status(Report.Status.FAILED)
+        failed.add_report(report)
+        self.build_signal(2, Signal.Status.CONSUMED)
+
+        self.assertEqual(1, RetentionPolicy(keep_failed=True).compact())
+        self.assertEqual([failed], SignalIndex.signals(Signal.Status.CONSUMED))
+
+    def test_failed_signals_are_not_read_again(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        failed = self.build_signal(1, Signal.Status.CONSUMED)
+        report = Report.build(Report)
+        report.set_status(Report.Status.FAILED)
+        failed.add_report(report)
+
+        policy = RetentionPolicy(keep_failed=True)
+        self.assertEqual(0, policy.compact())
+
+        with patch.object(RetentionPolicy, "is_failed") as is_failed:
+            self.assertEqual(0, policy.compact())
+        is_failed.assert_not_called()
+
+    def test_batch_size(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        for i in range(3):
+            self.build_signal(i, Signal.Status.CONSUMED)
+
+        self.assertEqual(2, RetentionPolicy(batch_size=2).compact())
+        self.assertEqual(1, SignalIndex.count(Signal.Status.CONSUMED))
+
+    def test_shared_spaces_are_kept(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        step = Frame("@AGENDA.STEP.?")
+        step["STATUS"] = "PENDING"
+        signal = Signal.build(step, space=Space("AGENDA"))
+        signal.set_timestamp(1)
+        signal.set_status(Signal.Status.CONSUMED)
+
+        RetentionPolicy().compact()
+
+        self.assertEqual("PENDING", step["STATUS"].singleton())
+
+    def test_signals_referenced_by_live_steps_are_kept(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        signal = self.build_signal(1, Signal.Status.CONSUMED)
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        plan = Plan(Frame("@AGENDA.PLAN.?"))
+        step = Step(Frame("@AGENDA.STEP.?"))
+        agenda.add_goal(goal)
+        goal.add_plan(plan)
+        plan.add_step(step)
+        step.set_xmr(signal.anchor)
+
+        policy = RetentionPolicy(agendas=[agenda])
+        self.assertEqual(0, policy.compact())
+        self.assertEqual(Signal.Status.CONSUMED, signal.status())
+
+        step.set_status(Step.Status.FINISHED)
+        self.assertEqual(1, policy.compact())
+        self.assertEqual([], signal.anchor["STATUS"])
+
+    def test_signals_bound_to_live_goals_are_kept(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        signal = self.build_signal(1, Signal.Status.CONSUMED)
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        goal.anchor["THEME"] = signal.root()
+        agenda.add_goal(goal)
+
+        self.assertEqual(0, RetentionPolicy(agendas=[agenda]).compact())
+        self.assertNotEqual([], list(signal.space()))
+
+    def test_archive(self):
+        SignalIndex.signals(Signal.Status.CONSUMED)
+
+        signal = self.build_signal(1, Signal.Status.CONSUMED)
+        id = signal.anchor.id
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "archive.jsonl")
+            RetentionPolicy(archive=JSONLinesArchive(path)).compact()
+
+            with open(path) as file:
+                records = list(map(json.loads, file.readlines()))
+
+        self.assertEqual(1, len(records))
+        self.assertEqual(id, records[0]["signal"])
+        self.assertIn(id, map(lambda frame: frame["id"], records[0]["frames"]))
@@ -1,8 +1,12 @@
 from ontoagent.engine.operation import Report
-from ontoagent.engine.signal import Signal, TMR, XMR
+from ontoagent.engine.signal import Signal, SignalIndex, TMR, XMR
+from ontoagent.utils.loader import KnowledgeLoader
+from ontograph import graph
 from ontograph.Frame import Frame
 from ontograph.Space import Space
 from tests.OntoAgentTestCase import OntoAgentTestCase
+from threading import Thread
+from unittest.mock import patch
 import time
 
 
@@ -111,6 +115,49 @@ class SignalTestCase(OntoAgentTestCase):
 
         self.assertEqual(c, s.get_root_concept())
 
+    def test_get_root_concept_is_cached_by_parents(self):
+        c = Frame("@ONT.CONCEPT")
+        r1 = Frame("@TEST.ROOT.?")
+        r2 = Frame("@TEST.ROOT.?")
+        r1.add_parent(c)
+        r2.add_parent(c)
+
+        s1 = Signal(Frame("@TEST.SIGNAL.?"))
+        s1.set_root(r1)
+        s2 = Signal(Frame("@TEST.SIGNAL.?"))
+        s2.set_root(r2)
+
+        self.assertEqual(c, s1.get_root_concept())
+        with patch.object(Frame, "ancestors") as mock_ancestors:
+            self.assertEqual(c, s2.get_root_concept())
+            mock_ancestors.assert_not_called()
+
+    def test_get_root_concept_cache_is_cleared_on_load(self):
+        c1 = Frame("@ONT.CONCEPT.?")
+        c2 = Frame("@ONT.CONCEPT.?")
+        r = Frame("@TEST.ROOT.?")
+        r.add_parent(c2)
+
+        s = Signal(Frame("@TEST.SIGNAL.?"))
+        s.set_root(r)
+        self.assertEqual(c2, s.get_root_concept())
+
+        KnowledgeLoader.load_script("@ONT.NEW-CONCEPT = { IS-A %s; };" % c1.id)
+        self.assertEqual({}, Signal._concepts)
+
+    def test_get_root_concept_instance_parents_are_not_cached(self):
+        c = Frame("@ONT.CONCEPT")
+        f = Frame("@TEST.FRAME.?")
+        r = Frame("@TEST.ROOT.?")
+        f.add_parent(c)
+        r.add_parent(f)
+
+        s = Signal(Frame("@TEST.SIGNAL.?"))
+        s.set_root(r)
+
+        self.assertEqual(c, s.get_root_concept())
+        self.assertEqual({}, Signal._concepts)
+
     def test_space(self):
         s = Frame("@TEST.SIGNAL.?")
         s["SPACE"] = "@XYZ"
@@ -133,13 +180,39 @@ class SignalTestCase(OntoAgentTestCase):
 
     def test_next_available_space(self):
         self.assertEqual(Space("XMR#1"), XMR.next_available_space())
-        self.assertEqual(Space("XMR#1"), XMR.next_available_space())
-        self.assertEqual(Space("XMR#1"), XMR.next_available_space())
+        self.assertEqual(Space("XMR#2"), XMR.next_available_space())
+        self.assertEqual(Space("XMR#3"), XMR.next_available_space())
 
         self.assertEqual(Space("MMR#1"), XMR.next_available_space("MMR"))
 
-        Frame("@XMR#1.FRAME.?")
-        self.assertEqual(Space("XMR#2"), XMR.next_available_space())
+        Frame("@XMR#4.FRAME.?")
+        self.assertEqual(Space("XMR#5"), XMR.next_available_space())
+
+    def test_next_available_space_seeds_from_existing_spaces(self):
+        Frame("@XMR#7.FRAME.?")
+        self.assertEqual(Space("XMR#8"), XMR.next_available_space())
+
+    def test_next_available_space_persists_counter(self):
+        XMR.next_available_space("MMR")
+        XMR.next_available_space("MMR")
+
+        self.assertEqual(2, Frame("@SYS.SPACE-ALLOCATOR")["LAST-MMR"].singleton())
+
+    def test_next_available_space_is_thread_safe(self):
+        spaces = []
+
+        def _allocate():
+            for _ in range(10):
+                spaces.append(XMR.next_available_space().name)
+            graph.driver.close_connection()
+
+        threads = [Thread(target=_allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(40, len(set(spaces)))
 
     def test_constituents(self):
         s = Frame("@TEST.SIGNAL.?")
@@ -195,6 +268,80 @@ class SignalTestCase(OntoAgentTestCase):
         self.assertEqual([r1, r2], s["HAS-REPORT"])
 
 
+class SignalIndexTestCase(OntoAgentTestCase):
+
+    def test_signals_by_status(self):
+        s1 = Signal.build(Frame("@TEST.ROOT.?"))
+        s2 = Signal.build(Frame("@TEST.ROOT.?"))
+        s3 = Signal.build(Frame("@TEST.ROOT.?"))
+
+        s2.set_status(Signal.Status.CONSUMED)
+
+        self.assertEqual([s1, s3], SignalIndex.signals(Signal.Status.RECEIVED))
+        self.assertEqual([s2], SignalIndex.signals(Signal.Status.CONSUMED))
+
+    def test_signals_tracks_status_changes_after_load(self):
+        s1 = Signal.build(Frame("@TEST.ROOT.?"))
+        self.assertEqual(1, SignalIndex.count(Signal.Status.RECEIVED))
+
+        s2 = Signal.build(Frame("@TEST.ROOT.?"))
+        s1.set_status(Signal.Status.CONSUMED)
+
+        self.assertEqual([s2], SignalIndex.signals(Signal.Status.RECEIVED))
+        self.assertEqual([s1], SignalIndex.signals(Signal.Status.CONSUMED))
+
+    def test_signals_ordered_by_timestamp(self):
+        s1 = Signal.build(Frame("@TEST.ROOT.?"))
+        s2 = Signal.build(Frame("@TEST.ROOT.?"))
+        s3 = Signal.build(Frame("@TEST.ROOT.?"))
+
+        s1.set_timestamp(300)
+        s2.set_timestamp(100)
+        s3.set_timestamp(200)
+
+        self.assertEqual([s2, s3, s1], SignalIndex.signals(Signal.Status.RECEIVED))
+        self.assertEqual(
+            [s1, s3, s2],
+            SignalIndex.signals(Signal.Status.RECEIVED, newest_first=True),
+        )
+
+    def test_signals_paginated(self):
+        signals = list(map(lambda _: Signal.build(Frame("@TEST.ROOT.?")), range(5)))
+
+        self.assertEqual(
+            signals[1:3], SignalIndex.signals(Signal.Status.RECEIVED, offset=1, limit=2)
+        )
+        self.assertEqual(
+            [signals[3], signals[2]],
+            SignalIndex.signals(
+                Signal.Status.RECEIVED, offset=1, limit=2, newest_first=True
+            ),
+        )
+
+    def test_signals_paginated_past_the_end(self):
+        for _ in range(5):
+            Signal.build(Frame("@TEST.ROOT.?"))
+
+        self.assertEqual([], SignalIndex.signals(Signal.Status.RECEIVED, offset=7))
+        self.assertEqual(
+            [],
+            SignalIndex.signals(Signal.Status.RECEIVED, offset=7, newest_first=True),
+        )
+        self.assertEqual(
+            [],
+            SignalIndex.signals(
+                Signal.Status.RECEIVED, offset=7, limit=2, newest_first=True
+            ),
+        )
+
+    def test_remove(self):
+        s = Signal.build(Frame("@TEST.ROOT.?"))
+        self.assertEqual(1, SignalIndex.count(Signal.Status.RECEIVED))
+
+        SignalIndex.remove(s.anchor.id)
+        self.assertEqual(0, SignalIndex.count(Signal.Status.RECEIVED))
+
+
 class XMRTestCase(OntoAgentTestCase):
 
     pass
@@ -0,0 +1,80 @@
+from ontoagent.engine.executable import HandleExecutable, ProactiveExecutable
+from ontoagent.engine.signal import Signal
+from ontoagent.engine.stats import ExecutableStats, LatencyHistogram
+from ontograph.Frame import Frame
+from tests.OntoAgentTestCase import OntoAgentTestCase
+
+
+class LatencyHistogramTestCase(OntoAgentTestCase):
+
+    def test_empty(self):
+        self.assertEqual(0, LatencyHistogram().percentile(0.5))
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms * 1_000_000)
+
+        self.assertAlmostEqual(50e6, histogram.percentile(0.50), delta=10e6)
+        self.assertAlmostEqual(95e6, histogram.percentile(0.95), delta=19e6)
+        self.assertLessEqual(histogram.percentile(0.99), 100e6)
+        self.assertEqual(100e6, histogram.max_ns)
+
+
+class ExecutableStatsTestCase(OntoAgentTestCase):
+
+    def test_record(self):
+        ExecutableStats.record(StatsHandleExecutable, 2_000_000)
+        ExecutableStats.record(StatsHandleExecutable, 4_000_000, failed=True)
+        ExecutableStats.record(StatsHandleExecutable, 6_000_000, exception=ValueError())
+
+        stats = ExecutableStats.stats(StatsHandleExecutable)
+        stats = stats[ExecutableStats.name_of(StatsHandleExecutable)]
+
+        self.assertEqual(3, stats["calls"])
+        self.assertEqual(2, stats["failures"])
+        self.assertEqual({"ValueError": 1}, stats["exceptions"])
+        self.assertEqual(4.0, stats["mean-ms"])
+        self.assertEqual(6.0, stats["max-ms"])
+
+    def test_disabled(self):
+        ExecutableStats.enabled = False
+        try:
+            ExecutableStats.record(StatsHandleExecutable, 1)
+        finally:
+            ExecutableStats.enabled = True
+
+        self.assertEqual({}, ExecutableStats.stats())
+
+    def test_handle_executable_is_recorded(self):
+        signal = Signal.build(Frame("@TEST.ROOT.?"))
+
+        Frame("@TEST.STATS")["FAIL"] = False
+        StatsHandleExecutable()._run(self.agent, signal=signal)
+        Frame("@TEST.STATS")["FAIL"] = True
+        StatsHandleExecutable()._run(self.agent, signal=signal)
+        StatsHandleExecutable()._run(self.agent)
+
+        stats = ExecutableStats.stats()[ExecutableStats.name_of(StatsHandleExecutable)]
+        self.assertEqual(3, stats["calls"])
+        self.assertEqual(2, stats["failures"])
+        self.assertEqual({"ValueError": 1}, stats["exceptions"])
+
+    def test_proactive_executable_is_recorded(self):
+        StatsProactiveExecutable()._run(self.agent)
+
+        stats = ExecutableStats.stats()
+        self.assertEqual(
+            1, stats[ExecutableStats.name_of(StatsProactiveExecutable)]["calls"]
+        )
+
+
+class StatsHandleExecutable(HandleExecutable):
+    def run(self, agent, signal):
+        if Frame("@TEST.STATS")["FAIL"].singleton():
+            raise ValueError()
+
+
+class StatsProactiveExecutable(ProactiveExecutable):
+    def run(self, agent):
+        pass
@@ -0,0 +1,146 @@
+from ontoagent.engine.effector import Effector
+from ontoagent.engine.executable import HandleExecutable
+from ontoagent.engine.operation import Operable, Operation
+from ontoagent.engine.signal import Signal, XMR
+from ontoagent.engine.tracing import Tracer
+from ontograph.Frame import Frame
+from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
+from unittest.mock import MagicMock, patch
+import json
+import os
+import tempfile
+
+
+class TracerTestCase(OntoAgentTestCase):
+
+    def test_span(self):
+        signal = Signal.build(Frame("@ONT.ROOT"))
+
+        with Tracer.span(signal, "test", key="value"):
+            self.assertEqual(signal.anchor.id, Tracer.current())
+
+        self.assertIsNone(Tracer.current())
+
+        spans = Tracer.spans(signal)
+        self.assertEqual(1, len(spans))
+        self.assertEqual("test", spans[0].name)
+        self.assertEqual({"key": "value"}, spans[0].attributes)
+        self.assertGreaterEqual(spans[0].end, spans[0].start)
+
+    def test_span_records_errors(self):
+        signal = Signal.build(Frame("@ONT.ROOT"))
+
+        with self.assertRaises(ValueError):
+            with Tracer.span(signal, "test"):
+                raise ValueError()
+
+        self.assertEqual("ValueError", Tracer.spans(signal)[0].attributes["error"])
+
+    def test_link(self):
+        signal = Signal.build(Frame("@ONT.ROOT"))
+        xmr = XMR.build(Frame("@ONT.ROOT"))
+
+        Tracer.link(xmr, signal)
+        Tracer.record(signal, "a", 1, 2)
+        Tracer.record(xmr, "b", 3, 4)
+
+        self.assertEqual(signal.anchor.id, Tracer.trace_of(xmr))
+        self.assertEqual(["a", "b"], [span.name for span in Tracer.spans(xmr)])
+        self.assertEqual(0.003, Tracer.to_dict(signal)["total-ms"])
+
+    def test_max_traces(self):
+        Tracer.max_traces = 2
+        try:
+            for i in range(3):
+                Tracer.record("@IO.TEST.%d" % i, "test", 0, 1)
+        finally:
+            Tracer.max_traces = 1000
+
+        self.assertEqual(["@IO.TEST.2", "@IO.TEST.1"], Tracer.traces())
+
+    def test_disabled(self):
+        Tracer.enabled = False
+        try:
+            with Tracer.span("@IO.TEST.1", "test"):
+                pass
+        finally:
+            Tracer.enabled = True
+
+        self.assertEqual([], Tracer.traces())
+
+    def test_disabled_input_does_not_read_timestamp(self):
+        xmr = XMR.build(Frame("@ONT.ROOT"))
+        xmr.timestamp = MagicMock()
+
+        Tracer.enabled = False
+        try:
+            self.agent.input(xmr, join=True)
+        finally:
+            Tracer.enabled = True
+
+        xmr.timestamp.assert_not_called()
+
+    def test_export(self):
+        Tracer.record("@IO.TEST.1", "test", 0, 1)
+        Tracer.record("@IO.TEST.2", "test", 0, 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            self.assertEqual(2, Tracer.export(path))
+
+            with open(path) as file:
+                records = list(map(json.loads, file.readlines()))
+
+        self.assertEqual(["@IO.TEST.1", "@IO.TEST.2"], [r["trace"] for r in records])
+
+
+class AgentTracingTestCase(OntoAgentTestCase):
+
+    @patch("ontoagent.utils.analysis.Analyzer.analyzer_for_signal")
+    def test_input_is_traced(self, mock_analyzer_for_signal: MagicMock):
+        Frame("@TEST.EXECUTABLE")["VALIDATE"] = True
+        Operable(Frame("@ONT.ROOT")).add_operation(
+            Operation.build("SYS", TestableExecutable)
+        )
+
+        xmr = XMR.build(Frame("@ONT.ROOT"))
+        mock_analyzer = MagicMock()
+        mock_analyzer.to_signal = MagicMock(return_value=xmr)
+        mock_analyzer_for_signal.return_value = mock_analyzer
+
+        signal = Signal.build(Frame("@ONT.ROOT"))
+        self.agent.input(signal, join=True)
+
+        names = [span.name for span in Tracer.spans(signal)]
+        for name in ["queued", "analysis", "handle", "root-concept", "operation"]:
+            self.assertIn(name, names)
+
+        operation = [s for s in Tracer.spans(xmr) if s.name == "operation"][0]
+        self.assertEqual("TestableExecutable", operation.attributes["executable"])
+
+    @patch("ontoagent.engine.effector.Effector.run")
+    @patch("ontoagent.engine.effector.Effector.interrupt")
+    def test_output_joins_handling_trace(self, *mocks):
+        effector = Effector.build(
+            Frame("@TEST.EFFECTOR.?"), executable=TestableExecutable
+        )
+        output = XMR.build(Frame("@IO.TEST-EVENT.?"))
+        Frame("@TEST.OUTPUT")["EFFECTOR"] = effector.anchor
+        Frame("@TEST.OUTPUT")["XMR"] = output.anchor
+
+        root = Frame("@ONT.ROOT")
+        Operable(root).add_operation(Operation.build("SYS", OutputExecutable))
+
+        signal = Signal.build(root)
+        self.agent.handle(signal, join=True)
+
+        names = [span.name for span in Tracer.spans(signal)]
+        self.assertIn("output", names)
+        self.assertEqual([], Tracer.spans(output))
+
+
+class OutputExecutable(HandleExecutable):
+    def run(self, agent, signal):
+        effector = Effector(Frame("@TEST.OUTPUT")["EFFECTOR"].singleton())
+        xmr = XMR(Frame("@TEST.OUTPUT")["XMR"].singleton())
+        agent.output(xmr, effector, join=True)
@@ -0,0 +1,45 @@
+from ontoagent.engine.watchdog import Watchdog
+from tests.OntoAgentTestCase import OntoAgentTestCase
+import threading
+import time
+
+
+class WatchdogTestCase(OntoAgentTestCase):
+
+    def test_fires_after_timeout(self):
+        fired = threading.Event()
+
+        started = time.monotonic()
+        Watchdog.watch(0.05, fired.set)
+
+        self.assertTrue(fired.wait(5))
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    def test_unwatch(self):
+        fired = threading.Event()
+
+        token = Watchdog.watch(0.05, fired.set)
+        Watchdog.unwatch(token)
+
+        self.assertFalse(fired.wait(0.2))
+
+    def test_fires_in_deadline_order(self):
+        order = []
+        done = threading.Event()
+
+        Watchdog.watch(0.1, lambda: (order.append(2), done.set()))
+        Watchdog.watch(0.05, lambda: order.append(1))
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual([1, 2], order)
+
+    def test_failing_callback_does_not_stop_watchdog(self):
+        fired = threading.Event()
+
+        def _fail():
+            raise ValueError()
+
+        Watchdog.watch(0.01, _fail)
+        Watchdog.watch(0.05, fired.set)
+
+        self.assertTrue(fired.wait(5))
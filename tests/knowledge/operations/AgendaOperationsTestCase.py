@@ -1,8 +1,9 @@
 from ontoagent.agent import Agent
-from ontoagent.engine.effector import Effector
+from ontoagent.engine.changes import ChangeTracker
+from ontoagent.engine.effector import Effector, EffectorQueue, ReservationManager
 from ontoagent.engine.executable import EffectorExecutable
 from ontoagent.engine.operation import Operable, Operation
-from ontoagent.engine.signal import VMR, XMR
+from ontoagent.engine.signal import Signal, VMR, XMR
 from ontoagent.knowledge.operations.agenda import (
     AddGoalInstanceExecutable,
     ProcessAgendaExecutable,
@@ -16,6 +17,7 @@ from ontoagent.views.agenda import (
     Impasse,
     ImpasseDetectionExecutable,
     Option,
+    OptionPool,
     Plan,
     Resolution,
     Step,
@@ -166,6 +168,69 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
         exe.queue_options.assert_called_once_with(self.agent, selected)
         exe.cleanup.assert_called_once()
 
+    def test_run_skips_when_nothing_changed(self):
+        exe = ProcessAgendaExecutable()
+        exe.handle_impasses = MagicMock()
+        exe.generate_options = MagicMock()
+        exe.select_options = MagicMock(return_value={})
+        exe.queue_options = MagicMock()
+        exe.cleanup = MagicMock()
+
+        exe.run(self.agent)
+        exe.run(self.agent)
+        self.assertEqual(1, exe.cleanup.call_count)
+
+        ChangeTracker.mark()
+        exe.run(self.agent)
+        self.assertEqual(2, exe.cleanup.call_count)
+
+        ProcessAgendaExecutable.idle_interval = 0.0
+        try:
+            exe.run(self.agent)
+        finally:
+            ProcessAgendaExecutable.idle_interval = 5.0
+        self.assertEqual(3, exe.cleanup.call_count)
+
+    def test_run_ignores_changes_to_other_agendas(self):
+        exe = ProcessAgendaExecutable()
+        exe.handle_impasses = MagicMock()
+        exe.generate_options = MagicMock()
+        exe.select_options = MagicMock(return_value={})
+        exe.queue_options = MagicMock()
+        exe.cleanup = MagicMock()
+
+        exe.run(self.agent)
+
+        with ChangeTracker.scope("@SELF.AGENDA.2"):
+            ChangeTracker.mark()
+        exe.run(self.agent)
+        self.assertEqual(1, exe.cleanup.call_count)
+
+        with ChangeTracker.scope("@SELF.AGENDA.1"):
+            ChangeTracker.mark()
+        exe.run(self.agent)
+        self.assertEqual(2, exe.cleanup.call_count)
+
+    def test_run_repeats_after_its_own_changes(self):
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        plan = Plan(Frame("@AGENDA.PLAN.?"))
+        agenda.add_goal(goal)
+        goal.add_plan(plan)
+
+        exe = ProcessAgendaExecutable()
+        exe.run(self.agent)
+        self.assertEqual(Goal.Status.SATISFIED, goal.status())
+
+        # The pass that satisfied the goal is followed by one more, which finds
+        # nothing left to do.
+        generation = ChangeTracker.generation("@SELF.AGENDA.1")
+        exe.run(self.agent)
+        self.assertEqual(generation, ChangeTracker.generation("@SELF.AGENDA.1"))
+        exe.cleanup = MagicMock()
+        exe.run(self.agent)
+        exe.cleanup.assert_not_called()
+
     def test_handle_impasses_marks_steps_as_impassed(self):
         agenda = Agenda(Frame("@SELF.AGENDA.1"))
         goal = Goal(Frame("@AGENDA.GOAL.?"))
@@ -421,6 +486,27 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
             else:
                 self.fail()
 
+    def test_generate_recalculates_score_when_weights_change(self):
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        plan = Plan(Frame("@AGENDA.PLAN.?"))
+        step = Step(Frame("@AGENDA.STEP.?"))
+
+        agenda.add_goal(goal)
+        goal.add_plan(plan)
+        plan.add_step(step)
+        goal.set_priority(0.75)
+        plan.set_cost(0.25)
+
+        exe = ProcessAgendaExecutable()
+        exe.generate_options(self.agent)
+        self.assertAlmostEqual(0.5, agenda.options()[0].score())
+        exe.cleanup(self.agent)
+
+        self.agent.anchor["COST-WEIGHT"] = 2.0
+        exe.generate_options(self.agent)
+        self.assertAlmostEqual(0.25, agenda.options()[0].score())
+
     def test_select_options(self):
         agenda = Agenda(Frame("@SELF.AGENDA.1"))
         goal = Goal(Frame("@AGENDA.GOAL.?"))
@@ -453,6 +539,26 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
         self.assertEqual(Step.Status.EXECUTING, s1.status())
         self.assertEqual(Step.Status.EXECUTING, s2.status())
 
+    def test_select_options_uses_generated_scores(self):
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        p = Plan(Frame("@AGENDA.PLAN.?"))
+        s = Step(Frame("@AGENDA.STEP.?"))
+
+        agenda.add_goal(goal)
+        goal.add_plan(p)
+        p.add_step(s)
+
+        exe = ProcessAgendaExecutable()
+        scores = exe.generate_options(self.agent)
+        self.assertEqual(1, len(scores))
+
+        with patch.object(Option, "score") as mock_score:
+            exe.select_options(self.agent, scores)
+            mock_score.assert_not_called()
+
+        self.assertEqual(Step.Status.EXECUTING, s.status())
+
     def test_select_options_chooses_effectors(self):
         operation = Operation(Frame("@SYS.OPERATION.?"))
         operation.set_requires_effector(Frame("@ONT.HAND"))
@@ -514,6 +620,168 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
         effectors_map = ProcessAgendaExecutable().select_options(self.agent)
         self.assertEqual({o1.anchor: e}, effectors_map)
 
+    def test_select_options_skips_claimed_effectors(self):
+        operation = Operation(Frame("@SYS.OPERATION.?"))
+        operation.set_requires_effector(Frame("@ONT.HAND"))
+        event = Operable(Frame("@ONT.TEST-EVENT"))
+        event.add_operation(operation)
+
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        p = Plan(Frame("@AGENDA.PLAN.?"))
+        s = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+
+        e = Effector.build(type=Frame("@ONT.HAND"))
+        self.agent.add_effector(e)
+
+        agenda.add_goal(goal)
+        goal.add_plan(p)
+        p.add_step(s)
+
+        o = Option.build(goal, p, s)
+        agenda.add_option(o)
+
+        ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        effectors_map = ProcessAgendaExecutable().select_options(self.agent)
+        self.assertEqual({}, effectors_map)
+        self.assertFalse(o.selected())
+
+    def test_select_options_queues_for_busy_effectors(self):
+        operation = Operation(Frame("@SYS.OPERATION.?"))
+        operation.set_requires_effector(Frame("@ONT.HAND"))
+        event = Operable(Frame("@ONT.TEST-EVENT"))
+        event.add_operation(operation)
+
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        p = Plan(Frame("@AGENDA.PLAN.?"))
+        s = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+
+        e = Effector.build(type=Frame("@ONT.HAND"), executable=TestableExecutable)
+        self.agent.add_effector(e)
+
+        agenda.add_goal(goal)
+        goal.add_plan(p)
+        p.add_step(s)
+
+        o = Option.build(goal, p, s)
+        agenda.add_option(o)
+
+        ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        ProcessAgendaExecutable().select_options(self.agent)
+        self.assertEqual(Step.Status.QUEUED, s.status())
+        self.assertEqual([o.anchor], EffectorQueue.holders(e))
+
+        # Releasing the effector starts the queued step straight away.
+        e.release()
+
+        self.assertEqual(Step.Status.EXECUTING, s.status())
+        self.assertEqual(e, s.with_effector())
+        self.assertIsNotNone(s.xmr())
+        self.assertEqual(o.anchor, ReservationManager.holder(e))
+        self.assertEqual(0, EffectorQueue.length(e))
+
+    def test_queue_on_effector_leaves_step_when_queue_is_full(self):
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        p = Plan(Frame("@AGENDA.PLAN.?"))
+        s = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+
+        e = Effector.build(type=Frame("@ONT.HAND"), executable=TestableExecutable)
+        self.agent.add_effector(e)
+
+        agenda.add_goal(goal)
+        goal.add_plan(p)
+        p.add_step(s)
+
+        o = Option.build(goal, p, s)
+        ReservationManager.claim(e, Frame("@TEST.HOLDER.?"))
+
+        EffectorQueue.size = 0
+        try:
+            generation = ChangeTracker.generation()
+            queued = ProcessAgendaExecutable().queue_on_effector(self.agent, o, e)
+        finally:
+            EffectorQueue.size = 16
+
+        self.assertFalse(queued)
+        self.assertEqual(Step.Status.PLANNED, s.status())
+        self.assertEqual(generation, ChangeTracker.generation())
+
+    def test_select_options_preempts_lower_priority_work(self):
+        operation = Operation(Frame("@SYS.OPERATION.?"))
+        operation.set_requires_effector(Frame("@ONT.HAND"))
+        event = Operable(Frame("@ONT.TEST-EVENT"))
+        event.add_operation(operation)
+
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        p1 = Plan(Frame("@AGENDA.PLAN.?"))
+        p2 = Plan(Frame("@AGENDA.PLAN.?"))
+        s1 = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+        s2 = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+
+        e = Effector.build(type=Frame("@ONT.HAND"), executable=TestableExecutable)
+        e.set_interrupt(TestableExecutable)
+        self.agent.add_effector(e)
+
+        agenda.add_goal(goal)
+        goal.add_plan(p1)
+        goal.add_plan(p2)
+        p1.add_step(s1)
+        p2.add_step(s2)
+
+        # The low priority step is running on the only HAND.
+        o1 = Option.build(goal, p1, s1)
+        o1.set_score(1.0)
+        agenda.add_option(o1)
+
+        exe = ProcessAgendaExecutable()
+        exe.queue_options(self.agent, exe.select_options(self.agent))
+        o1.set_status(Option.Status.EXPIRED)
+        self.assertEqual(Step.Status.EXECUTING, s1.status())
+
+        # A higher priority step preempts it; the first step is queued again.
+        o2 = Option.build(goal, p2, s2)
+        o2.set_score(5.0)
+        agenda.add_option(o2)
+
+        effectors_map = exe.select_options(self.agent)
+        self.assertEqual({o2.anchor: e}, effectors_map)
+        self.assertEqual(o2.anchor, ReservationManager.holder(e))
+        self.assertEqual(Step.Status.QUEUED, s1.status())
+        self.assertEqual([o1.anchor], EffectorQueue.holders(e))
+
+        # Once the effector is released, the preempted step resumes.
+        exe.queue_options(self.agent, effectors_map)
+        e.release()
+
+        self.assertEqual(Step.Status.EXECUTING, s1.status())
+        self.assertEqual(o1.anchor, ReservationManager.holder(e))
+
+    def test_select_options_does_not_queue_without_a_capable_effector(self):
+        operation = Operation(Frame("@SYS.OPERATION.?"))
+        operation.set_requires_effector(Frame("@ONT.HAND"))
+        event = Operable(Frame("@ONT.TEST-EVENT"))
+        event.add_operation(operation)
+
+        agenda = Agenda(Frame("@SELF.AGENDA.1"))
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        p = Plan(Frame("@AGENDA.PLAN.?"))
+        s = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+
+        agenda.add_goal(goal)
+        goal.add_plan(p)
+        p.add_step(s)
+
+        o = Option.build(goal, p, s)
+        agenda.add_option(o)
+
+        ProcessAgendaExecutable().select_options(self.agent)
+        self.assertEqual(Step.Status.PLANNED, s.status())
+
     def test_select_options_marks_as_deferred_if_agent_is_specified_as_other(self):
         agenda = Agenda(Frame("@SELF.AGENDA.1"))
         goal = Goal(Frame("@AGENDA.GOAL.?"))
@@ -653,6 +921,107 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
         self.assertEqual(Option.Status.EXPIRED, o2.status())
         self.assertEqual(Option.Status.EXPIRED, o3.status())
 
+    def _build_options(self, count: int) -> list:
+        options = []
+        for _ in range(count):
+            option = Option.build(
+                Frame("@TEST.GOAL.?"), Frame("@TEST.PLAN.?"), Frame("@TEST.STEP.?")
+            )
+            self.agent.agenda().add_option(option)
+            options.append(option)
+        return options
+
+    def test_cleanup_removes_options_from_the_agenda(self):
+        o1, o2, o3 = self._build_options(3)
+        o3.set_status(Option.Status.EXPIRED)
+
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        self.assertEqual([], self.agent.agenda().anchor["HAS-OPTION"])
+        self.assertEqual([], self.agent.agenda().options())
+        self.assertEqual(3, OptionPool.available("EXE"))
+
+    def test_cleanup_recycles_options(self):
+        o1, o2 = self._build_options(2)
+        o1.set_score(0.75)
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        step = Frame("@TEST.STEP.?")
+        option = Option.build(Frame("@TEST.GOAL.?"), Frame("@TEST.PLAN.?"), step)
+
+        self.assertIn(option, [o1, o2])
+        self.assertEqual(1, OptionPool.available("EXE"))
+        self.assertEqual(step, option.step())
+        self.assertEqual(Option.Status.CURRENT, option.status())
+        self.assertFalse(option.selected())
+        self.assertEqual(0.0, option.score())
+
+    def test_cleanup_does_not_recycle_options_holding_effectors(self):
+        o1, o2, o3 = self._build_options(3)
+        o1.set_selected(True)
+        o1.step().set_status(Step.Status.EXECUTING)
+        o2.step().set_status(Step.Status.QUEUED)
+
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        self.assertEqual([], self.agent.agenda().anchor["HAS-OPTION"])
+        self.assertEqual(1, OptionPool.available("EXE"))
+        self.assertEqual(2, OptionPool.held())
+        self.assertEqual(o1.step(), o1.anchor["STEP"])
+        self.assertEqual(o2.step(), o2.anchor["STEP"])
+
+        # Once their steps are done with, a later pass recycles them.
+        o1.step().set_status(Step.Status.FINISHED)
+        o2.step().set_status(Step.Status.DEFERRED)
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        self.assertEqual(3, OptionPool.available("EXE"))
+        self.assertEqual(0, OptionPool.held())
+
+    def test_cleanup_holds_options_while_they_hold_an_effector(self):
+        (o1,) = self._build_options(1)
+        e = Effector.build(type=Frame("@ONT.HAND"), executable=TestableExecutable)
+        o1.step().set_with_effector(e)
+        ReservationManager.claim(e, o1.anchor)
+
+        ProcessAgendaExecutable().cleanup(self.agent)
+        self.assertEqual(0, OptionPool.available("EXE"))
+        self.assertEqual(1, OptionPool.held())
+
+        e.release()
+        ProcessAgendaExecutable().cleanup(self.agent)
+        self.assertEqual(1, OptionPool.available("EXE"))
+
+    def test_cleanup_erases_options_beyond_the_pool_size(self):
+        OptionPool.size = 1
+        o1, o2 = self._build_options(2)
+
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        self.assertEqual(1, OptionPool.available("EXE"))
+        self.assertEqual(1, len([o for o in [o1, o2] if o.anchor["STEP"] == []]))
+
+    def test_cleanup_archives_options_in_batches(self):
+        archived = []
+        OptionPool.archive = lambda options: archived.append(list(options))
+        OptionPool.batch_size = 2
+
+        o1, o2, o3 = self._build_options(3)
+        steps = [o1.step(), o2.step(), o3.step()]
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        self.assertEqual([[o1, o2]], archived)
+
+        self.assertEqual(1, OptionPool.flush())
+        self.assertEqual([[o1, o2], [o3]], archived)
+
+        # Archived frames are left to the archive, not recycled and overwritten.
+        self.assertEqual(0, OptionPool.available("EXE"))
+        Option.build(
+            Frame("@TEST.GOAL.?"), Frame("@TEST.PLAN.?"), Frame("@TEST.STEP.?")
+        )
+        self.assertEqual(steps, [o1.step(), o2.step(), o3.step()])
+
     @patch("ontoagent.knowledge.operations.agenda.does_state_exist")
     def test_cleanup_marks_steps_as_finished_when_the_expected_effect_exists(
         self, mock_does_state_exist: MagicMock
@@ -675,6 +1044,7 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
         ProcessAgendaExecutable().cleanup(self.agent)
 
         self.assertEqual(Step.Status.FINISHED, step.status())
+        self.assertEqual(Signal.Status.CONSUMED, xmr.status())
         mock_does_state_exist.assert_called_once_with(step.anchor)
 
     @patch("ontoagent.knowledge.operations.agenda.does_state_exist")
@@ -756,6 +1126,43 @@ class ProcessAgendaOperationTestCase(OntoAgentTestCase):
         self.assertEqual(Goal.Status.SATISFIED, goal1.status())
         self.assertEqual(Goal.Status.ACTIVE, goal2.status())
 
+    def test_cleanup_archives_satisfied_and_abandoned_goals(self):
+        agenda = self.agent.agenda()
+        goal1 = Goal(Frame("@AGENDA.GOAL.?"))
+        goal2 = Goal(Frame("@AGENDA.GOAL.?"))
+        goal3 = Goal(Frame("@AGENDA.GOAL.?"))
+        plan = Plan(Frame("@AGENDA.PLAN.?"))
+
+        agenda.add_goal(goal1)
+        agenda.add_goal(goal2)
+        agenda.add_goal(goal3)
+        goal1.add_plan(plan)
+        plan.set_status(Plan.Status.FINISHED)
+        goal2.set_status(Goal.Status.ABANDONED)
+
+        ProcessAgendaExecutable().cleanup(self.agent)
+
+        self.assertEqual([goal3], agenda.goals())
+        self.assertEqual([goal1, goal2], agenda.archived_goals())
+        self.assertEqual(Goal.Status.SATISFIED, goal1.status())
+
+    def test_archived_goals_are_not_processed(self):
+        agenda = self.agent.agenda()
+        goal = Goal(Frame("@AGENDA.GOAL.?"))
+        plan = Plan(Frame("@AGENDA.PLAN.?"))
+        step = Step(Frame("@AGENDA.STEP.?").add_parent("@ONT.TEST-EVENT"))
+
+        agenda.add_goal(goal)
+        goal.add_plan(plan)
+        plan.add_step(step)
+        goal.set_status(Goal.Status.ABANDONED)
+
+        ProcessAgendaExecutable().cleanup(self.agent)
+        self.assertEqual([goal], agenda.archived_goals())
+
+        ProcessAgendaExecutable().generate_options(self.agent)
+        self.assertEqual([], agenda.options())
+
 
 class ThroughputAgendaTestCase(OntoAgentTestCase):
 
@@ -1,5 +1,5 @@
-from ontoagent.engine.effector import Effector
-from ontoagent.engine.signal import XMR
+from ontoagent.engine.effector import Effector, ReservationManager
+from ontoagent.engine.signal import Signal, XMR
 from ontoagent.knowledge.operations.core import ReleaseEffectorExecutable
 from ontoagent.utils.states import PhasedEvent
 from ontograph.Frame import Frame
@@ -39,3 +39,40 @@ class ReleaseEffectorExecutableTestCase(OntoAgentTestCase):
         ReleaseEffectorExecutable().run(self.agent, signal)
 
         self.assertTrue(PhasedEvent(event).is_ended())
+
+    def test_late_release_keeps_preempting_holder(self):
+        effector = Effector.build()
+        preempted = XMR.build(Frame("@TEST.EVENT.?"), space=Space("XMR#1"))
+        current = XMR.build(Frame("@TEST.EVENT.?"), space=Space("XMR#2"))
+
+        ReservationManager.claim(effector, Frame("@TEST.HOLDER.?"))
+        ReservationManager.assign(effector, current)
+        holder = ReservationManager.holder(effector)
+
+        root = Frame("@MMR#1.RELEASE-EFFECTOR.?")
+        root["THEME"] = effector.anchor
+        root["XMR"] = preempted.anchor
+        signal = XMR.build(root, space=Space("MMR#1"))
+
+        ReleaseEffectorExecutable().run(self.agent, signal)
+
+        self.assertEqual(holder, ReservationManager.holder(effector))
+        self.assertFalse(PhasedEvent(current.root()).is_ended())
+
+    def test_release_ends_the_released_xmr(self):
+        effector = Effector.build()
+        xmr = XMR.build(Frame("@TEST.EVENT.?"), space=Space("XMR#1"))
+
+        ReservationManager.claim(effector, Frame("@TEST.HOLDER.?"))
+        ReservationManager.assign(effector, xmr)
+
+        root = Frame("@MMR#1.RELEASE-EFFECTOR.?")
+        root["THEME"] = effector.anchor
+        root["XMR"] = xmr.anchor
+        signal = XMR.build(root, space=Space("MMR#1"))
+
+        ReleaseEffectorExecutable().run(self.agent, signal)
+
+        self.assertEqual(Effector.Status.AVAILABLE, effector.status())
+        self.assertTrue(PhasedEvent(xmr.root()).is_ended())
+        self.assertEqual(Signal.Status.CONSUMED, xmr.status())
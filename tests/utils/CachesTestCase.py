@@ -0,0 +1,31 @@
+from ontoagent.engine.operation import DispatchTable, Operable, Operation
+from ontoagent.engine.signal import Signal, SignalIndex
+from ontoagent.utils.caches import Caches
+from ontograph.Frame import Frame
+from tests.OntoAgentTestCase import OntoAgentTestCase, TestableExecutable
+from unittest.mock import MagicMock
+
+
+class CachesTestCase(OntoAgentTestCase):
+
+    def test_on_reset(self):
+        reset = MagicMock()
+        Caches.on_reset(reset)
+        Caches.on_reset(reset)
+        try:
+            Caches.reset()
+        finally:
+            Caches.resets.remove(reset)
+
+        reset.assert_called_once()
+
+    def test_reset_clears_engine_caches(self):
+        concept = Frame("@ONT.CONCEPT.?")
+        Operable(concept).add_operation(Operation.build("SYS", TestableExecutable))
+        DispatchTable.operations(concept)
+        SignalIndex.count(Signal.Status.RECEIVED)
+
+        Caches.reset()
+
+        self.assertEqual({}, DispatchTable._routes)
+        self.assertFalse(SignalIndex._loaded)
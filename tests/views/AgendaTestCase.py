@@ -1,16 +1,22 @@
+from ontoagent.engine.changes import ChangeTracker
 from ontoagent.engine.signal import XMR
+from ontoagent.utils.loader import KnowledgeLoader
 from ontoagent.views.agenda import (
     Agenda,
+    AgendaModel,
     Goal,
     Impasse,
     ImpasseDetectionExecutable,
     Option,
+    OptionScores,
     Plan,
     Resolution,
     Step,
 )
 from ontograph.Frame import Frame
 from tests.OntoAgentTestCase import OntoAgentTestCase
+from unittest.mock import patch
+import threading
 
 
 class AgendaTestCase(OntoAgentTestCase):
@@ -35,6 +41,60 @@ class AgendaTestCase(OntoAgentTestCase):
 
         self.assertEqual([g1, g2], a["HAS-GOAL"])
 
+    def test_archived_goals(self):
+        a = Frame("@TEST.AGENDA.?")
+        g1 = Frame("@TEST.GOAL.?")
+        g2 = Frame("@TEST.GOAL.?")
+
+        a["HAS-ARCHIVED-GOAL"] += g1
+        a["HAS-ARCHIVED-GOAL"] += g2
+
+        self.assertEqual([Goal(g1), Goal(g2)], Agenda(a).archived_goals())
+
+    def test_archive_goals(self):
+        a = Frame("@TEST.AGENDA.?")
+        g1 = Frame("@TEST.GOAL.?")
+        g2 = Frame("@TEST.GOAL.?")
+        g3 = Frame("@TEST.GOAL.?")
+        g4 = Frame("@TEST.GOAL.?")
+
+        a["HAS-GOAL"] = [g1, g2, g3, g4]
+        g2["STATUS"] = Goal.Status.SATISFIED
+        g3["STATUS"] = Goal.Status.ABANDONED
+
+        self.assertEqual([g2, g3, g4], Agenda(a).archive_goals([Goal(g4)]))
+
+        self.assertEqual([g1], a["HAS-GOAL"])
+        self.assertEqual([g2, g3, g4], a["HAS-ARCHIVED-GOAL"])
+        self.assertEqual([Goal(g1)], Agenda(a).goals())
+        self.assertEqual([Goal(g2), Goal(g3), Goal(g4)], Agenda(a).archived_goals())
+
+        self.assertEqual([], Agenda(a).archive_goals())
+
+    def test_archive_goals_keeps_concurrently_added_goals(self):
+        a = Frame("@TEST.AGENDA.?")
+        g1 = Frame("@TEST.GOAL.?")
+        g2 = Frame("@TEST.GOAL.?")
+
+        a["HAS-GOAL"] = [g1]
+
+        # Adds g2 from another thread after archive_goals has read HAS-GOAL.
+        adder = threading.Thread(target=lambda: Agenda(a).add_goal(g2))
+        goals = Agenda.goals
+
+        def interleaved(agenda):
+            read = goals(agenda)
+            adder.start()
+            adder.join(timeout=0.1)
+            return read
+
+        with patch.object(Agenda, "goals", interleaved):
+            Agenda(a).archive_goals([Goal(g1)])
+        adder.join(timeout=5.0)
+
+        self.assertEqual([g2], a["HAS-GOAL"])
+        self.assertEqual([g1], a["HAS-ARCHIVED-GOAL"])
+
     def test_options(self):
         a = Frame("@TEST.AGENDA.?")
         o1 = Frame("@TEST.OPTION.?")
@@ -65,6 +125,29 @@ class AgendaTestCase(OntoAgentTestCase):
 
         self.assertEqual([o1, o2], a["HAS-OPTION"])
 
+    def test_remove_options_keeps_concurrently_added_options(self):
+        a = Frame("@TEST.AGENDA.?")
+        o1 = Frame("@TEST.OPTION.?")
+        o2 = Frame("@TEST.OPTION.?")
+
+        a["HAS-OPTION"] = [o1]
+
+        # Adds o2 from another thread after remove_options has read HAS-OPTION.
+        adder = threading.Thread(target=lambda: Agenda(a).add_option(o2))
+        option_frames = Agenda._option_frames
+
+        def interleaved(agenda):
+            read = option_frames(agenda)
+            adder.start()
+            adder.join(timeout=0.1)
+            return read
+
+        with patch.object(Agenda, "_option_frames", interleaved):
+            self.assertEqual([Option(o1)], Agenda(a).remove_options([Option(o1)]))
+        adder.join(timeout=5.0)
+
+        self.assertEqual([o2], a["HAS-OPTION"])
+
 
 class GoalTestCase(OntoAgentTestCase):
 
@@ -189,6 +272,17 @@ class StepTestCase(OntoAgentTestCase):
         Step(s).set_status(Step.Status.IMPASSED)
         self.assertEqual(Step.Status.IMPASSED, s["STEP-STATUS"])
 
+    def test_set_unchanged_status_is_not_a_change(self):
+        s = Step(Frame("@TEST.STEP.?"))
+        s.set_status(Step.Status.QUEUED)
+
+        generation = ChangeTracker.generation()
+        s.set_status(Step.Status.QUEUED)
+        self.assertEqual(generation, ChangeTracker.generation())
+
+        s.set_status(Step.Status.EXECUTING)
+        self.assertNotEqual(generation, ChangeTracker.generation())
+
     def test_impasses(self):
         s = Frame("@TEST.STEP.?")
         i1 = Frame("@SYS.IMPASSE.?")
@@ -436,6 +530,145 @@ class ResolutionTestCase(OntoAgentTestCase):
         self.assertEqual(g, r["HAS-GOAL"])
 
 
+class AgendaModelTestCase(OntoAgentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        AgendaModel.enabled = True
+
+    def test_reads_are_kept(self):
+        s = Frame("@TEST.STEP.?")
+        self.assertEqual(Step.Status.PLANNED, Step(s).status())
+
+        s["STEP-STATUS"] = Step.Status.FINISHED
+        self.assertEqual(Step.Status.PLANNED, Step(s).status())
+
+        AgendaModel.invalidate(s)
+        self.assertEqual(Step.Status.FINISHED, Step(s).status())
+
+    def test_setters_write_through(self):
+        s = Frame("@TEST.STEP.?")
+        self.assertEqual(Step.Status.PLANNED, Step(s).status())
+
+        Step(s).set_status(Step.Status.EXECUTING)
+        self.assertEqual(Step.Status.EXECUTING, s["STEP-STATUS"])
+        self.assertEqual(Step.Status.EXECUTING, Step(s).status())
+
+        o = Option.build(Frame("@TEST.GOAL.?"), Frame("@TEST.PLAN.?"), s)
+        o.set_score(0.75)
+        self.assertEqual(0.75, o.anchor["SCORE"])
+        self.assertEqual(0.75, o.score())
+        self.assertEqual(s, o.step())
+
+    def test_additions_are_read_again(self):
+        a = Frame("@TEST.AGENDA.?")
+        g1 = Frame("@TEST.GOAL.?")
+        g2 = Frame("@TEST.GOAL.?")
+        p = Frame("@TEST.PLAN.?")
+
+        Agenda(a).add_goal(g1)
+        self.assertEqual([g1], Agenda(a).goals())
+
+        Agenda(a).add_goal(g2)
+        self.assertEqual([g1, g2], Agenda(a).goals())
+
+        self.assertEqual([], Goal(g1).plans())
+        Goal(g1).add_plan(p)
+        self.assertEqual([p], Goal(g1).plans())
+
+        self.assertEqual(0.5, Goal(g1).priority())
+        Goal(g1).set_priority(0.75)
+        self.assertEqual(0.75, Goal(g1).priority())
+
+    def test_disabled(self):
+        AgendaModel.enabled = False
+
+        s = Frame("@TEST.STEP.?")
+        self.assertEqual(Step.Status.PLANNED, Step(s).status())
+
+        s["STEP-STATUS"] = Step.Status.FINISHED
+        self.assertEqual(Step.Status.FINISHED, Step(s).status())
+
+    def test_disabling_drops_written_values(self):
+        s = Frame("@TEST.STEP.?")
+        Step(s).set_status(Step.Status.EXECUTING)
+
+        AgendaModel.enabled = False
+        Step(s).set_status(Step.Status.FINISHED)
+        AgendaModel.enabled = True
+
+        self.assertEqual(Step.Status.FINISHED, Step(s).status())
+
+    def test_invalidated_by_knowledge_loading(self):
+        g = Frame("@TEST.GOAL.?")
+        self.assertEqual(Goal.Status.ACTIVE, Goal(g).status())
+
+        g["STATUS"] = Goal.Status.ABANDONED
+        KnowledgeLoader.changed()
+
+        self.assertEqual(Goal.Status.ABANDONED, Goal(g).status())
+
+    def test_max_frames(self):
+        AgendaModel.max_frames = 2
+        try:
+            s1 = Frame("@TEST.STEP.?")
+            s2 = Frame("@TEST.STEP.?")
+            s3 = Frame("@TEST.STEP.?")
+            for s in [s1, s2, s3]:
+                Step(s).status()
+
+            s1["STEP-STATUS"] = Step.Status.FINISHED
+            s3["STEP-STATUS"] = Step.Status.FINISHED
+
+            self.assertEqual(Step.Status.FINISHED, Step(s1).status())
+            self.assertEqual(Step.Status.PLANNED, Step(s3).status())
+        finally:
+            AgendaModel.max_frames = 100_000
+
+
+class OptionScoresTestCase(OntoAgentTestCase):
+
+    def test_score(self):
+        g = Goal(Frame("@TEST.GOAL.?"))
+        p = Plan(Frame("@TEST.PLAN.?"))
+        g.anchor["PRIORITY"] = 0.75
+        p.anchor["COST"] = 0.25
+
+        self.assertAlmostEqual(0.5, OptionScores.score(self.agent, g, p))
+
+        self.agent.anchor["PRIORITY-WEIGHT"] = 0.6
+        self.agent.anchor["COST-WEIGHT"] = 0.2
+        self.assertAlmostEqual(0.4, OptionScores.score(self.agent, g, p))
+
+    def test_scores_are_kept(self):
+        g = Goal(Frame("@TEST.GOAL.?"))
+        p = Plan(Frame("@TEST.PLAN.?"))
+        self.assertAlmostEqual(0.0, OptionScores.score(self.agent, g, p))
+
+        p.anchor["COST"] = 0.25
+        self.assertAlmostEqual(0.0, OptionScores.score(self.agent, g, p))
+
+        OptionScores.invalidate(p.anchor)
+        self.assertAlmostEqual(0.25, OptionScores.score(self.agent, g, p))
+
+    def test_setting_priority_or_cost_invalidates(self):
+        g = Goal(Frame("@TEST.GOAL.?"))
+        p = Plan(Frame("@TEST.PLAN.?"))
+        self.assertAlmostEqual(0.0, OptionScores.score(self.agent, g, p))
+
+        g.set_priority(0.75)
+        self.assertAlmostEqual(0.25, OptionScores.score(self.agent, g, p))
+
+        p.set_cost(0.25)
+        self.assertAlmostEqual(0.5, OptionScores.score(self.agent, g, p))
+
+    def test_weights(self):
+        self.assertEqual((1.0, 1.0), OptionScores.weights(self.agent))
+
+        self.agent.anchor["PRIORITY-WEIGHT"] = 0.6
+        self.assertEqual((0.6, 1.0), OptionScores.weights(self.agent))
+
+
 class TestableImpasseDetectionExecutable(ImpasseDetectionExecutable):
 
     def detect(self) -> bool: